@@ -0,0 +1,155 @@
+"""Static assets with content-hashed URLs, strong ETags and precompressed variants.
+
+Every file is read, hashed and compressed once at startup, so serving one is
+a dict lookup: no disk reads and no compression on the request path.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+from typing import Dict, Mapping, Optional, Set, Tuple
+
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # optional: smaller than gzip for text assets
+    brotli = None
+
+# Hashed URLs change whenever the content does, so they can be cached forever
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Unversioned URLs (the page itself) are revalidated, which costs a 304 when unchanged
+REVALIDATE = "no-cache"
+
+MIN_COMPRESS_SIZE = 512
+# Preferred first when the client accepts several
+ENCODINGS = ("br", "gzip")
+
+
+def accepted_encodings(header: str) -> Set[str]:
+    """Content codings in an Accept-Encoding header that aren't refused with q=0."""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        params = params.strip().replace(" ", "")
+        if not coding or params in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding)
+    return accepted
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires."""
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+class Asset:
+    """One file's bytes, content hash and compressed variants.
+
+    Each variant has its own strong ETag, since the bytes on the wire differ.
+    Compressed variants are only kept when they're actually smaller.
+    """
+
+    __slots__ = ("name", "media_type", "digest", "variants")
+
+    def __init__(self, name: str, body: bytes, media_type: str = None, min_compress_size: int = MIN_COMPRESS_SIZE):
+        self.name = name
+        self.media_type = media_type or mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        # coding -> (body, etag)
+        self.variants: Dict[str, Tuple[bytes, str]] = {"identity": (body, f'"{self.digest}"')}
+        if len(body) >= min_compress_size:
+            compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressed["br"] = brotli.compress(body, quality=11)
+            for coding, data in compressed.items():
+                if len(data) < len(body):
+                    self.variants[coding] = (data, f'"{self.digest}-{coding}"')
+
+    @property
+    def hashed_name(self) -> str:
+        stem, ext = os.path.splitext(self.name)
+        return f"{stem}.{self.digest}{ext}"
+
+    def select(self, accept_encoding: str) -> Tuple[str, bytes, str]:
+        """Pick the smallest variant the client accepts: (coding, body, etag)."""
+        accepted = accepted_encodings(accept_encoding) if accept_encoding else set()
+        for coding in ENCODINGS:
+            if coding in accepted and coding in self.variants:
+                return (coding, *self.variants[coding])
+        return ("identity", *self.variants["identity"])
+
+    def __repr__(self) -> str:
+        return f"Asset({self.name!r}, {self.digest!r}, {sorted(self.variants)})"
+
+
+class AssetStore:
+    """Files from a directory, served under ``prefix`` by plain or content-hashed name.
+
+    ``url(name)`` gives the hashed URL to put in pages. Requests for it are
+    cacheable forever; requests by plain name are revalidated.
+    """
+
+    def __init__(self, directory: str = None, prefix: str = "/static/", min_compress_size: int = MIN_COMPRESS_SIZE):
+        self.prefix = prefix
+        self.min_compress_size = min_compress_size
+        self._assets: Dict[str, Asset] = {}
+        self._hashed: Dict[str, Asset] = {}
+        self.counters = {"responses": 0, "not_modified": 0, "not_found": 0, "bytes_sent": 0}
+        self.encodings: Dict[str, int] = {}
+        if directory is not None:
+            self.load_directory(directory)
+
+    def load_directory(self, directory: str) -> None:
+        for root, _, files in os.walk(directory):
+            for filename in sorted(files):
+                path = os.path.join(root, filename)
+                with open(path, "rb") as f:
+                    self.add(os.path.relpath(path, directory).replace(os.sep, "/"), f.read())
+
+    def add(self, name: str, body: bytes, media_type: str = None) -> Asset:
+        asset = Asset(name, body, media_type, self.min_compress_size)
+        self._assets[name] = asset
+        self._hashed[asset.hashed_name] = asset
+        return asset
+
+    def url(self, name: str) -> str:
+        return self.prefix + self._assets[name].hashed_name
+
+    def response(self, path: str, headers: Mapping[str, str]) -> Optional[Response]:
+        """Response for a path under the prefix, or None if there's no such asset."""
+        asset = self._hashed.get(path)
+        if asset is not None:
+            return self.respond(asset, headers, IMMUTABLE)
+        asset = self._assets.get(path)
+        if asset is not None:
+            return self.respond(asset, headers, REVALIDATE)
+        self.counters["not_found"] += 1
+        return None
+
+    def respond(self, asset: Asset, headers: Mapping[str, str], cache_control: str) -> Response:
+        """Serve ``asset`` in the best encoding the client accepts, or 304 if it already has it."""
+        coding, body, etag = asset.select(headers.get("accept-encoding", ""))
+        response_headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if coding != "identity":
+            response_headers["Content-Encoding"] = coding
+        self.counters["responses"] += 1
+        if_none_match = headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            self.counters["not_modified"] += 1
+            return Response(status_code=304, headers=response_headers)
+        self.counters["bytes_sent"] += len(body)
+        self.encodings[coding] = self.encodings.get(coding, 0) + 1
+        return Response(body, media_type=asset.media_type, headers=response_headers)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            **self.counters,
+            "encodings": dict(self.encodings),
+            "assets": {name: {"url": self.prefix + asset.hashed_name,
+                              "bytes": {coding: len(body) for coding, (body, _) in asset.variants.items()}}
+                       for name, asset in self._assets.items()},
+        }
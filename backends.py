@@ -0,0 +1,309 @@
+"""Storage shared by worker processes: cached values, counters and locks.
+
+Hot data stays in per-process caches (cache.py); a backend is the layer
+behind them that every worker sees, so several uvicorn workers or dynos share
+cached events, search cursors, sessions and the Ticketmaster quota.
+
+- ``MemoryBackend``: in-process, for a single worker (the default)
+- ``SQLiteBackend``: a WAL-mode SQLite file, for several workers on one host
+- ``RedisBackend``: any Redis-protocol server, for several hosts
+
+Values are bytes (callers serialize), every operation is atomic on its own,
+and expiry times are wall-clock so they mean the same thing in every process.
+"""
+import asyncio
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # optional: only needed for redis:// backends
+    redis = None
+
+DEFAULT_PREFIX = "eventbot:"
+
+
+class BackendError(Exception):
+    """A backend operation failed (server down, database locked for too long, ...)."""
+
+
+class Backend:
+    """Key/value store with TTLs, set-if-absent and atomic counters.
+
+    Subclasses implement the underscored methods; the public ones add the key
+    prefix, count operations and turn storage errors into BackendError so
+    callers can fall back to local state.
+    """
+
+    name = "backend"
+    # Whether other processes see the same data; an in-process backend doesn't need a local cache in front of it
+    shared = True
+
+    def __init__(self, prefix: str = DEFAULT_PREFIX):
+        self.prefix = prefix
+        self.counters = {"gets": 0, "hits": 0, "sets": 0, "adds": 0, "incrs": 0, "deletes": 0, "errors": 0}
+
+    async def _call(self, op: str, method, *args) -> Any:
+        self.counters[op] += 1
+        try:
+            return await method(*args)
+        except Exception as e:
+            self.counters["errors"] += 1
+            raise BackendError(f"{self.name} {op} failed: {e}") from e
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """The value stored at ``key``, or None if it's absent or expired."""
+        value = await self._call("gets", self._get, self.prefix + key)
+        if value is not None:
+            self.counters["hits"] += 1
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._call("sets", self._set, self.prefix + key, value, ttl)
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        """Store ``value`` only if ``key`` is absent; True if it was stored. Used as a lock."""
+        return await self._call("adds", self._add, self.prefix + key, value, ttl)
+
+    async def incr(self, key: str, amount: int = 1, ttl: float = None) -> int:
+        """Add ``amount`` to the counter at ``key`` and return the new value.
+
+        A missing counter starts at zero and expires ``ttl`` seconds after it
+        was created; incrementing it doesn't extend that.
+        """
+        return await self._call("incrs", self._incr, self.prefix + key, amount, ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._call("deletes", self._delete, self.prefix + key)
+
+    async def close(self) -> None:
+        pass
+
+    async def _get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def _set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def _add(self, key: str, value: bytes, ttl: float) -> bool:
+        raise NotImplementedError
+
+    async def _incr(self, key: str, amount: int, ttl: Optional[float]) -> int:
+        raise NotImplementedError
+
+    async def _delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "shared": self.shared, **self.counters}
+
+
+class MemoryBackend(Backend):
+    """A dict in this process. Expired keys are dropped when read and swept as the dict grows."""
+
+    name = "memory"
+    shared = False
+
+    def __init__(self, prefix: str = DEFAULT_PREFIX, sweep_every: int = 1000):
+        super().__init__(prefix)
+        self.sweep_every = sweep_every
+        self._data: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._writes = 0
+
+    def _live(self, key: str) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[1] is not None and item[1] <= time.time():
+            del self._data[key]
+            return None
+        return item[0]
+
+    def _store(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        self._data[key] = (value, time.time() + ttl if ttl is not None else None)
+        self._writes += 1
+        if self._writes % self.sweep_every == 0:
+            now = time.time()
+            for stale in [k for k, (_, expires) in self._data.items() if expires is not None and expires <= now]:
+                del self._data[stale]
+
+    async def _get(self, key: str) -> Optional[bytes]:
+        value = self._live(key)
+        return str(value).encode() if isinstance(value, int) else value
+
+    async def _set(self, key: str, value: bytes, ttl: float) -> None:
+        self._store(key, value, ttl)
+
+    async def _add(self, key: str, value: bytes, ttl: float) -> bool:
+        if self._live(key) is not None:
+            return False
+        self._store(key, value, ttl)
+        return True
+
+    async def _incr(self, key: str, amount: int, ttl: Optional[float]) -> int:
+        value = self._live(key)
+        if value is None:
+            self._store(key, amount, ttl)
+            return amount
+        value = int(value) + amount
+        self._data[key] = (value, self._data[key][1])
+        return value
+
+    async def _delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+
+class SQLiteBackend(Backend):
+    """A table in a SQLite file that every worker on the host opens.
+
+    WAL mode lets readers carry on while one process writes. Each backend
+    uses a single connection on its own thread, so waiting on another
+    process's write lock never blocks the event loop. Expired rows are
+    ignored when read and deleted every ``sweep_every`` writes.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, prefix: str = DEFAULT_PREFIX, busy_timeout: float = 5.0, sweep_every: int = 1000):
+        super().__init__(prefix)
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.sweep_every = sweep_every
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-backend")
+        self._db: Optional[sqlite3.Connection] = None
+        self._writes = 0
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            # Autocommit: every statement is its own (atomic) transaction
+            self._db = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                       check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)")
+        return self._db
+
+    async def _run(self, fn, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _write(self, sql: str, params: tuple) -> sqlite3.Cursor:
+        cursor = self.db.execute(sql, params)
+        self._writes += 1
+        if self._writes % self.sweep_every == 0:
+            self.db.execute("DELETE FROM kv WHERE expires_at <= ?", (time.time(),))
+        return cursor
+
+    def _get_sync(self, key: str) -> Optional[bytes]:
+        row = self.db.execute("SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                              (key, time.time())).fetchone()
+        if row is None:
+            return None
+        return str(row[0]).encode() if isinstance(row[0], int) else row[0]
+
+    def _set_sync(self, key: str, value: bytes, ttl: float) -> None:
+        self._write("INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, time.time() + ttl))
+
+    def _add_sync(self, key: str, value: bytes, ttl: float) -> bool:
+        now = time.time()
+        # Takes over the key if the row there has expired
+        cursor = self._write(
+            "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE kv.expires_at IS NOT NULL AND kv.expires_at <= ?",
+            (key, value, now + ttl, now))
+        return cursor.rowcount == 1
+
+    def _incr_sync(self, key: str, amount: int, ttl: Optional[float]) -> int:
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        # Restarts from ``amount`` if the row there has expired
+        rows = self._write(
+            "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET "
+            " value = CASE WHEN kv.expires_at IS NOT NULL AND kv.expires_at <= ? THEN excluded.value"
+            "  ELSE CAST(kv.value AS INTEGER) + excluded.value END,"
+            " expires_at = CASE WHEN kv.expires_at IS NOT NULL AND kv.expires_at <= ? THEN excluded.expires_at"
+            "  ELSE kv.expires_at END "
+            "RETURNING value",
+            (key, amount, expires_at, now, now)).fetchall()
+        # fetchall, so the statement (and its write lock) is finished before returning
+        return int(rows[0][0])
+
+    def _delete_sync(self, key: str) -> None:
+        self._write("DELETE FROM kv WHERE key = ?", (key,))
+
+    async def _get(self, key: str) -> Optional[bytes]:
+        return await self._run(self._get_sync, key)
+
+    async def _set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._run(self._set_sync, key, value, ttl)
+
+    async def _add(self, key: str, value: bytes, ttl: float) -> bool:
+        return await self._run(self._add_sync, key, value, ttl)
+
+    async def _incr(self, key: str, amount: int, ttl: Optional[float]) -> int:
+        return await self._run(self._incr_sync, key, amount, ttl)
+
+    async def _delete(self, key: str) -> None:
+        await self._run(self._delete_sync, key)
+
+    async def close(self) -> None:
+        if self._db is not None:
+            await self._run(self._db.close)
+            self._db = None
+        self._executor.shutdown(wait=False)
+
+
+class RedisBackend(Backend):
+    """Any server speaking the Redis protocol (Redis, Valkey, KeyDB, ...), via the ``redis`` package.
+
+    Only plain single-key commands are used (no Lua, MULTI or pipelines), so
+    it works with any server or proxy that speaks the protocol.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = DEFAULT_PREFIX, timeout: float = 1.0):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND is a redis:// URL but the redis package isn't installed (pip install redis)")
+        super().__init__(prefix)
+        self.url = url
+        self._client = redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+
+    async def _get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(key)
+
+    async def _set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._client.set(key, value, px=max(int(ttl * 1000), 1))
+
+    async def _add(self, key: str, value: bytes, ttl: float) -> bool:
+        return bool(await self._client.set(key, value, px=max(int(ttl * 1000), 1), nx=True))
+
+    async def _incr(self, key: str, amount: int, ttl: Optional[float]) -> int:
+        value = await self._client.incrby(key, amount)
+        if value == amount and ttl is not None:
+            # Just created. If this process dies before the expiry is set, the key
+            # stays; counter keys are named by day or slot, so nothing reuses it.
+            await self._client.pexpire(key, max(int(ttl * 1000), 1))
+        return value
+
+    async def _delete(self, key: str) -> None:
+        await self._client.delete(key)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def create_backend(url: str, prefix: str = DEFAULT_PREFIX) -> Backend:
+    """Build a backend from a URL: ``memory``, ``sqlite:///path/to/file.db`` or ``redis://host:6379/0``."""
+    if not url or url == "memory":
+        return MemoryBackend(prefix)
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):], prefix)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url, prefix)
+    raise ValueError(f"Unknown cache backend {url!r}; expected memory, sqlite:///<path> or redis://<host>")
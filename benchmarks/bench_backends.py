@@ -0,0 +1,131 @@
+"""Latency of the shared cache backends, and a check that workers really share one Ticketmaster budget.
+
+For each backend this times the operations the app makes per request (get,
+set of a ~10 KB search page, set-if-absent, counter increment), then starts
+``--workers`` processes that hammer one SharedRateLimiter for ``--duration``
+seconds and reports how many requests got through, the most sent in any
+one-second window, and the daily quota as each worker last saw it. With a
+shared backend the total stays within the rate and the quota; run it with
+``--backends memory`` to see what separate per-process limiters would allow.
+
+The Redis backend needs the ``redis`` package and a server; any local one
+will do (``redis-server``, ``docker run -p 6379:6379 redis``, ...). It uses
+keys under a random prefix and leaves them to expire.
+
+Usage:
+    python benchmarks/bench_backends.py [--backends memory,sqlite,redis] [--redis-url redis://localhost:6379/0]
+                                        [--workers 4] [--duration 5] [--rate 5] [--quota 20]
+"""
+import argparse
+import asyncio
+import bisect
+import multiprocessing
+import os
+import secrets
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import create_backend  # noqa: E402
+from ratelimit import Priority, RateLimited, SharedRateLimiter, RateLimiter  # noqa: E402
+
+PAGE = os.urandom(5 * 1024).hex().encode()  # ~10 KB, about one encoded 20-event page
+
+
+def percentile(samples, q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * q), len(samples) - 1)]
+
+
+async def time_ops(url: str, prefix: str, repeat: int) -> dict:
+    backend = create_backend(url, prefix)
+    ops = {
+        "get": lambda i: backend.get(f"page:{i % 100}"),
+        "set": lambda i: backend.set(f"page:{i % 100}", PAGE, 60),
+        "add": lambda i: backend.add(f"lock:{i}", b"1", 60),
+        "incr": lambda i: backend.incr("counter", 1, 60),
+    }
+    results = {}
+    for name, op in (("set", ops["set"]), ("get", ops["get"]), ("add", ops["add"]), ("incr", ops["incr"])):
+        samples = []
+        for i in range(repeat):
+            start = time.perf_counter()
+            await op(i)
+            samples.append((time.perf_counter() - start) * 1e6)
+        results[name] = (percentile(samples, 0.5), percentile(samples, 0.99))
+    await backend.close()
+    return results
+
+
+def limiter_worker(url: str, prefix: str, args: argparse.Namespace, results: multiprocessing.Queue) -> None:
+    async def run():
+        backend = create_backend(url, prefix)
+        if backend.shared:
+            limiter = SharedRateLimiter(backend, "bench", rate=args.rate, daily_limit=args.quota)
+        else:
+            limiter = RateLimiter(rate=args.rate, daily_limit=args.quota)
+        sent = []
+
+        async def caller():
+            while time.time() < deadline:
+                try:
+                    await limiter.acquire(Priority.INTERACTIVE)
+                    sent.append(time.time())
+                except RateLimited as e:
+                    await asyncio.sleep(min(e.retry_after or 0.1, 0.1) if e.reason == "rate" else 0.1)
+
+        deadline = time.time() + args.duration
+        await asyncio.gather(*[caller() for _ in range(4)])
+        results.put((sent, limiter.stats()["daily_used"]))
+        await backend.close()
+
+    asyncio.run(run())
+
+
+def check_limiter(url: str, prefix: str, args: argparse.Namespace) -> dict:
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=limiter_worker, args=(url, prefix, args, results))
+               for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    outcomes = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    sent = sorted(t for times, _ in outcomes for t in times)
+    busiest = max((bisect.bisect_left(sent, t + 1) - i for i, t in enumerate(sent)), default=0)
+    return {"sent": len(sent), "max_per_second": busiest, "quota_used": [used for _, used in outcomes]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", default="memory,sqlite,redis")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/0")
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--rate", type=float, default=5)
+    parser.add_argument("--quota", type=int, default=20)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    urls = {"memory": "memory", "sqlite": f"sqlite:///{os.path.join(tmpdir, 'backend.db')}", "redis": args.redis_url}
+    print(f"{args.workers} workers, rate {args.rate}/s, quota {args.quota}, {args.duration}s")
+    print(f"{'backend':>8} {'op':>5} {'p50 us':>8} {'p99 us':>8}")
+    for name in args.backends.split(","):
+        prefix = f"bench-{secrets.token_hex(4)}:"
+        try:
+            ops = asyncio.run(time_ops(urls[name], prefix, args.repeat))
+        except Exception as e:
+            print(f"{name:>8} unavailable: {e}")
+            continue
+        for op, (p50, p99) in ops.items():
+            print(f"{name:>8} {op:>5} {p50:>8.1f} {p99:>8.1f}")
+        limits = check_limiter(urls[name], prefix, args)
+        print(f"{name:>8} limiter: sent {limits['sent']} (quota {args.quota}), busiest second {limits['max_per_second']} "
+              f"(rate {args.rate:g}), quota used as seen by each worker {limits['quota_used']}")
+
+
+if __name__ == "__main__":
+    main()
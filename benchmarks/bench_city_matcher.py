@@ -0,0 +1,53 @@
+"""Compare per-message cost of city extraction: per-city regex loop vs. the Aho-Corasick matcher.
+
+Usage:
+    python benchmarks/bench_city_matcher.py
+"""
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import ALLOWED_CITIES, CITY_MATCHER  # noqa: E402
+
+FILLER = ("are there any good concerts or shows happening this weekend i would love to "
+          "find something fun to do with friends maybe live music or a comedy night").split()
+
+
+def legacy_find(text: str):
+    """The previous implementation: one freshly built regex per allowed city."""
+    text_lower = text.lower()
+    for city in ALLOWED_CITIES:
+        if re.search(rf'\b{re.escape(city)}\b', text_lower):
+            return city
+    return None
+
+
+def make_message(length: int, rng: random.Random, with_city: bool) -> str:
+    words = []
+    while len(" ".join(words)) < length:
+        words.append(rng.choice(FILLER))
+    if with_city:
+        words.insert(rng.randrange(len(words) + 1), "new york city")
+    return " ".join(words)[:max(length, 0) + (13 if with_city else 0)]
+
+
+def main() -> None:
+    rng = random.Random(42)
+    print(f"{'length':>7} {'city':>5} {'legacy us/msg':>14} {'matcher us/msg':>15} {'speedup':>8}")
+    for length in (20, 80, 300, 1000, 4000):
+        for with_city in (False, True):
+            messages = [make_message(length, rng, with_city) for _ in range(20)]
+            number = max(1, 2000 // length)
+            legacy = timeit.timeit(lambda: [legacy_find(m) for m in messages], number=number)
+            matcher = timeit.timeit(lambda: [CITY_MATCHER.find(m) for m in messages], number=number)
+            per_legacy = legacy / (number * len(messages)) * 1e6
+            per_matcher = matcher / (number * len(messages)) * 1e6
+            print(f"{length:>7} {'yes' if with_city else 'no':>5} {per_legacy:>14.1f} {per_matcher:>15.1f} {per_legacy / per_matcher:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
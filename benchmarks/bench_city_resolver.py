@@ -0,0 +1,150 @@
+"""Accuracy and latency of typo-tolerant city resolution over a corpus of misspellings.
+
+The corpus is common real-world misspellings plus generated ones: for every
+allowed city, a few random single-character typos (deleted, doubled, swapped
+with a neighbour, or replaced by a key next to it on the keyboard), and two
+for names of ten letters or more. Each is put in a message ("any concerts in
+{typo} this weekend?") and run through exact matching alone (what
+``extract_location`` did before) and then with the fuzzy index. The index is
+also compared to ``difflib.get_close_matches`` over the same names, and run on
+messages that name no city, to count false positives.
+
+Usage:
+    python benchmarks/bench_city_resolver.py [--per-city 3] [--seed 7]
+"""
+import argparse
+import difflib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from city_matcher import FuzzyCityIndex  # noqa: E402
+from main import ALLOWED_CITIES, CITY_ALIASES, CITY_MATCHER, CITY_MIN_CONFIDENCE, CITY_RESOLVER  # noqa: E402
+
+COMMON = {
+    "seatle": "seattle", "pittsburg": "pittsburgh", "philidelphia": "philadelphia", "cincinatti": "cincinnati",
+    "albuquerqe": "albuquerque", "tuscon": "tucson", "sanfransisco": "san francisco", "las vagas": "las vegas",
+    "chicgo": "chicago", "mineapolis": "minneapolis", "indianapolos": "indianapolis", "milwakee": "milwaukee",
+    "louisvile": "louisville", "new orleens": "new orleans", "sacremento": "sacramento", "tallahasee": "tallahassee",
+    "pheonix": "phoenix", "colombus": "columbus", "nashvile": "nashville", "sandiego": "san diego",
+    "los angelas": "los angeles", "hoston": "houston", "baltimor": "baltimore", "denvr": "denver",
+    "portand": "portland", "atlana": "atlanta", "bostin": "boston", "memphys": "memphis", "detriot": "detroit",
+    "charlote": "charlotte", "oklahoma cty": "oklahoma city", "kansas cty": "kansas city", "honolullu": "honolulu",
+}
+NEGATIVES = [
+    "any concerts in the park this weekend?", "what's going on in town tonight", "shows in range of my budget",
+    "I want to see taylor swift", "something fun to do with friends", "events at the stadium",
+    "anything for kids", "comedy near me", "is there live music around here", "take me to the ballgame",
+    "what should I do tonight", "la la land sing along", "concerts in march", "events for families",
+    "I'm heading out later", "any good bars near work", "jazz in the evening", "shows at midnight",
+    "tickets for two", "something in the afternoon", "events in august", "events in canyon",
+    "hiking in the canyon this weekend", "any shows in september", "concerts on sunday", "events in may",
+    "something for saturday night", "festivals in the spring", "events in june",
+]
+KEYBOARD = ["qwertyuiop", "asdfghjkl", "zxcvbnm"]
+TEMPLATES = ["any concerts in {} this weekend?", "what's happening in {} tonight", "events near {}", "{}"]
+
+
+def neighbours(ch: str):
+    for row in KEYBOARD:
+        i = row.find(ch)
+        if i >= 0:
+            return [row[j] for j in (i - 1, i + 1) if 0 <= j < len(row)]
+    return [ch]
+
+
+def typo(name: str, rng: random.Random) -> str:
+    positions = [i for i, ch in enumerate(name) if ch.isalpha()]
+    i = rng.choice(positions)
+    kind = rng.choice(["delete", "double", "swap", "key"])
+    if kind == "delete":
+        return name[:i] + name[i + 1:]
+    if kind == "double":
+        return name[:i] + name[i] + name[i:]
+    if kind == "swap" and i + 1 < len(name) and name[i + 1].isalpha():
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name[:i] + rng.choice(neighbours(name[i])) + name[i + 1:]
+
+
+def make_corpus(per_city: int, rng: random.Random):
+    corpus = list(COMMON.items())
+    for city in sorted(ALLOWED_CITIES):
+        if len(city) < 5:
+            continue
+        for _ in range(per_city):
+            misspelled = typo(city, rng)
+            if len(city) >= 10:
+                misspelled = typo(misspelled, rng)
+            if misspelled not in ALLOWED_CITIES:
+                corpus.append((misspelled, city))
+    return corpus
+
+
+def percentile(samples, q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * q), len(samples) - 1)]
+
+
+def same_city(found: str, expected: str) -> bool:
+    # "st. louis" and "saint louis" (and the like) are one place
+    return found == expected or {found, expected} <= {"st. louis", "saint louis"} \
+        or {found, expected} <= {"st. paul", "saint paul"} or {found, expected} <= {"st. petersburg", "saint petersburg"}
+
+
+def report(name: str, resolve, corpus) -> None:
+    correct = wrong = none = 0
+    timings = []
+    for misspelled, city in corpus:
+        start = time.perf_counter()
+        found = resolve(misspelled)
+        timings.append((time.perf_counter() - start) * 1e6)
+        if found is None:
+            none += 1
+        elif same_city(found, city):
+            correct += 1
+        else:
+            wrong += 1
+    total = len(corpus)
+    print(f"{name:>22} {correct / total:>8.1%} {wrong / total:>6.1%} {none / total:>6.1%} "
+          f"{percentile(timings, 0.5):>8.1f} {percentile(timings, 0.99):>8.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--per-city", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    corpus = make_corpus(args.per_city, rng)
+
+    start = time.perf_counter()
+    index = FuzzyCityIndex(ALLOWED_CITIES, CITY_ALIASES)
+    print(f"index of {len(index)} spellings built in {(time.perf_counter() - start) * 1000:.1f} ms; "
+          f"{len(corpus)} misspellings, min confidence {CITY_MIN_CONFIDENCE}")
+
+    def confident(candidate):
+        return candidate.city if candidate is not None and candidate.confidence >= CITY_MIN_CONFIDENCE else None
+
+    names = sorted(ALLOWED_CITIES)
+    print(f"{'phrase lookup':>22} {'correct':>8} {'wrong':>6} {'none':>6} {'p50 us':>8} {'p99 us':>8}")
+    report("exact only", lambda phrase: CITY_MATCHER.find(phrase).city if CITY_MATCHER.find(phrase) else None, corpus)
+    report("difflib (cutoff 0.8)", lambda phrase: next(iter(difflib.get_close_matches(phrase, names, 1, 0.8)), None),
+           corpus)
+    report("fuzzy index", lambda phrase: confident(index.resolve(phrase)), corpus)
+
+    messages = [(rng.choice(TEMPLATES).format(misspelled), city) for misspelled, city in corpus]
+    print(f"{'in a message':>22}")
+    report("exact only", lambda text: CITY_MATCHER.find(text).city if CITY_MATCHER.find(text) else None, messages)
+    report("exact, then fuzzy", lambda text: (CITY_MATCHER.find(text).city if CITY_MATCHER.find(text)
+                                              else confident(CITY_RESOLVER.find(text))), messages)
+
+    false_positives = [(text, confident(CITY_RESOLVER.find(text))) for text in NEGATIVES]
+    false_positives = [(text, city) for text, city in false_positives if city]
+    print(f"false positives on {len(NEGATIVES)} messages naming no city: {len(false_positives)} {false_positives}")
+
+
+if __name__ == "__main__":
+    main()
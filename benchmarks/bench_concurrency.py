@@ -0,0 +1,121 @@
+"""Measure /chat throughput under concurrent load with simulated upstream latency.
+
+Upstreams (Nominatim, Ticketmaster, Gemini) are replaced with in-process stand-ins
+that sleep for a fixed latency. In ``blocking`` mode the stand-ins sleep
+synchronously on the event loop, reproducing the old request path that called
+``requests.get``/``generate_content`` from inside the async handler. In ``async``
+mode they yield to the loop the way the current client code does.
+
+Usage:
+    python benchmarks/bench_concurrency.py --requests 50 --concurrency 25 --latency 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+
+def make_discovery_payload(count: int = 20) -> dict:
+    """Build a minimal Discovery API response with ``count`` events."""
+    events = []
+    for i in range(count):
+        events.append({
+            "id": f"bench-{i}",
+            "name": f"Benchmark Event {i}",
+            "url": f"https://example.com/event/{i}",
+            "info": "A simulated event used for benchmarking.",
+            "dates": {"start": {"localDate": "2030-01-01", "dateTime": "2030-01-01T20:00:00Z"}},
+            "classifications": [{"segment": {"name": "Music"}, "genre": {"name": "Rock"}}],
+            "priceRanges": [{"min": 20.0, "max": 45.0, "currency": "USD"}],
+            "images": [{"url": f"https://example.com/img/{i}.jpg", "ratio": "16_9", "width": 640}],
+            "_embedded": {"venues": [{
+                "name": "Bench Hall",
+                "address": {"line1": "1 Main St"},
+                "city": {"name": "Seattle"},
+                "location": {"latitude": "47.6", "longitude": "-122.3"},
+            }]},
+        })
+    return {"_embedded": {"events": events}, "page": {"size": count, "totalElements": count, "totalPages": 1, "number": 0}}
+
+
+def install_stand_ins(latency: float, blocking: bool) -> None:
+    """Patch main's upstream clients with latency-injecting stand-ins."""
+    payload = make_discovery_payload()
+    location = SimpleNamespace(latitude=47.6062, longitude=-122.3321)
+
+    if blocking:
+        def handler(request):
+            time.sleep(latency)
+            return httpx.Response(200, json=payload)
+
+        async def geocode(name):
+            time.sleep(latency)
+            return location
+
+        async def generate_content_async(prompt, generation_config=None):
+            time.sleep(latency)
+            return SimpleNamespace(text="Here are some great events for you to check out!")
+    else:
+        async def handler(request):
+            await asyncio.sleep(latency)
+            return httpx.Response(200, json=payload)
+
+        async def geocode(name):
+            await asyncio.sleep(latency)
+            return location
+
+        async def generate_content_async(prompt, generation_config=None):
+            await asyncio.sleep(latency)
+            return SimpleNamespace(text="Here are some great events for you to check out!")
+
+    main.http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    main.geocode = geocode
+    main.gemini_model = SimpleNamespace(generate_content_async=generate_content_async)
+
+
+async def run_load(total: int, concurrency: int) -> float:
+    """Send ``total`` chat requests with at most ``concurrency`` in flight; return elapsed seconds."""
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i):
+            async with semaphore:
+                response = await client.post("/chat", data={"message": "show me concerts in seattle", "location": ""})
+                response.raise_for_status()
+
+        # Silence the request-path logging so it doesn't dominate the measurement
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(total)))
+            return time.perf_counter() - start
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=25)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per upstream call")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in ("blocking", "async"):
+        install_stand_ins(args.latency, blocking=(mode == "blocking"))
+        elapsed = asyncio.run(run_load(args.requests, args.concurrency))
+        results[mode] = elapsed
+        print(f"{mode:>8}: {args.requests} requests in {elapsed:.2f}s -> {args.requests / elapsed:.1f} req/s")
+
+    print(f" speedup: {results['blocking'] / results['async']:.1f}x")
+
+
+if __name__ == "__main__":
+    main_cli()
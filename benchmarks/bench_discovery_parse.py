@@ -0,0 +1,167 @@
+"""Compare parsing Discovery API search pages: the old full-payload path vs. parse_discovery_page.
+
+The old path decoded the body as text, parsed it, re-serialized the whole
+payload with ``json.dumps(indent=2)`` to log 500 characters and printed every
+event. The new path decodes the bytes once (with orjson if installed) and
+keeps only the fields we render.
+
+Pass recorded responses (raw JSON files saved from the Discovery API) to
+benchmark those; without arguments, pages shaped like real responses (links,
+image variants, sales, promoters, attractions) are generated.
+
+Usage:
+    python benchmarks/bench_discovery_parse.py [page.json ...]
+"""
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_event_memory import legacy_normalize  # noqa: E402
+from events import orjson, parse_discovery_page  # noqa: E402
+
+IMAGE_VARIANTS = [("16_9", 640, 360), ("16_9", 1024, 576), ("16_9", 2048, 1152), ("3_2", 640, 427),
+                  ("3_2", 1024, 683), ("3_2", 305, 203), ("4_3", 305, 225), ("16_9", 205, 115),
+                  ("16_9", 100, 56), ("3_2", 3000, 2000)]
+
+
+def links(kind: str, ident: str) -> dict:
+    return {"self": {"href": f"/discovery/v2/{kind}/{ident}?locale=en-us"}}
+
+
+def recorded_style_event(i: int, rng: random.Random) -> dict:
+    """One event with the blocks a real Discovery API search response carries."""
+    venue_id = f"KovZpZA{rng.randrange(400):04d}"
+    attraction_id = f"K8vZ91{rng.randrange(5000):05d}"
+    return {
+        "name": f"Artist {i} Live", "type": "event", "id": f"vvG1{i:012d}", "test": False,
+        "url": f"https://www.ticketmaster.com/artist-{i}-live/event/{i:016X}", "locale": "en-us",
+        "images": [{"ratio": r, "url": f"https://s1.ticketm.net/dam/a/{i:03d}/{i:08x}_{w}x{h}.jpg", "width": w,
+                    "height": h, "fallback": False} for r, w, h in IMAGE_VARIANTS],
+        "sales": {"public": {"startDateTime": "2030-01-15T15:00:00Z", "startTBD": False, "startTBA": False,
+                             "endDateTime": "2030-06-02T03:00:00Z"},
+                  "presales": [{"startDateTime": "2030-01-13T15:00:00Z", "endDateTime": "2030-01-14T03:00:00Z",
+                                "name": "Artist Presale"}]},
+        "dates": {"start": {"localDate": "2030-06-01", "localTime": "20:00:00", "dateTime": "2030-06-02T03:00:00Z",
+                            "dateTBD": False, "dateTBA": False, "timeTBA": False, "noSpecificTime": False},
+                  "timezone": "America/Los_Angeles", "status": {"code": "onsale"}, "spanMultipleDays": False},
+        "classifications": [{"primary": True, "segment": {"id": "KZFzniwnSyZfZ7v7nJ", "name": "Music"},
+                             "genre": {"id": "KnvZfZ7vAeA", "name": "Rock"},
+                             "subGenre": {"id": "KZazBEonSMnZfZ7v6F1", "name": "Pop"},
+                             "type": {"id": "KZAyXgnZfZ7v7nI", "name": "Undefined"},
+                             "subType": {"id": "KZFzBErXgnZfZ7v7lJ", "name": "Undefined"}, "family": False}],
+        "promoter": {"id": "494", "name": "PROMOTED BY VENUE", "description": "PROMOTED BY VENUE / NTL / US"},
+        "promoters": [{"id": "494", "name": "PROMOTED BY VENUE", "description": "PROMOTED BY VENUE / NTL / US"}],
+        "info": "All ages. Doors open one hour before showtime. " * rng.randint(1, 4),
+        "pleaseNote": "No refunds or exchanges. Ticket limits are strictly enforced.",
+        "priceRanges": [{"type": "standard", "currency": "USD", "min": 39.5, "max": 129.5}],
+        "seatmap": {"staticUrl": f"https://maps.ticketmaster.com/maps/geometry/3/event/{i:016X}/staticImage"},
+        "accessibility": {"ticketLimit": 8, "id": "accessibility"},
+        "ticketLimit": {"info": "There is an 8 ticket limit for this event."},
+        "ageRestrictions": {"legalAgeEnforced": False},
+        "ticketing": {"safeTix": {"enabled": True}, "allInclusivePricing": {"enabled": False}},
+        "_links": {**links("events", f"vvG1{i:012d}"), "attractions": [links("attractions", attraction_id)["self"]],
+                   "venues": [links("venues", venue_id)["self"]]},
+        "_embedded": {
+            "venues": [{
+                "name": f"Venue {venue_id}", "type": "venue", "id": venue_id, "test": False,
+                "url": f"https://www.ticketmaster.com/venue/{venue_id}", "locale": "en-us", "postalCode": "98109",
+                "timezone": "America/Los_Angeles", "city": {"name": "Seattle"},
+                "state": {"name": "Washington", "stateCode": "WA"},
+                "country": {"name": "United States Of America", "countryCode": "US"},
+                "address": {"line1": "305 Harrison St"}, "location": {"longitude": "-122.3509", "latitude": "47.6219"},
+                "markets": [{"name": "Seattle", "id": "42"}], "dmas": [{"id": 385}],
+                "boxOfficeInfo": {"openHoursDetail": "Box office opens two hours before doors.",
+                                  "acceptedPaymentDetail": "Visa, MasterCard, American Express"},
+                "parkingDetail": "Paid parking is available in nearby garages.",
+                "generalInfo": {"generalRule": "No outside food or drink.", "childRule": "All ages."},
+                "upcomingEvents": {"_total": 42, "ticketmaster": 42, "_filtered": 0},
+                "_links": links("venues", venue_id),
+            }],
+            "attractions": [{
+                "name": f"Artist {i}", "type": "attraction", "id": attraction_id, "test": False,
+                "url": f"https://www.ticketmaster.com/artist-tickets/artist/{attraction_id}", "locale": "en-us",
+                "images": [{"ratio": r, "url": f"https://s1.ticketm.net/dam/a/att/{attraction_id}_{w}x{h}.jpg",
+                            "width": w, "height": h, "fallback": False} for r, w, h in IMAGE_VARIANTS],
+                "classifications": [{"primary": True, "segment": {"id": "KZFzniwnSyZfZ7v7nJ", "name": "Music"},
+                                     "genre": {"id": "KnvZfZ7vAeA", "name": "Rock"}}],
+                "upcomingEvents": {"_total": 12, "ticketmaster": 12, "_filtered": 0},
+                "_links": links("attractions", attraction_id),
+            }],
+        },
+    }
+
+
+def generated_pages(count: int = 10, size: int = 20):
+    rng = random.Random(42)
+    for page in range(count):
+        events = [recorded_style_event(page * size + i, rng) for i in range(size)]
+        yield json.dumps({
+            "_embedded": {"events": events},
+            "_links": {"first": {"href": "/discovery/v2/events.json?page=0&size=20"},
+                       "self": {"href": f"/discovery/v2/events.json?page={page}&size=20"},
+                       "next": {"href": f"/discovery/v2/events.json?page={page + 1}&size=20"}},
+            "page": {"size": size, "totalElements": count * size, "totalPages": count, "number": page},
+        }).encode()
+
+
+def legacy_parse(body: bytes):
+    """What search_ticketmaster used to do with a response body."""
+    events_data = json.loads(body.decode("utf-8"))
+    print(f"API Response: {json.dumps(events_data, indent=2)[:500]}...")
+    events = legacy_normalize(events_data["_embedded"]["events"], (47.6, -122.3))
+    for event in events:
+        print(f"Successfully processed event: {event['name']}")
+    return events
+
+
+def new_parse(body: bytes):
+    return parse_discovery_page(body, (47.6, -122.3))[0]
+
+
+def time_per_event(parse, pages, repeat: int) -> float:
+    total_events = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            for body in pages:
+                total_events += len(parse(body))
+    return (time.perf_counter() - start) / total_events * 1e6
+
+
+def peak_bytes_per_page(parse, pages) -> float:
+    """Peak allocation while parsing one page, averaged over pages."""
+    peaks = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for body in pages:
+            tracemalloc.start()
+            parse(body)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    return sum(peaks) / len(peaks)
+
+
+def main() -> None:
+    if len(sys.argv) > 1:
+        pages = [open(path, "rb").read() for path in sys.argv[1:]]
+    else:
+        pages = list(generated_pages())
+    events = sum(len(new_parse(body)) for body in pages)
+    print(f"{len(pages)} pages, {events} events, {sum(map(len, pages)) / len(pages) / 1024:.0f} KiB/page, "
+          f"decoder: {'orjson' if orjson is not None else 'json'}")
+    print(f"{'path':>8} {'us/event':>9} {'peak KiB/page':>14}")
+    results = {}
+    for name, parse in (("legacy", legacy_parse), ("new", new_parse)):
+        results[name] = time_per_event(parse, pages, repeat=20)
+        print(f"{name:>8} {results[name]:>9.1f} {peak_bytes_per_page(parse, pages) / 1024:>14.0f}")
+    print(f"speedup: {results['legacy'] / results['new']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Compare memory held by cached events: the old per-event dicts vs. the compact Event model.
+
+Events are decoded from JSON pages and normalized the way search results
+are, then the raw payloads are dropped, so the numbers reflect what the
+event cache actually keeps alive.
+
+Usage:
+    python benchmarks/bench_event_memory.py [event count]
+"""
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from events import normalize_events  # noqa: E402
+
+PAGE_SIZE = 200
+SEGMENTS = {"Music": ["Rock", "Pop", "Jazz", "Hip-Hop/Rap", "Country"], "Sports": ["Basketball", "Baseball", "Soccer"],
+            "Arts & Theatre": ["Theatre", "Comedy", "Dance"], "Family": ["Children's Theatre", "Circus"]}
+CITIES = ["Seattle", "Denver", "Austin", "Chicago", "Boston", "Miami", "Portland", "Atlanta"]
+
+
+def make_pages(count: int, rng: random.Random):
+    """Yield Discovery API pages (as JSON bytes) with ``count`` events over a few hundred venues."""
+    venues = [{
+        "id": f"venue-{i}",
+        "name": f"{rng.choice(['The', 'Grand', 'Old', 'Union'])} {rng.choice(['Hall', 'Theater', 'Arena', 'Club'])} {i}",
+        "address": {"line1": f"{rng.randint(1, 9999)} {rng.choice(['Main', 'Pine', 'Oak', '1st'])} St"},
+        "city": {"name": rng.choice(CITIES)},
+        "location": {"latitude": f"{rng.uniform(25, 48):.6f}", "longitude": f"{rng.uniform(-122, -71):.6f}"},
+    } for i in range(400)]
+    for start in range(0, count, PAGE_SIZE):
+        events = []
+        for i in range(start, min(start + PAGE_SIZE, count)):
+            segment = rng.choice(list(SEGMENTS))
+            low = rng.choice([15, 20, 25, 35, 50, 75])
+            events.append({
+                "id": f"evt-{i}",
+                "name": f"Event {i}: {rng.choice(['Live', 'Tour', 'Night', 'Festival', 'Show'])}",
+                "url": f"https://www.ticketmaster.com/event/{i:016x}",
+                "info": "An evening of live entertainment. " * rng.randint(1, 8),
+                "dates": {"start": {"localDate": "2030-06-01", "dateTime": f"2030-06-{1 + i % 28:02d}T20:00:00Z"}},
+                "classifications": [{"segment": {"name": segment}, "genre": {"name": rng.choice(SEGMENTS[segment])}}],
+                "priceRanges": [{"min": float(low), "max": float(low * 3), "currency": "USD"}],
+                "images": [{"url": f"https://s1.ticketm.net/dam/a/{i:06d}/image_RETINA_PORTRAIT_16_9.jpg", "ratio": "16_9", "width": 640}],
+                "_embedded": {"venues": [rng.choice(venues)]},
+            })
+        yield json.dumps({"_embedded": {"events": events}}).encode()
+
+
+def legacy_normalize(raw_events, fallback):
+    """The previous normalizer in main.search_ticketmaster: one dict per event."""
+    events = []
+    for event in raw_events:
+        venue = event.get('_embedded', {}).get('venues', [{}])[0]
+        price_ranges = event.get('priceRanges', [])
+        if price_ranges:
+            min_price = price_ranges[0].get('min', 0)
+            max_price = price_ranges[0].get('max', 0)
+            price = f"${min_price:.2f} - ${max_price:.2f}" if min_price or max_price else "Check website for prices"
+        else:
+            price = "Check website for prices"
+        description = event.get('description', event.get('info', 'No description available'))
+        if len(description) > 200:
+            description = description[:197] + '...'
+        start_time = datetime.strptime(event['dates']['start']['dateTime'], "%Y-%m-%dT%H:%M:%SZ")
+        events.append({
+            "name": event.get('name', 'Unnamed Event'),
+            "description": description,
+            "location": f"{venue.get('name', 'TBA')}, {venue.get('address', {}).get('line1', '')}",
+            "date": start_time.strftime("%Y-%m-%d"),
+            "start_time": start_time,
+            "url": event.get('url', ''),
+            "coordinates": (
+                float(venue.get('location', {}).get('latitude', fallback[0])),
+                float(venue.get('location', {}).get('longitude', fallback[1]))
+            ),
+            "category": event.get('classifications', [{}])[0].get('segment', {}).get('name', 'General'),
+            "price": price,
+            "image": event.get('images', [{}])[0].get('url') if event.get('images') else None
+        })
+    return events
+
+
+def measure(normalize, pages) -> int:
+    """Bytes still allocated after normalizing every page and dropping the raw payloads."""
+    gc.collect()
+    tracemalloc.start()
+    cached = []
+    for page in pages:
+        cached.extend(normalize(json.loads(page)["_embedded"]["events"], (47.6, -122.3)))
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    pages = list(make_pages(count, random.Random(42)))
+    results = {"dicts": measure(legacy_normalize, pages), "Event model": measure(normalize_events, pages)}
+    print(f"{count} cached events")
+    print(f"{'representation':>16} {'total MB':>9} {'bytes/event':>12}")
+    for name, retained in results.items():
+        print(f"{name:>16} {retained / 1e6:>9.1f} {retained / count:>12.0f}")
+    print(f"Event model uses {results['Event model'] / results['dicts']:.0%} of the dict memory")
+
+
+if __name__ == "__main__":
+    main()
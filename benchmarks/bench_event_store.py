@@ -0,0 +1,114 @@
+"""Ingestion throughput and keyword-search latency of the SQLite FTS5 event store.
+
+Generates events with artist-style names across a few cities and ingests
+them in Discovery-API-sized pages, three ways: first sight (inserts),
+refetched unchanged (only seen_at is bumped) and refetched with every
+event edited (rows rewritten and reindexed). Then it times keyword searches
+around a city: artist names that are in the store (hits), prefixes ("taylor
+sw") and names that aren't (misses, which the app sends upstream).
+
+Usage:
+    python benchmarks/bench_event_store.py [--sizes 10000,100000] [--page 200] [--queries 300]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_store import EventStore  # noqa: E402
+from events import Event, Venue  # noqa: E402
+
+CITIES = [(47.6062, -122.3321), (39.7392, -104.9903), (30.2672, -97.7431), (41.8781, -87.6298),
+          (42.3601, -71.0589), (25.7617, -80.1918), (45.5152, -122.6784), (33.7490, -84.3880)]
+FIRST = ["Taylor", "Kendrick", "Billie", "Olivia", "Harry", "Bad", "Morgan", "Zach", "Noah", "Sabrina", "Chappell",
+         "Luke", "Post", "Doja", "Tyler", "Lana", "Fleetwood", "Arctic", "Hozier", "Phoebe"]
+LAST = ["Swift", "Lamar", "Eilish", "Rodrigo", "Styles", "Bunny", "Wallen", "Bryan", "Kahan", "Carpenter", "Roan",
+        "Combs", "Malone", "Cat", "Childers", "Del Rey", "Mac", "Monkeys", "Bridgers", "Gibbs"]
+SUFFIX = ["Live", "World Tour", "with Special Guests", "Acoustic Night", "Stadium Tour", "Late Show"]
+GENRES = [("Music", "Pop"), ("Music", "Rock"), ("Music", "Country"), ("Music", "Hip-Hop/Rap"), ("Sports", "Baseball"),
+          ("Arts & Theatre", "Comedy")]
+
+
+def make_events(count: int, rng: random.Random, edition: int = 0):
+    now = datetime.utcnow()
+    venues = []
+    for i in range(500):
+        lat, lon = rng.choice(CITIES)
+        venues.append(Venue(f"Venue {i}", f"{i} Main St", "", lat + rng.gauss(0, 0.1), lon + rng.gauss(0, 0.1),
+                            id=f"venue-{i}"))
+    events = []
+    for i in range(count):
+        category, genre = GENRES[i % len(GENRES)]
+        name = f"{rng.choice(FIRST)} {rng.choice(LAST)} {rng.choice(SUFFIX)}" + (f" ({edition})" if edition else "")
+        events.append(Event(name, rng.choice(venues), "Sat, Jun 1", description=f"An evening with {name}.",
+                            id=f"ev-{i}", category=category, genre=genre,
+                            start_time=now + timedelta(hours=rng.uniform(1, 90 * 24))))
+    return events
+
+
+def percentile(samples, q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * q), len(samples) - 1)]
+
+
+async def ingest(store: EventStore, events, page: int) -> float:
+    """Events per second, ingesting one page at a time as searches would."""
+    start = time.perf_counter()
+    for i in range(0, len(events), page):
+        store.add(events[i:i + page])
+        await store.ingest()
+    return len(events) / (time.perf_counter() - start)
+
+
+async def run(size: int, args: argparse.Namespace) -> None:
+    rng = random.Random(size)
+    path = os.path.join(tempfile.mkdtemp(), "events.db")
+    store = EventStore(path, sweep_every=10 ** 9)
+    events = make_events(size, rng)
+    first = await ingest(store, events, args.page)
+    unchanged = await ingest(store, events, args.page)
+    edited = await ingest(store, make_events(size, random.Random(size), edition=1), args.page)
+
+    date_range = (datetime.utcnow(), datetime.utcnow() + timedelta(days=30))
+    kinds = {
+        "hit": lambda: f"{rng.choice(FIRST)} {rng.choice(LAST)}",
+        "prefix": lambda: f"{rng.choice(FIRST)} {rng.choice(LAST)[:3]}",
+        "miss": lambda: f"{rng.choice(['Coldplay', 'Adele', 'Metallica'])} {rng.choice(['Live', 'Tour'])}",
+    }
+    results = {}
+    for kind, keyword in kinds.items():
+        samples, found = [], 0
+        for _ in range(args.queries):
+            lat, lon = rng.choice(CITIES)
+            start = time.perf_counter()
+            events_found = await store.search(keyword(), lat, lon, 16, date_range, limit=20)
+            samples.append((time.perf_counter() - start) * 1000)
+            found += len(events_found)
+        results[kind] = (percentile(samples, 0.5), percentile(samples, 0.99), found / args.queries)
+    print(f"{size:>8} {first:>9.0f} {unchanged:>9.0f} {edited:>9.0f} {os.path.getsize(path) / 2 ** 20:>7.1f} "
+          + " ".join(f"{p50:>7.2f} {p99:>7.2f} {found:>5.1f}" for p50, p99, found in results.values()))
+    await store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--page", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"ingest in events/s ({args.page}-event pages); search p50/p99 in ms and events found per query")
+    print(f"{'events':>8} {'insert':>9} {'refetch':>9} {'edited':>9} {'db MB':>7} "
+          + " ".join(f"{kind + ' p50':>7} {'p99':>7} {'found':>5}" for kind in ("hit", "prefix", "miss")))
+    for size in (int(n) for n in args.sizes.split(",")):
+        asyncio.run(run(size, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""Load test /chat against local stand-ins for Ticketmaster, Nominatim and Gemini.
+
+Starts fake_upstreams.py and the app (under uvicorn) as subprocesses, points
+the app at the fakes, then runs concurrent chat sessions: greetings, city +
+time queries, time-only follow-ups, "show me more" paging and searches for
+places outside the gazetteer (which go to Nominatim). Prints a JSON report
+with throughput, p50/p95/p99 latency and error rates per scenario, plus the
+fallback and upstream counters from the app's /metrics. Exits non-zero if no
+"show me more" request got a further page, since paging then went untested.
+
+Latency and error flags are passed through to the fakes, e.g.:
+
+    python benchmarks/bench_load.py --users 50 --duration 30 --ticketmaster-latency 0.3 \\
+        --gemini-error-rate 0.05 --output report.json
+
+The app's own Ticketmaster rate limit applies (--ticketmaster-rate, default 5/s
+like the real API); raise it to measure the app rather than the limiter.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Dict, List
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+CITIES = ["seattle", "denver", "austin", "chicago", "boston", "miami", "portland", "atlanta", "nashville", "phoenix"]
+OFF_GAZETTEER = ["Boulder Creek", "Bar Harbor", "Sedona", "Moab", "Taos", "Galena", "Marfa", "Hood River"]
+KINDS = ["events", "concerts", "comedy shows", "sports games", "things to do", "theater"]
+WHEN = ["this weekend", "today", "next week", "tomorrow", ""]
+GREETINGS = ["hi there!", "hello, how are you?", "hey", "good morning", "I'm bored"]
+RATE_LIMITED = ("Ticketmaster is getting a lot of requests", "today's limit for live event lookups")
+ERROR_REPLIES = ("I encountered an error",)
+# Providers missed the deadline with nothing else to show (SEARCH_PENDING_MESSAGE)
+PENDING_REPLIES = ("still waiting on the event listings",)
+# The "Show more events" button (templates/more_button.html), in the reply HTML
+CURSOR = re.compile(r'data-cursor="([^"]+)"')
+EVENT_CARD = 'class="event-card"'
+
+
+class HttpGeminiModel:
+    """Stand-in for genai.GenerativeModel that calls a Gemini-shaped REST endpoint over httpx."""
+
+    def __init__(self, endpoint: str, model_name: str):
+        self.endpoint = endpoint.rstrip("/")
+        self.model_name = model_name
+        self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=30.0, limits=httpx.Limits(max_connections=200))
+        return self._client
+
+    @staticmethod
+    def _text(body: dict) -> str:
+        return "".join(part.get("text", "") for part in body["candidates"][0]["content"]["parts"])
+
+    async def generate_content_async(self, prompt: str, generation_config: dict = None, stream: bool = False):
+        body = {"contents": [{"role": "user", "parts": [{"text": prompt}]}], "generationConfig": generation_config or {}}
+        if stream:
+            return self._stream(body)
+        response = await self.client.post(f"{self.endpoint}/v1beta/{self.model_name}:generateContent", json=body)
+        response.raise_for_status()
+        return SimpleNamespace(text=self._text(response.json()))
+
+    async def _stream(self, body: dict):
+        url = f"{self.endpoint}/v1beta/{self.model_name}:streamGenerateContent?alt=sse"
+        async with self.client.stream("POST", url, json=body) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    yield SimpleNamespace(text=self._text(json.loads(line[6:])))
+
+
+def serve_app(port: int, gemini_endpoint: str) -> None:
+    """Run main.app with Gemini pointed at the stand-in (called in the app subprocess)."""
+    import uvicorn
+    sys.path.insert(0, REPO_DIR)
+    import main
+    main.gemini_model = HttpGeminiModel(gemini_endpoint, main.GEMINI_MODEL_NAME)
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url: str, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, scenario: str, seconds: float, outcome: str) -> None:
+        self.samples[scenario].append(seconds)
+        self.outcomes[scenario][outcome] += 1
+
+
+def classify(response: httpx.Response) -> str:
+    if response.status_code != 200:
+        return "http_error"
+    if any(marker in response.text for marker in RATE_LIMITED):
+        return "rate_limited"
+    if any(marker in response.text for marker in PENDING_REPLIES):
+        return "pending"
+    if any(marker in response.text for marker in ERROR_REPLIES) or "event: error" in response.text:
+        return "error"
+    return "ok"
+
+
+async def send(client: httpx.AsyncClient, recorder: Recorder, scenario: str, message: str,
+               location: str = "", cursor: str = "", stream: bool = False) -> httpx.Response:
+    start = time.perf_counter()
+    try:
+        response = await client.post("/chat/stream" if stream else "/chat",
+                                      data={"message": message, "location": location, "cursor": cursor})
+    except httpx.HTTPError:
+        recorder.record(scenario, time.perf_counter() - start, "transport_error")
+        return None
+    recorder.record(scenario, time.perf_counter() - start, classify(response))
+    return response
+
+
+def reply_html(response: httpx.Response, stream: bool) -> str:
+    """The reply's HTML: /chat returns it JSON-encoded, /chat/stream as plain server-sent event data."""
+    if stream:
+        return response.text
+    try:
+        return response.json()
+    except ValueError:
+        return response.text
+
+
+async def session(client: httpx.AsyncClient, recorder: Recorder, rng: random.Random, stream_ratio: float) -> None:
+    """One user's conversation."""
+    stream = rng.random() < stream_ratio
+    if rng.random() < 0.5:
+        await send(client, recorder, "greeting", rng.choice(GREETINGS), stream=stream)
+
+    if rng.random() < 0.15:
+        # A place the gazetteer doesn't know, passed as the remembered location
+        place = rng.choice(OFF_GAZETTEER)
+        await send(client, recorder, "nominatim_search", f"any {rng.choice(KINDS)} this weekend?", place, stream=stream)
+        return
+
+    city = rng.choice(CITIES)
+    query = f"show me {rng.choice(KINDS)} in {city} {rng.choice(WHEN)}".strip()
+    response = await send(client, recorder, "city_time", query, stream=stream)
+    if response is None:
+        return
+
+    if rng.random() < 0.5:
+        await send(client, recorder, "time_followup", "what about tomorrow?", city.title(), stream=stream)
+    html = reply_html(response, stream)
+    match = CURSOR.search(html)
+    if match is None and EVENT_CARD in html:
+        # The fake Ticketmaster always has further pages, so event cards without a cursor mean paging is broken
+        recorder.record("show_more", 0.0, "no_cursor")
+    elif match and rng.random() < 0.5:
+        await send(client, recorder, "show_more", "show me more", city.title(), match.group(1), stream=stream)
+
+
+async def drive(base_url: str, users: int, duration: float, stream_ratio: float, seed: int) -> Recorder:
+    recorder = Recorder()
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits) as client:
+        async def user(index: int) -> None:
+            rng = random.Random(seed + index)
+            while time.monotonic() < deadline:
+                await session(client, recorder, rng, stream_ratio)
+
+        await asyncio.gather(*(user(i) for i in range(users)))
+    return recorder
+
+
+def percentile(sorted_samples: List[float], pct: float) -> float:
+    if not sorted_samples:
+        return None
+    index = max(int(round(pct / 100 * len(sorted_samples) + 0.5)) - 1, 0)
+    return sorted_samples[min(index, len(sorted_samples) - 1)]
+
+
+def summarize(samples: List[float], outcomes: Dict[str, int], elapsed: float) -> dict:
+    ordered = sorted(samples)
+    total = len(ordered)
+    failures = total - outcomes.get("ok", 0)
+    return {
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2),
+        "error_rate": round(failures / total, 4) if total else None,
+        "outcomes": dict(outcomes),
+        "latency_ms": {
+            "p50": round(percentile(ordered, 50) * 1000, 1) if total else None,
+            "p95": round(percentile(ordered, 95) * 1000, 1) if total else None,
+            "p99": round(percentile(ordered, 99) * 1000, 1) if total else None,
+            "mean": round(sum(ordered) / total * 1000, 1) if total else None,
+            "max": round(ordered[-1] * 1000, 1) if total else None,
+        },
+    }
+
+
+def scrape_counters(base_url: str) -> dict:
+    """Pull fallback, upstream and limiter counters from the app's /metrics."""
+    wanted = ("eventbot_fallbacks_total", "eventbot_upstream_requests_total", "eventbot_ticketmaster_calls_total",
+              "eventbot_cache_hit_ratio")
+    counters = {}
+    for line in httpx.get(f"{base_url}/metrics", timeout=10).text.splitlines():
+        if line.startswith(wanted):
+            name, value = line.rsplit(" ", 1)
+            counters[name] = float(value)
+    return counters
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20, help="concurrent simulated users")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load")
+    parser.add_argument("--stream-ratio", type=float, default=0.3, help="share of sessions using /chat/stream")
+    parser.add_argument("--ticketmaster-rate", type=float, default=5, help="app-side Ticketmaster requests/second")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    parser.add_argument("--serve-app", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    parser.add_argument("--gemini-endpoint", help=argparse.SUPPRESS)
+    args, fake_args = parser.parse_known_args()
+    args.fake_args = fake_args
+    return args
+
+
+def main() -> None:
+    args = parse_args()
+    if args.serve_app:
+        serve_app(args.serve_app, args.gemini_endpoint)
+        return
+
+    fake_port, app_port = free_port(), free_port()
+    fake_url, app_url = f"http://127.0.0.1:{fake_port}", f"http://127.0.0.1:{app_port}"
+    cache_dir = tempfile.mkdtemp(prefix="eventbot-load-")
+    env = {
+        **os.environ,
+        "TICKETMASTER_API_URL": f"{fake_url}/discovery/v2/events.json",
+        "TICKETMASTER_RATE_LIMIT": str(args.ticketmaster_rate),
+        "NOMINATIM_DOMAIN": f"127.0.0.1:{fake_port}",
+        "NOMINATIM_SCHEME": "http",
+        "GEOCODE_CACHE_PATH": os.path.join(cache_dir, "geocode_cache.db"),
+        "EVENT_STORE_PATH": os.path.join(cache_dir, "events.db"),
+        "UPSTREAM_CHECK": "0",
+        "WARMER": "0",
+    }
+    processes = [
+        subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, "fake_upstreams.py"), "--port", str(fake_port),
+                          *args.fake_args]),
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve-app", str(app_port),
+                          "--gemini-endpoint", fake_url], env=env, cwd=REPO_DIR,
+                         stdout=subprocess.DEVNULL),
+    ]
+    try:
+        wait_until_up(f"{fake_url}/search?q=warmup")
+        wait_until_up(f"{app_url}/ready")
+        start = time.perf_counter()
+        recorder = asyncio.run(drive(app_url, args.users, args.duration, args.stream_ratio, args.seed))
+        elapsed = time.perf_counter() - start
+
+        all_samples = [s for samples in recorder.samples.values() for s in samples]
+        all_outcomes = defaultdict(int)
+        for outcomes in recorder.outcomes.values():
+            for outcome, count in outcomes.items():
+                all_outcomes[outcome] += count
+        report = {
+            "config": {"users": args.users, "duration_s": args.duration, "stream_ratio": args.stream_ratio,
+                       "ticketmaster_rate": args.ticketmaster_rate, "upstream_flags": args.fake_args},
+            "elapsed_s": round(elapsed, 2),
+            "overall": summarize(all_samples, all_outcomes, elapsed),
+            "scenarios": {name: summarize(recorder.samples[name], recorder.outcomes[name], elapsed)
+                          for name in sorted(recorder.samples)},
+            "app_counters": scrape_counters(app_url),
+        }
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    show_more = recorder.outcomes.get("show_more", {})
+    if not show_more.get("ok"):
+        sys.exit(f"show_more scenario failed: no page fetched by cursor (outcomes: {dict(show_more)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Search latency and duplicate merging of the event provider fan-out, with local provider stand-ins.
+
+Latency: stand-ins for Ticketmaster, Eventbrite, the local index and mock
+events sleep for a random time drawn from a long-tailed distribution (most
+answers are quick, a few take seconds), and fail now and then. Each search
+runs three ways: asking the providers one after another, asking them all at
+once and waiting for every answer, and the fan-out with its deadline. For
+each the latency percentiles, the average number of events returned and the
+share of searches that came back without some provider's events are printed.
+
+Merging: a generated Ticketmaster catalog is partly relisted by the
+Eventbrite stand-in the way other providers list the same event (different
+case and punctuation, extra words, the venue geocoded a few hundred meters
+off, a slightly different start time), next to Eventbrite-only events, some
+built to look like duplicates (a late show of the same act, a different act
+at the same venue). The merge should drop the relistings and keep the rest.
+
+Usage:
+    python benchmarks/bench_providers.py [--searches 300] [--deadline 2.5] [--scale 1.0]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from events import Event, Venue  # noqa: E402
+from providers import EventProvider, ProviderError, ProviderFanOut, ProviderQuery, ProviderResult, merge_events  # noqa: E402
+
+# name: (median seconds, share of slow answers, slow seconds, error rate, events per answer, standby, fallback)
+STAND_INS = {
+    "ticketmaster": (0.35, 0.04, 6.0, 0.02, 20, False, False),
+    "eventbrite": (0.6, 0.08, 4.0, 0.03, 8, False, False),
+    "local": (0.003, 0.0, 0.0, 0.0, 12, True, False),
+    "mock": (0.0, 0.0, 0.0, 0.0, 5, False, True),
+}
+ARTISTS = ["Taylor Swift", "Kendrick Lamar", "Billie Eilish", "Olivia Rodrigo", "Zach Bryan", "Noah Kahan",
+           "Sabrina Carpenter", "Chappell Roan", "Luke Combs", "Post Malone", "Hozier", "Phoebe Bridgers",
+           "Tyler Childers", "Lana Del Rey", "Arctic Monkeys", "Fleetwood Mac Tribute", "Seattle Symphony",
+           "Pacific Northwest Ballet", "Seattle Kraken", "Sounders FC"]
+SUFFIXES = ["", " - The World Tour", ": Live in Concert", " with Special Guests", " Acoustic Night"]
+VENUES = [("Climate Pledge Arena", 47.6221, -122.3540), ("Lumen Field", 47.5952, -122.3316),
+          ("The Paramount Theatre", 47.6133, -122.3318), ("Showbox SoDo", 47.5840, -122.3350),
+          ("Benaroya Hall", 47.6081, -122.3371), ("The Crocodile", 47.6135, -122.3447),
+          ("Neptune Theatre", 47.6614, -122.3136), ("Moore Theatre", 47.6117, -122.3410)]
+
+
+class StandIn(EventProvider):
+    """A provider that answers after a long-tailed random delay, sometimes with an error."""
+
+    def __init__(self, name: str, rng: random.Random, scale: float):
+        self.name = name
+        self.median, self.slow_share, self.slow, self.error_rate, self.count, self.standby, self.fallback = \
+            STAND_INS[name]
+        self.rng = rng
+        self.scale = scale
+
+    async def search(self, query: ProviderQuery) -> ProviderResult:
+        slow = self.rng.random() < self.slow_share
+        delay = (self.slow if slow else self.median * self.rng.lognormvariate(0, 0.5)) * self.scale
+        await asyncio.sleep(delay)
+        if self.rng.random() < self.error_rate:
+            raise ProviderError(f"{self.name} stand-in failed")
+        start = query.date_range[0]
+        return ProviderResult([Event(f"{self.name} event {i}", Venue(f"{self.name} venue {i}"),
+                                     (start + timedelta(days=i)).strftime("%Y-%m-%d"), id=f"{self.name}-{i}",
+                                     start_time=start + timedelta(days=i, hours=self.rng.random()),
+                                     source=self.name)
+                               for i in range(self.count)])
+
+
+def percentile(samples, q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * q), len(samples) - 1)]
+
+
+async def one_by_one(providers, query: ProviderQuery):
+    found, missing = [], False
+    for provider in providers:
+        try:
+            found.append((await provider.search(query)).events)
+        except ProviderError:
+            missing = True
+    return found, missing
+
+
+async def all_at_once(providers, query: ProviderQuery):
+    results = await asyncio.gather(*(provider.search(query) for provider in providers), return_exceptions=True)
+    return [result.events for result in results if not isinstance(result, BaseException)], \
+        any(isinstance(result, BaseException) for result in results)
+
+
+async def time_searches(name: str, search, searches: int, scale: float) -> None:
+    async def timed():
+        start = time.perf_counter()
+        events, missing = await search()
+        return (time.perf_counter() - start) / scale, len(events), missing
+
+    samples = await asyncio.gather(*(timed() for _ in range(searches)))
+    seconds = [sample[0] for sample in samples]
+    print(f"{name:>22} {percentile(seconds, 0.5):>7.2f} {percentile(seconds, 0.95):>7.2f} "
+          f"{percentile(seconds, 0.99):>7.2f} {max(seconds):>7.2f} "
+          f"{sum(sample[1] for sample in samples) / searches:>7.1f} {sum(sample[2] for sample in samples) / searches:>8.1%}")
+
+
+async def latency(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    providers = [StandIn(name, rng, args.scale) for name in STAND_INS]
+    live = [provider for provider in providers if not provider.standby and not provider.fallback]
+    now = datetime.utcnow()
+    query = ProviderQuery("Seattle", 47.6062, -122.3321, 16, (now, now + timedelta(days=30)), {})
+    fan_out = ProviderFanOut(providers, deadline=args.deadline * args.scale)
+
+    async def sequential():
+        found, missing = await one_by_one(live, query)
+        return merge_events(found), missing
+
+    async def gathered():
+        found, missing = await all_at_once(live, query)
+        return merge_events(found), missing
+
+    async def deadline():
+        result = await fan_out.search(query)
+        return result.events, not result.complete
+
+    print(f"{args.searches} searches; seconds (unscaled), events per search, share missing a provider's events")
+    print(f"{'':>22} {'p50':>7} {'p95':>7} {'p99':>7} {'max':>7} {'events':>7} {'partial':>8}")
+    await time_searches("one after another", sequential, args.searches, args.scale)
+    await time_searches("all, wait for every", gathered, args.searches, args.scale)
+    await time_searches(f"fan-out, {args.deadline:g}s deadline", deadline, args.searches, args.scale)
+    await fan_out.drain()
+    print(f"fan-out outcomes: {fan_out.stats()['providers']}")
+
+
+def relist(event: Event, rng: random.Random) -> Event:
+    """The same event as another provider would list it."""
+    name = rng.choice([event.name.upper(), event.name.replace(" - ", " | "), event.name.replace(":", " -"),
+                       f"{event.name} (All Ages)", f"Live: {event.name}"])
+    venue_name = rng.choice([event.venue.name, event.venue.name.replace("Theatre", "Theater"),
+                             f"{event.venue.name} - Seattle", event.venue.name.replace("The ", "")])
+    latitude = event.venue.latitude + rng.uniform(-0.004, 0.004)
+    longitude = event.venue.longitude + rng.uniform(-0.004, 0.004)
+    start_time = event.start_time + timedelta(minutes=rng.choice([0, 0, 0, -30, 30, 60]))
+    return Event(name, Venue(venue_name, latitude=latitude, longitude=longitude), event.date,
+                 start_time=start_time, id=f"eb-{event.id}", source="eventbrite")
+
+
+def merging(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    start = datetime(2026, 6, 1)
+    catalog = []
+    for i in range(args.catalog):
+        venue, latitude, longitude = rng.choice(VENUES)
+        start_time = start + timedelta(days=rng.randrange(60), hours=rng.choice([19, 20, 21]))
+        catalog.append(Event(f"{rng.choice(ARTISTS)}{rng.choice(SUFFIXES)}",
+                             Venue(venue, latitude=latitude, longitude=longitude), start_time.strftime("%Y-%m-%d"),
+                             start_time=start_time, id=f"tm-{i}", source="ticketmaster"))
+
+    relisted = rng.sample(catalog, len(catalog) // 3)
+    distinct = []
+    for i, event in enumerate(rng.sample(catalog, len(catalog) // 6)):
+        if i % 2:
+            # The same act's late show
+            start_time = event.start_time + timedelta(hours=3)
+            name = event.name + " (Late Show)"
+        else:
+            # Another act at the same venue that night
+            start_time = event.start_time
+            name = rng.choice([artist for artist in ARTISTS if not event.name.startswith(artist)])
+        distinct.append(Event(name, Venue(event.venue.name, latitude=event.venue.latitude,
+                                          longitude=event.venue.longitude), event.date, start_time=start_time,
+                              id=f"eb-distinct-{i}", source="eventbrite"))
+    eventbrite = [relist(event, rng) for event in relisted] + distinct
+
+    start_clock = time.perf_counter()
+    merged = merge_events([catalog, eventbrite])
+    seconds = time.perf_counter() - start_clock
+    kept = {event.id for event in merged}
+    dropped = sum(1 for event in eventbrite if event.id.startswith("eb-tm") and event.id not in kept)
+    merged_wrongly = sum(1 for event in distinct if event.id not in kept)
+    print(f"merge of {len(catalog)} + {len(eventbrite)} events in {seconds * 1000:.1f} ms: "
+          f"{dropped}/{len(relisted)} relistings dropped, {merged_wrongly}/{len(distinct)} distinct events merged away")
+    if "-v" in sys.argv:
+        for event in eventbrite:
+            if event.id.startswith("eb-tm") and event.id in kept:
+                original = next(e for e in catalog if f"eb-{e.id}" == event.id)
+                print(f"    kept relisting {event.name!r} @ {event.venue.name!r} of {original.name!r} "
+                      f"@ {original.venue.name!r}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--searches", type=int, default=300)
+    parser.add_argument("--deadline", type=float, default=2.5, help="fan-out deadline in (unscaled) seconds")
+    parser.add_argument("--scale", type=float, default=1.0, help="run stand-in delays and the deadline this much faster")
+    parser.add_argument("--catalog", type=int, default=600, help="Ticketmaster events in the merge test")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("-v", action="store_true", help="list relistings the merge kept")
+    args = parser.parse_args()
+    asyncio.run(latency(args))
+    merging(args)
+
+
+if __name__ == "__main__":
+    main()
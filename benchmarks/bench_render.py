@@ -0,0 +1,113 @@
+"""Compare rendering a 20-card events response: the old f-string path vs. templates with the card cache.
+
+Also reports the size of each response as sent: raw, gzip and (if the
+brotli package is installed) brotli, at the levels /chat compresses with.
+
+The old path concatenated unescaped f-strings for every card on every
+request. The new path renders autoescaped Jinja2 templates and reuses cached
+card fragments, so a card is only built the first time any user sees that
+version of the event. The gain is escaping, not speed: warm should be about
+even with legacy, and cold is far slower.
+
+"cold" clears the card cache before every response (each card rendered from
+the template); "warm" is the steady state for a popular city.
+
+Usage:
+    python benchmarks/bench_render.py [--cards 20] [--repeat 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("UPSTREAM_CHECK", "0")
+os.environ.setdefault("WARMER", "0")
+
+from bench_discovery_parse import generated_pages  # noqa: E402
+from events import parse_discovery_page  # noqa: E402
+from assets import brotli  # noqa: E402
+from compression import CompressionMiddleware  # noqa: E402
+import main  # noqa: E402
+
+
+def legacy_card(event) -> str:
+    """What render_event_card used to build for every card."""
+    image_html = f"<img src='{event.image}' alt='{event.name}' class='event-image'>" if event.image else ""
+    return (
+        f"<div class='event-card'>"
+        f"{image_html}"
+        f"<div class='event-content'>"
+        f"<h3>{event.name}</h3>"
+        f"<div class='event-details'>"
+        f"<p><strong>📅</strong> {event.date}</p>"
+        f"<p><strong>📍</strong> {event.location}</p>"
+        f"<p><strong>💰</strong> {event.price}</p>"
+        f"<p><strong>🏷️</strong> {event.category}</p>"
+        f"<p>{event.description}</p>"
+        f"</div>"
+        f"<a href='{event.url}' target='_blank' class='ticket-button'>Get Tickets →</a>"
+        f"</div>"
+        f"</div>"
+    )
+
+
+def legacy_render(intro, location, date_info, events, cursor) -> str:
+    button = f"<button class='more-button' data-cursor='{cursor}'>Show more events</button>" if cursor else ""
+    response = [f"<div class='events-response'><p class='events-intro'>{intro}</p>"
+                f"<h2>Events in {location}{date_info}</h2><div class='events-grid'>"]
+    response.extend(legacy_card(event) for event in events)
+    response.append(f"</div>{button}</div>")
+    return "".join(response)
+
+
+def cold_render(intro, location, date_info, events, cursor) -> str:
+    main.card_cache.clear()
+    return main.render_events_response(intro, location, date_info, events, cursor)
+
+
+def warm_render(intro, location, date_info, events, cursor) -> str:
+    return main.render_events_response(intro, location, date_info, events, cursor)
+
+
+def time_per_response(render, events, repeat: int) -> float:
+    args = ("Here are some great shows coming up!", "Seattle", " this weekend", events, "abc123:1")
+    render(*args)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        render(*args)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def wire_sizes(html: str) -> str:
+    body = html.encode()
+    compressor = CompressionMiddleware(None)
+    sizes = [len(body), len(compressor.compress(body, "gzip"))]
+    sizes.append(len(compressor.compress(body, "br")) if brotli is not None else "-")
+    return " ".join(f"{size:>7}" for size in sizes)
+
+
+def main_() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    events = []
+    for body in generated_pages(count=(args.cards + 19) // 20):
+        events.extend(parse_discovery_page(body, (47.6, -122.3))[0])
+    events = events[:args.cards]
+
+    print(f"{len(events)} cards per response, {args.repeat} responses")
+    print(f"{'path':>8} {'us/response':>12} {'bytes':>7} {'gzip':>7} {'br':>7}")
+    results = {}
+    for name, render in (("legacy", legacy_render), ("cold", cold_render), ("warm", warm_render)):
+        results[name] = time_per_response(render, events, args.repeat)
+        html = render("Here are some great shows coming up!", "Seattle", " this weekend", events, "abc123:1")
+        print(f"{name:>8} {results[name]:>12.1f} {wire_sizes(html)}")
+    print(f"warm vs legacy: {results['legacy'] / results['warm']:.1f}x, "
+          f"warm vs cold: {results['cold'] / results['warm']:.1f}x")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,190 @@
+"""Per-call cost and accuracy of search param extraction: substring scans vs. the token index.
+
+The legacy extractor (rebuilding its keyword dicts on every call, substring
+matching, first hit in dict order wins) is kept here for comparison. Both run
+over a labeled set of sample queries; a query counts as correct when the
+classification, genre and family-friendly params all match its label (the
+artist keyword is left out, it's extracted the same way apart from
+whole-word indicators).
+
+Usage:
+    python benchmarks/bench_search_params.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import extract_search_parameters  # noqa: E402
+
+# (query, classificationName, genreName, familyFriendly)
+LABELED = [
+    ("show me concerts in seattle", "music", None, None),
+    ("any good concerts this weekend?", "music", None, None),
+    ("live music tonight", "music", None, None),
+    ("where can I hear a band play", "music", None, None),
+    ("I want to go to a gig", "music", None, None),
+    ("any rock concerts in denver", "music", "rock", None),
+    ("indie shows next week", None, "rock", None),
+    ("jazz tonight", None, "jazz", None),
+    ("jazz clubs in new orleans", "nightlife", "jazz", None),
+    ("hip-hop shows in atlanta", None, "hip-hop-rap", None),
+    ("hip hop concerts", "music", "hip-hop-rap", None),
+    ("r&b night", None, "hip-hop-rap", None),
+    ("country music this weekend", "music", "country", None),
+    ("bluegrass festival", None, "country", None),
+    ("edm party tonight", "nightlife", "electronic", None),
+    ("techno and house music", "music", "electronic", None),
+    ("house party this weekend", "nightlife", None, None),
+    ("symphony orchestra performances", None, "classical", None),
+    ("salsa dancing", None, "latin", None),
+    ("reggae concert", "music", "reggae", None),
+    ("pop concerts", "music", "pop", None),
+    ("metal shows", None, "rock", None),
+    ("any sports games tonight", "sports", None, None),
+    ("basketball games this week", "sports", None, None),
+    ("baseball in boston", "sports", None, None),
+    ("nfl game on sunday", "sports", None, None),
+    ("hockey tickets", "sports", None, None),
+    ("marathon this month", "sports", None, None),
+    ("soccer match near me", "sports", None, None),
+    ("theater shows in chicago", "arts", None, None),
+    ("broadway musicals", "arts", None, None),
+    ("ballet performances", "arts", None, None),
+    ("art galleries opening this week", "arts", None, None),
+    ("museum exhibitions", "arts", None, None),
+    ("the opera", "arts", "classical", None),
+    ("a play downtown", None, None, None),
+    ("comedy shows tonight", "comedy", None, None),
+    ("stand-up comedy", "comedy", None, None),
+    ("improv nights", "comedy", None, None),
+    ("comedy clubs", "comedy", None, None),
+    ("family friendly events", "family", None, "yes"),
+    ("things to do with kids", "family", None, "yes"),
+    ("activities for toddlers", "family", None, "yes"),
+    ("all ages shows", None, None, "yes"),
+    ("kid friendly concerts", "music", None, "yes"),
+    ("movie screenings", "film", None, None),
+    ("film festival", "film", None, None),
+    ("food festivals", "food", None, None),
+    ("wine tasting", "food", None, None),
+    ("beer festival this weekend", "food", None, None),
+    ("a music festival", "music", None, None),
+    ("any festivals this weekend", None, None, None),
+    ("cooking classes", "food", None, None),
+    ("a workshop on pottery", "educational", None, None),
+    ("tech conferences", "technology", None, None),
+    ("networking events for startups", "business", None, None),
+    ("volunteer opportunities", "community", None, None),
+    ("hiking meetups", "outdoor", None, None),
+    ("yoga in the park", "wellness", None, None),
+    ("esports tournaments", "technology", None, None),
+    ("nightclubs open late", "nightlife", None, None),
+    ("parties this weekend", "nightlife", None, None),
+    ("vintage markets", "shopping", None, None),
+    ("craft fairs", "shopping", None, None),
+    ("what should I start with", None, None, None),
+    ("anything happening this weekend", None, None, None),
+    ("events nearby", None, None, None),
+    ("what's going on tonight", None, None, None),
+    ("something fun to do", None, None, None),
+    ("I'm bored", None, None, None),
+    ("what do you have for saturday", None, None, None),
+    ("show me more", None, None, None),
+    ("the best events in town", None, None, None),
+    ("I want to see taylor swift", None, None, None),
+    ("parking at the arena", None, None, None),
+    ("a party for my birthday", "nightlife", None, None),
+    ("starting soon", None, None, None),
+    ("something smart to do", None, None, None),
+    ("heart-warming shows", None, None, None),
+    ("country fair", "shopping", None, None),
+]
+
+
+def legacy_extract(text: str) -> dict:
+    """The previous extractor, minus keyword extraction."""
+    params = {"classificationName": None, "genreName": None, "familyFriendly": None}
+    text_lower = text.lower()
+    categories = {
+        "music": ["music", "concert", "concerts", "band", "singer", "musical", "gig", "performance", "live music"],
+        "sports": ["sports", "sport", "game", "match", "tournament", "competition", "athletic", "racing", "marathon"],
+        "arts": ["art", "arts", "theatre", "theater", "dance", "ballet", "opera", "gallery", "exhibition", "museum",
+                 "painting", "sculpture"],
+        "family": ["family", "kids", "children", "child", "parent", "toddler", "baby", "teen", "youth"],
+        "comedy": ["comedy", "comedian", "stand-up", "standup", "improv", "funny", "humor"],
+        "film": ["film", "movie", "cinema", "screening", "premiere", "documentary"],
+        "food": ["food", "dining", "culinary", "cooking", "tasting", "wine", "beer", "festival", "restaurant", "chef"],
+        "educational": ["learning", "workshop", "seminar", "class", "course", "lecture", "training", "education"],
+        "business": ["networking", "conference", "meetup", "professional", "business", "entrepreneur", "startup"],
+        "community": ["community", "neighborhood", "local", "charity", "volunteer", "social", "meetup"],
+        "outdoor": ["outdoor", "nature", "hiking", "camping", "adventure", "park", "garden", "beach"],
+        "wellness": ["wellness", "health", "fitness", "yoga", "meditation", "mindfulness", "spa"],
+        "technology": ["tech", "technology", "digital", "gaming", "esports", "virtual", "computer"],
+        "nightlife": ["club", "party", "dance", "DJ", "nightclub", "bar", "pub"],
+        "shopping": ["market", "fair", "bazaar", "shopping", "craft", "vintage", "antique", "pop-up"]
+    }
+    genres = {
+        "rock": ["rock", "alternative", "indie", "punk", "metal", "grunge"],
+        "pop": ["pop", "popular", "top 40", "mainstream"],
+        "hip-hop-rap": ["hip hop", "rap", "hip-hop", "r&b", "rhythm and blues"],
+        "country": ["country", "folk", "americana", "bluegrass"],
+        "jazz": ["jazz", "blues", "swing", "bebop", "fusion"],
+        "classical": ["classical", "orchestra", "symphony", "chamber", "opera"],
+        "electronic": ["electronic", "edm", "techno", "house", "trance", "dubstep"],
+        "world": ["world", "international", "global", "ethnic", "traditional"],
+        "latin": ["latin", "salsa", "reggaeton", "bachata", "merengue"],
+        "reggae": ["reggae", "ska", "dub", "caribbean"],
+        "experimental": ["experimental", "avant-garde", "contemporary", "modern"]
+    }
+    for category, keywords in categories.items():
+        if any(keyword in text_lower for keyword in keywords):
+            params["classificationName"] = category
+            break
+    for genre, keywords in genres.items():
+        if any(keyword in text_lower for keyword in keywords):
+            params["genreName"] = genre
+            break
+    family_keywords = ["family friendly", "kid friendly", "children", "family", "all ages", "kid", "child", "parent",
+                       "toddler", "baby", "teen", "youth"]
+    if any(keyword in text_lower for keyword in family_keywords):
+        params["familyFriendly"] = "yes"
+    return params
+
+
+def score(extract) -> dict:
+    fields = ("classificationName", "genreName", "familyFriendly")
+    correct = {field: 0 for field in fields}
+    all_correct = 0
+    misses = []
+    for query, *expected in LABELED:
+        params = extract(query)
+        got = [params.get(field) for field in fields]
+        for field, want, have in zip(fields, expected, got):
+            correct[field] += want == have
+        if got == expected:
+            all_correct += 1
+        else:
+            misses.append((query, tuple(expected), tuple(got)))
+    return {"all": all_correct, **correct, "misses": misses}
+
+
+def main() -> None:
+    queries = [query for query, *_ in LABELED]
+    print(f"{len(LABELED)} labeled queries")
+    print(f"{'extractor':>10} {'us/call':>8} {'all':>6} {'class':>6} {'genre':>6} {'family':>6}")
+    for name, extract in (("legacy", legacy_extract), ("index", extract_search_parameters)):
+        seconds = min(timeit.repeat(lambda: [extract(query) for query in queries], number=20, repeat=5))
+        result = score(extract)
+        n = len(LABELED)
+        print(f"{name:>10} {seconds / (20 * n) * 1e6:>8.1f} {result['all'] / n:>6.1%} "
+              f"{result['classificationName'] / n:>6.1%} {result['genreName'] / n:>6.1%} "
+              f"{result['familyFriendly'] / n:>6.1%}")
+        if "-v" in sys.argv:
+            for query, expected, got in result["misses"]:
+                print(f"    {query!r}: expected {expected}, got {got}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Build time and query latency of the spatial event index vs. scanning every cached event.
+
+Events are scattered around a handful of US cities (most within ~30 km of a
+center, like Discovery API results) and loaded into a GeoIndex; then random
+points near those centers are queried for everything within ``--radius-km``
+and for the ``--k`` nearest events. The brute-force columns compute the
+haversine distance to every event, which is what answering those questions
+from the event cache would cost without the index. Results are checked to
+match.
+
+Usage:
+    python benchmarks/bench_spatial.py [--sizes 10000,100000,1000000] [--queries 200] [--radius-km 3.2] [--k 20]
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geo import GeoIndex, haversine_km  # noqa: E402
+
+CENTERS = [(47.6062, -122.3321), (39.7392, -104.9903), (30.2672, -97.7431), (41.8781, -87.6298),
+           (42.3601, -71.0589), (25.7617, -80.1918), (45.5152, -122.6784), (33.7490, -84.3880)]
+
+
+def make_points(count: int, rng: random.Random):
+    """(key, lat, lon) around the centers: mostly within ~30 km, a few out in the suburbs."""
+    for i in range(count):
+        lat, lon = rng.choice(CENTERS)
+        spread = 0.25 if rng.random() < 0.9 else 1.0
+        yield i, lat + rng.gauss(0, spread / 2), lon + rng.gauss(0, spread / 2)
+
+
+def percentile(samples, q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * q), len(samples) - 1)]
+
+
+def brute_within(points, lat: float, lon: float, radius_km: float):
+    hits = [(haversine_km(lat, lon, p_lat, p_lon), key) for key, p_lat, p_lon in points]
+    return sorted(hit for hit in hits if hit[0] <= radius_km)
+
+
+def brute_nearest(points, lat: float, lon: float, k: int):
+    return heapq.nsmallest(k, ((haversine_km(lat, lon, p_lat, p_lon), key) for key, p_lat, p_lon in points))
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--brute-queries", type=int, default=5, help="brute-force scans per size (they're slow)")
+    parser.add_argument("--radius-km", type=float, default=3.2)
+    parser.add_argument("--k", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"radius {args.radius_km} km, k={args.k}; times in ms")
+    print(f"{'events':>8} {'build':>8} {'within p50':>10} {'p99':>7} {'knn p50':>8} {'p99':>7} "
+          f"{'brute within':>12} {'brute knn':>10} {'hits':>6}")
+    for size in (int(n) for n in args.sizes.split(",")):
+        rng = random.Random(size)
+        points = list(make_points(size, rng))
+        index = GeoIndex(cell_km=5)
+        start = time.perf_counter()
+        for key, lat, lon in points:
+            index.add(key, lat, lon, key)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        queries = [(lat + rng.gauss(0, 0.05), lon + rng.gauss(0, 0.05)) for lat, lon in
+                   (rng.choice(CENTERS) for _ in range(args.queries))]
+        within_ms, knn_ms, hits = [], [], 0
+        for lat, lon in queries:
+            elapsed, found = timed(index.within, lat, lon, args.radius_km)
+            within_ms.append(elapsed)
+            hits += len(found)
+            knn_ms.append(timed(index.nearest, lat, lon, args.k)[0])
+
+        brute_within_ms, brute_knn_ms = [], []
+        for lat, lon in queries[:args.brute_queries]:
+            elapsed, expected = timed(brute_within, points, lat, lon, args.radius_km)
+            brute_within_ms.append(elapsed)
+            assert [key for _, key in expected] == [key for _, key in index.within(lat, lon, args.radius_km)]
+            elapsed, expected = timed(brute_nearest, points, lat, lon, args.k)
+            brute_knn_ms.append(elapsed)
+            assert [key for _, key in expected] == [key for _, key in index.nearest(lat, lon, args.k)]
+
+        print(f"{size:>8} {build_ms:>8.0f} {percentile(within_ms, 0.5):>10.3f} {percentile(within_ms, 0.99):>7.3f} "
+              f"{percentile(knn_ms, 0.5):>8.3f} {percentile(knn_ms, 0.99):>7.3f} "
+              f"{percentile(brute_within_ms, 0.5):>12.1f} {percentile(brute_knn_ms, 0.5):>10.1f} "
+              f"{hits // len(queries):>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Measure time from process launch to the first byte of GET / under uvicorn.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_first_byte(timeout: float) -> float:
+    """Launch one server process and return seconds until GET / returns its first byte."""
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with httpx.stream("GET", f"http://127.0.0.1:{port}/", timeout=1.0) as response:
+                    next(response.iter_raw())
+                    return time.perf_counter() - start
+            except (httpx.TransportError, StopIteration):
+                time.sleep(0.01)
+        raise TimeoutError(f"Server did not respond within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    samples = [time_to_first_byte(args.timeout) for _ in range(args.runs)]
+    print(f"time to first byte over {args.runs} runs: "
+          f"median {statistics.median(samples) * 1000:.0f} ms, min {min(samples) * 1000:.0f} ms, max {max(samples) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
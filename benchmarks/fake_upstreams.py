@@ -0,0 +1,161 @@
+"""Local stand-ins for the Ticketmaster Discovery API, Nominatim and Gemini.
+
+One server answers all three, with the response shapes the app parses:
+
+    GET  /discovery/v2/events.json                          Ticketmaster search
+    GET  /search                                            Nominatim geocoding
+    POST /v1beta/models/{model}:generateContent             Gemini (REST)
+    POST /v1beta/models/{model}:streamGenerateContent       Gemini streaming (server-sent events)
+
+Latency and errors are injected per upstream. Point the app at it with
+TICKETMASTER_API_URL and NOMINATIM_DOMAIN/NOMINATIM_SCHEME; Gemini is reached
+through the HTTP model stand-in in bench_load.py.
+
+Usage:
+    python benchmarks/fake_upstreams.py --port 9100 --ticketmaster-latency 0.15 --gemini-error-rate 0.02
+"""
+import argparse
+import asyncio
+import json
+import random
+from typing import Dict
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+UPSTREAMS = ("ticketmaster", "nominatim", "gemini")
+SEGMENTS = [("Music", "Rock"), ("Music", "Pop"), ("Sports", "Basketball"), ("Arts & Theatre", "Theatre"),
+            ("Family", "Circus"), ("Music", "Jazz")]
+REPLY = ("There's a lot going on this week! From live music to food festivals, I can help you find "
+         "something that fits your mood. Which city should I look in?")
+
+
+class Fault:
+    """Latency and error injection for one upstream."""
+
+    def __init__(self, latency: float, jitter: float, error_rate: float, status: int = 500):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.status = status
+
+    async def delay(self) -> None:
+        await asyncio.sleep(max(self.latency + random.uniform(-self.jitter, self.jitter), 0))
+
+    def failed(self) -> bool:
+        return random.random() < self.error_rate
+
+
+def discovery_event(i: int, lat: float, lon: float) -> dict:
+    segment, genre = random.choice(SEGMENTS)
+    venue_id = f"fake-venue-{i % 50}"
+    return {
+        "name": f"Fake Event {i}", "type": "event", "id": f"fake-{i}",
+        "url": f"https://www.ticketmaster.com/event/fake-{i}", "locale": "en-us",
+        "info": "A simulated event served by the local Discovery API stand-in.",
+        "images": [{"ratio": "16_9", "url": f"https://example.com/fake/{i}_640.jpg", "width": 640, "height": 360},
+                   {"ratio": "3_2", "url": f"https://example.com/fake/{i}_1024.jpg", "width": 1024, "height": 683}],
+        "dates": {"start": {"localDate": "2030-06-01", "localTime": "20:00:00",
+                            "dateTime": f"2030-06-{1 + i % 28:02d}T03:00:00Z"}, "status": {"code": "onsale"}},
+        "classifications": [{"primary": True, "segment": {"name": segment}, "genre": {"name": genre}}],
+        "priceRanges": [{"type": "standard", "currency": "USD", "min": 25.0, "max": 95.0}],
+        "_links": {"self": {"href": f"/discovery/v2/events/fake-{i}"}},
+        "_embedded": {"venues": [{
+            "name": f"Fake Venue {i % 50}", "id": venue_id, "city": {"name": "Fakeville"},
+            "address": {"line1": f"{100 + i % 50} Main St"},
+            "location": {"latitude": str(lat + (i % 7) * 0.01), "longitude": str(lon - (i % 5) * 0.01)},
+        }]},
+    }
+
+
+def build_app(faults: Dict[str, Fault], total_events: int = 120) -> Starlette:
+    async def discovery(request: Request) -> Response:
+        fault = faults["ticketmaster"]
+        await fault.delay()
+        if fault.failed():
+            headers = {"Retry-After": "1"} if fault.status == 429 else None
+            return JSONResponse({"fault": {"faultstring": "injected error"}}, status_code=fault.status, headers=headers)
+        size = int(request.query_params.get("size", 20))
+        page = int(request.query_params.get("page", 0))
+        lat, lon = (float(part) for part in request.query_params.get("latlong", "47.6,-122.3").split(","))
+        first = page * size
+        events = [discovery_event(i, lat, lon) for i in range(first, min(first + size, total_events))]
+        total_pages = (total_events + size - 1) // size
+        body = {"page": {"size": size, "totalElements": total_events, "totalPages": total_pages, "number": page}}
+        if events:
+            body["_embedded"] = {"events": events}
+        return JSONResponse(body)
+
+    async def nominatim(request: Request) -> Response:
+        fault = faults["nominatim"]
+        await fault.delay()
+        if fault.failed():
+            return JSONResponse({"error": "injected error"}, status_code=fault.status)
+        query = request.query_params.get("q", "")
+        seed = sum(map(ord, query))
+        return JSONResponse([{
+            "place_id": seed, "lat": str(30 + seed % 15), "lon": str(-120 + seed % 40),
+            "display_name": f"{query}, United States", "type": "city", "importance": 0.6,
+        }])
+
+    def gemini_body(text: str) -> dict:
+        return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": 1, "index": 0}],
+                "usageMetadata": {"promptTokenCount": 50, "candidatesTokenCount": 30, "totalTokenCount": 80}}
+
+    async def gemini(request: Request) -> Response:
+        fault = faults["gemini"]
+        method = request.path_params["method"]
+        if fault.failed():
+            await fault.delay()
+            return JSONResponse({"error": {"code": fault.status, "message": "injected error", "status": "INTERNAL"}},
+                                status_code=fault.status)
+        if method == "streamGenerateContent":
+            # Same as the real API with alt=sse: one response object per event
+            words = REPLY.split(" ")
+            chunks = [" ".join(words[i:i + 6]) + " " for i in range(0, len(words), 6)]
+
+            async def stream():
+                for chunk in chunks:
+                    await asyncio.sleep(fault.latency / len(chunks))
+                    yield f"data: {json.dumps(gemini_body(chunk))}\r\n\r\n"
+            return StreamingResponse(stream(), media_type="text/event-stream")
+        await fault.delay()
+        return JSONResponse(gemini_body(REPLY))
+
+    return Starlette(routes=[
+        Route("/discovery/v2/events.json", discovery),
+        Route("/search", nominatim),
+        Route("/v1beta/models/{model}:{method}", gemini, methods=["POST"]),
+    ])
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--events", type=int, default=120, help="total events per search (pages of `size`)")
+    defaults = {"ticketmaster": 0.15, "nominatim": 0.1, "gemini": 0.4}
+    for name in UPSTREAMS:
+        parser.add_argument(f"--{name}-latency", type=float, default=defaults[name], help="seconds")
+        parser.add_argument(f"--{name}-jitter", type=float, default=defaults[name] / 4, help="+/- seconds")
+        parser.add_argument(f"--{name}-error-rate", type=float, default=0.0, help="0..1")
+        parser.add_argument(f"--{name}-error-status", type=int, default=429 if name == "ticketmaster" else 500)
+    return parser.parse_args(argv)
+
+
+def faults_from_args(args: argparse.Namespace) -> Dict[str, Fault]:
+    return {name: Fault(getattr(args, f"{name}_latency"), getattr(args, f"{name}_jitter"),
+                        getattr(args, f"{name}_error_rate"), getattr(args, f"{name}_error_status"))
+            for name in UPSTREAMS}
+
+
+def main() -> None:
+    import uvicorn
+    args = parse_args()
+    uvicorn.run(build_app(faults_from_args(args), args.events), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
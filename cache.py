@@ -0,0 +1,249 @@
+"""In-process caches used on the request path."""
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set
+
+
+class CacheEntry:
+    """A cached value with its freshness deadline and the end of its stale window."""
+
+    __slots__ = ("value", "fresh_until", "stale_until")
+
+    def __init__(self, value: Any, fresh_until: float, stale_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+    @property
+    def is_stale(self) -> bool:
+        return time.monotonic() >= self.fresh_until
+
+
+class TTLCache:
+    """Size-bounded LRU cache with per-entry TTL and an optional stale window.
+
+    An entry is fresh for ``ttl`` seconds, then stale (still returned, so the
+    caller can serve it while refreshing) for another ``stale_ttl`` seconds,
+    after which it is dropped.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300, stale_ttl: float = 0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._data: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get_entry(key, count=False) is not None
+
+    def get_entry(self, key: Hashable, count: bool = True) -> Optional[CacheEntry]:
+        """Return the entry for ``key`` (fresh or stale), or None if absent/expired."""
+        entry = self._data.get(key)
+        if entry is not None and time.monotonic() >= entry.stale_until:
+            del self._data[key]
+            self.counters["expirations"] += 1
+            entry = None
+        if entry is None:
+            if count:
+                self.counters["misses"] += 1
+            return None
+        self._data.move_to_end(key)
+        if count:
+            self.counters["stale_hits" if entry.is_stale else "hits"] += 1
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for ``key`` (fresh or stale) or ``default``."""
+        entry = self.get_entry(key)
+        return entry.value if entry is not None else default
+
+    def get_many(self, keys: Iterable[Hashable]) -> List[Any]:
+        """The cached value (fresh or stale) for each key, None for a miss; counted like ``get``.
+
+        Reads the clock once for the whole batch, for callers that look up
+        many small entries per request (event cards).
+        """
+        now = time.monotonic()
+        data, move_to_end = self._data, self._data.move_to_end
+        values = []
+        stale = expired = misses = 0
+        for key in keys:
+            entry = data.get(key)
+            if entry is not None and now >= entry.stale_until:
+                del data[key]
+                expired += 1
+                entry = None
+            if entry is None:
+                misses += 1
+                values.append(None)
+                continue
+            move_to_end(key)
+            if now >= entry.fresh_until:
+                stale += 1
+            values.append(entry.value)
+        counters = self.counters
+        counters["hits"] += len(values) - misses - stale
+        counters["stale_hits"] += stale
+        counters["misses"] += misses
+        counters["expirations"] += expired
+        return values
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        now = time.monotonic()
+        self._data[key] = CacheEntry(value, now + ttl, now + ttl + self.stale_ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["stale_hits"] + self.counters["misses"]
+        hits = self.counters["hits"] + self.counters["stale_hits"]
+        return {
+            **self.counters,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+        }
+
+
+class VariantCache:
+    """LRU/TTL cache that keeps up to ``variants`` alternative values per key.
+
+    ``get`` returns one of the stored values at random, so cached text replies
+    don't repeat word for word; ``needs_variants`` tells the caller whether it's
+    worth generating another one for the pool.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600, variants: int = 3):
+        self.variants = variants
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get(self, key: Hashable) -> Any:
+        pool: List[Any] = self._cache.get(key)
+        return random.choice(pool) if pool else None
+
+    def needs_variants(self, key: Hashable) -> bool:
+        entry = self._cache.get_entry(key, count=False)
+        return entry is None or len(entry.value) < self.variants
+
+    def add(self, key: Hashable, value: Any) -> None:
+        """Add a variant for ``key`` (ignored if identical to one already stored or the pool is full)."""
+        entry = self._cache.get_entry(key, count=False)
+        pool = list(entry.value) if entry is not None else []
+        if value in pool or len(pool) >= self.variants:
+            return
+        pool.append(value)
+        self._cache.set(key, pool)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._cache.stats(), "variants_per_key": self.variants}
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one.
+
+    The first caller (the leader) does the work; callers that arrive while it is
+    in flight wait for and share its result or exception.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.counters = {"leaders": 0, "coalesced": 0}
+
+    def inflight(self, key: Hashable) -> Optional[asyncio.Future]:
+        """Return the pending future for ``key`` if a leader is running, counting the caller as coalesced."""
+        future = self._calls.get(key)
+        if future is not None:
+            self.counters["coalesced"] += 1
+        return future
+
+    def begin(self, key: Hashable) -> asyncio.Future:
+        """Register the caller as leader for ``key``; it must call ``finish`` when done."""
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.counters["leaders"] += 1
+        return future
+
+    def finish(self, key: Hashable, result: Any = None, error: BaseException = None) -> None:
+        future = self._calls.pop(key, None)
+        if future is None or future.done():
+            return
+        if isinstance(error, asyncio.CancelledError):
+            future.cancel()
+        elif error is not None:
+            future.set_exception(error)
+            # Mark the exception as retrieved in case nobody was waiting
+            future.exception()
+        else:
+            future.set_result(result)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run ``fn()`` once for all concurrent callers with the same key."""
+        future = self.inflight(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        self.begin(key)
+        try:
+            result = await fn()
+        except BaseException as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, result)
+        return result
+
+
+class BackgroundRefresher:
+    """Run at most one background refresh per key and keep references to the tasks."""
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.counters = {"scheduled": 0, "skipped": 0, "failed": 0}
+
+    def schedule(self, key: Hashable, refresh: Callable[[], Awaitable[Any]]) -> bool:
+        """Start ``refresh()`` in the background unless one is already running for ``key``."""
+        if key in self._tasks:
+            self.counters["skipped"] += 1
+            return False
+
+        async def run():
+            try:
+                await refresh()
+            except Exception as e:
+                self.counters["failed"] += 1
+                print(f"Background refresh failed for {key}: {e}")
+            finally:
+                self._tasks.pop(key, None)
+
+        self._tasks[key] = asyncio.get_running_loop().create_task(run())
+        self.counters["scheduled"] += 1
+        return True
+
+    @property
+    def pending(self) -> Set[Hashable]:
+        return set(self._tasks)
+
+    async def drain(self) -> None:
+        """Wait for all in-flight refreshes (used on shutdown)."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
@@ -0,0 +1,265 @@
+"""City names in messages: exact matching in a single pass (Aho-Corasick) and typo-tolerant lookup."""
+import heapq
+import re
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+
+# Words close to a city name that messages use for something else ("events in august" isn't Augusta): times,
+# plus common words found to fuzzy-match a city (benchmarks/bench_city_resolver.py)
+NOT_PLACES = frozenset("""
+    january february march april may june july august september october november december
+    jan feb mar apr jun jul aug sep sept oct nov dec
+    monday tuesday wednesday thursday friday saturday sunday mon tue tues wed thu thur thurs fri sat sun
+    today tonight tomorrow weekend week month year morning afternoon evening night noon midnight
+    spring summer fall autumn winter christmas easter halloween thanksgiving holiday holidays
+    canyon
+""".split())
+
+
+class CityMatch(NamedTuple):
+    city: str
+    start: int
+    end: int
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class CityMatcher:
+    """Find every city name in a message with one linear scan.
+
+    The automaton is built once from the (lower-case) city names. Matches
+    follow the same rules as ``re.search(rf'\\b{city}\\b')``: a name only counts
+    when it isn't glued to other word characters. Overlapping matches are
+    resolved leftmost-longest, so "new york city" wins over "new york" and "york".
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+
+        for name in names:
+            node = 0
+            for ch in name.lower():
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(name.lower())
+
+        # Breadth-first pass to set failure links and merge outputs along them
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def _scan(self, text: str) -> List[CityMatch]:
+        """Return every (possibly overlapping) occurrence of a name in ``text``."""
+        matches = []
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for name in out[node]:
+                matches.append(CityMatch(name, i + 1 - len(name), i + 1))
+        return matches
+
+    def find_all(self, text: str, whole_words: bool = True) -> List[CityMatch]:
+        """Return non-overlapping city matches in ``text``, leftmost-longest first.
+
+        Positions refer to ``text.lower()``.
+        """
+        text = text.lower()
+        candidates = self._scan(text)
+        if whole_words:
+            candidates = [
+                m for m in candidates
+                if (m.start == 0 or not _is_word_char(text[m.start - 1]))
+                and (m.end == len(text) or not _is_word_char(text[m.end]))
+            ]
+        candidates.sort(key=lambda m: (m.start, m.start - m.end))
+
+        matches = []
+        last_end = 0
+        for match in candidates:
+            if match.start >= last_end:
+                matches.append(match)
+                last_end = match.end
+        return matches
+
+    def find(self, text: str, whole_words: bool = True) -> Optional[CityMatch]:
+        """Return the first (leftmost-longest) city match in ``text``, or None."""
+        matches = self.find_all(text, whole_words)
+        return matches[0] if matches else None
+
+
+class CityCandidate(NamedTuple):
+    """A city a phrase probably means, how sure we are (0-1) and the phrase it was read from."""
+    city: str
+    confidence: float
+    phrase: str
+
+
+_WORD = re.compile(r"[^\W_]+(?:[.'][^\W_]+)*\.?")
+
+
+def _normalize(text: str) -> str:
+    """Lower-case, with runs of anything but letters, digits and inner periods/apostrophes as single spaces."""
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def _trigrams(text: str) -> frozenset:
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Edits (insert, delete, substitute, swap neighbours) turning ``a`` into ``b``; ``limit + 1`` if over ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = ca != cb
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class FuzzyCityIndex:
+    """Resolve misspelled city names ("seatle", "pittsburg") and aliases ("nyc", "philly") to cities.
+
+    Every spelling is indexed by its character trigrams once, at startup. A
+    lookup gathers the spellings sharing enough trigrams with the phrase to
+    be within the allowed number of edits (one edit changes at most four
+    trigrams) and checks the best few with a bounded edit distance;
+    confidence is one minus the edits per character. A different first
+    letter is rarer in typos than in unrelated words ("range" and "orange"),
+    so those matches need ``first_letter_confidence``. Aliases of one or two
+    letters ("LA", "SF") only count when written in capitals, so they don't
+    fire on "la". Phrases made only of ``not_places`` words are never read
+    as a misspelled city.
+
+    ``find`` looks for a place where messages name one: after "in", "near",
+    "around", ..., or else a short reply that is nothing but the place.
+    """
+
+    def __init__(self, names: Iterable[str], aliases: Dict[str, str] = None, min_confidence: float = 0.8,
+                 first_letter_confidence: float = 0.85, min_length: int = 4, candidates: int = 8,
+                 prepositions: Sequence[str] = ("in", "near", "around", "at", "for", "to", "visiting"),
+                 not_places: Iterable[str] = NOT_PLACES):
+        self.min_confidence = min_confidence
+        self.not_places = frozenset(not_places)
+        self.first_letter_confidence = first_letter_confidence
+        self.min_length = min_length
+        self.candidates = candidates
+        self.prepositions = frozenset(prepositions)
+        self._spellings: List[Tuple[str, str]] = []  # (spelling, city)
+        self._exact: Dict[str, str] = {}
+        self._short_aliases = set()
+        self._postings: Dict[str, List[int]] = {}
+        spellings = [(name, name) for name in names] + list((aliases or {}).items())
+        for spelling, city in spellings:
+            spelling, city = _normalize(spelling), city.lower()
+            self._exact[spelling] = city
+            if len(spelling) <= 2:
+                self._short_aliases.add(spelling)
+            if len(spelling.replace(" ", "")) < min_length:
+                continue
+            index = len(self._spellings)
+            self._spellings.append((spelling, city))
+            for gram in _trigrams(spelling):
+                self._postings.setdefault(gram, []).append(index)
+
+    def __len__(self) -> int:
+        return len(self._spellings)
+
+    def resolve(self, phrase: str) -> Optional[CityCandidate]:
+        """The city ``phrase`` most likely names, or None if nothing is close enough."""
+        phrase = _normalize(phrase)
+        city = self._exact.get(phrase)
+        if city is not None:
+            return CityCandidate(city, 1.0, phrase)
+        if len(phrase.replace(" ", "")) < self.min_length or self.not_places.issuperset(phrase.split()):
+            return None
+        grams = _trigrams(phrase)
+        # The most edits any spelling may be away (the longest allowed spelling gives the most slack)
+        max_edits = int(len(phrase) * (1 - self.min_confidence) / self.min_confidence + 1e-9)
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for index in self._postings.get(gram, ()):
+                shared[index] = shared.get(index, 0) + 1
+        min_shared = len(grams) - 4 * max_edits
+        spellings = self._spellings
+        candidates = [index for index, count in shared.items()
+                      if count >= min_shared and abs(len(spellings[index][0]) - len(phrase)) <= max_edits]
+        best = None
+        for index in heapq.nlargest(self.candidates, candidates, key=shared.__getitem__):
+            spelling, city = self._spellings[index]
+            longest = max(len(phrase), len(spelling))
+            limit = int(longest * (1 - self.min_confidence) + 1e-9)
+            distance = edit_distance(phrase, spelling, limit)
+            if distance > limit:
+                continue
+            confidence = 1 - distance / longest
+            if spelling[0] != phrase[0] and confidence < self.first_letter_confidence:
+                continue
+            if best is None or confidence > best.confidence:
+                best = CityCandidate(city, round(confidence, 3), phrase)
+        return best
+
+    def _phrases(self, words: List[str], after_prepositions: bool) -> Iterable[str]:
+        if not after_prepositions:
+            yield from self._windows(words)
+            return
+        for i, word in enumerate(words[:-1]):
+            if word.lower() in self.prepositions:
+                yield from self._windows(words[i + 1:i + 4])
+
+    def _windows(self, words: List[str]) -> Iterable[str]:
+        for size in range(len(words), 0, -1):
+            window = words[:size]
+            if size == 1 and _normalize(window[0]) in self._short_aliases and not window[0].isupper():
+                continue
+            yield " ".join(window)
+
+    def find(self, text: str) -> Optional[CityCandidate]:
+        """The most confident city named where messages usually name one; ties go to the longer phrase.
+
+        Up to three words after each preposition are tried, longest first; a
+        message of three words or fewer with no city there is tried whole.
+        """
+        words = re.findall(r"[^\s,!?;:]+", text)
+        best = None
+        for after_prepositions in (True, False):
+            if not after_prepositions and len(words) > 3:
+                break
+            for phrase in self._phrases(words, after_prepositions):
+                candidate = self.resolve(phrase)
+                if candidate is not None and (best is None or candidate.confidence > best.confidence):
+                    best = candidate
+            if best is not None:
+                break
+        return best
@@ -0,0 +1,89 @@
+"""Negotiated brotli/gzip compression for dynamic responses."""
+import gzip
+from typing import Any, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from assets import accepted_encodings, brotli
+from metrics import Counter
+
+# Streams are left alone: compressing them would hold back events until a buffer fills
+UNCOMPRESSIBLE_TYPES = ("text/event-stream", "image/", "audio/", "video/", "application/zip", "application/gzip")
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete responses of at least ``minimum_size`` bytes.
+
+    Brotli is used when installed and accepted, else gzip. Levels favour speed
+    over ratio because every response is compressed on the request path.
+    Responses sent in several chunks, already encoded ones and streams pass
+    through untouched. ``outcomes`` counts responses by outcome (compressed,
+    too_small, skipped) and ``body_bytes`` counts bytes before ("in") and after
+    ("out") compression.
+    """
+
+    def __init__(self, app: Any, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4,
+                 outcomes: Optional[Counter] = None, body_bytes: Optional[Counter] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.outcomes = outcomes or Counter("compression_outcomes", "", ["outcome"])
+        self.body_bytes = body_bytes or Counter("compression_body_bytes", "", ["direction"])
+
+    def compress(self, body: bytes, coding: str) -> bytes:
+        if coding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if "br" in accepted and brotli is not None:
+            coding = "br"
+        elif "gzip" in accepted:
+            coding = "gzip"
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            content_type = headers.get("content-type", "")
+            if (message.get("more_body", False) or "content-encoding" in headers
+                    or content_type.startswith(UNCOMPRESSIBLE_TYPES)):
+                self.outcomes.inc("skipped")
+            elif len(body) < self.minimum_size:
+                self.outcomes.inc("too_small")
+            else:
+                compressed = self.compress(body, coding)
+                self.outcomes.inc("compressed")
+                self.body_bytes.inc("in", amount=len(body))
+                self.body_bytes.inc("out", amount=len(compressed))
+                headers["Content-Encoding"] = coding
+                headers["Content-Length"] = str(len(compressed))
+                headers.add_vary_header("Accept-Encoding")
+                message = {**message, "body": compressed}
+            passthrough = True
+            await send(start_message)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,217 @@
+"""Every event we've fetched, in a SQLite file with a full-text index for offline keyword search.
+
+Search pages are ingested as they arrive from Ticketmaster, upserted by
+event id; rows whose content hasn't changed are left alone, so refetching
+a page costs no index writes. Keyword and artist searches ("see taylor
+swift") around a place we've fetched events for are then answered from
+the FTS5 index over name, venue, genre and description, instead of going
+upstream.
+
+Events that have started, or that no search has returned for ``max_age``
+seconds (cancelled, moved, sold out of listing), are swept out as new
+pages are ingested.
+"""
+import asyncio
+import math
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from events import Event, decode_json, encode_json, event_from_list, event_to_list, utc_range
+from geo import KM_PER_DEGREE, haversine_km
+
+# Words the keyword extractor picks up around a name ("see taylor swift in ...") that would never match
+STOPWORDS = frozenset({"a", "an", "and", "at", "for", "in", "near", "of", "on", "or", "the", "this", "to",
+                       "today", "tonight", "tomorrow", "weekend", "next", "week", "month"})
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    name TEXT, venue TEXT, genre TEXT, description TEXT,
+    start_time TEXT, latitude REAL, longitude REAL,
+    version INTEGER, data BLOB, seen_at REAL
+);
+CREATE INDEX IF NOT EXISTS events_start_time ON events (start_time);
+CREATE INDEX IF NOT EXISTS events_seen_at ON events (seen_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+    name, venue, genre, description, content='events', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS events_ai AFTER INSERT ON events BEGIN
+    INSERT INTO events_fts (rowid, name, venue, genre, description)
+    VALUES (new.rowid, new.name, new.venue, new.genre, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS events_ad AFTER DELETE ON events BEGIN
+    INSERT INTO events_fts (events_fts, rowid, name, venue, genre, description)
+    VALUES ('delete', old.rowid, old.name, old.venue, old.genre, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS events_au AFTER UPDATE OF name, venue, genre, description ON events BEGIN
+    INSERT INTO events_fts (events_fts, rowid, name, venue, genre, description)
+    VALUES ('delete', old.rowid, old.name, old.venue, old.genre, old.description);
+    INSERT INTO events_fts (rowid, name, venue, genre, description)
+    VALUES (new.rowid, new.name, new.venue, new.genre, new.description);
+END;
+"""
+
+INSERT = """
+INSERT INTO events (id, name, venue, genre, description, start_time, latitude, longitude, version, data, seen_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+UPDATE = """
+UPDATE events SET name = ?, venue = ?, genre = ?, description = ?, start_time = ?, latitude = ?, longitude = ?,
+    version = ?, data = ?, seen_at = ?
+WHERE id = ?
+"""
+# SQLite's default cap on ? parameters is 999 in older builds
+LOOKUP_CHUNK = 500
+
+
+def fts_query(keyword: str) -> Optional[str]:
+    """An FTS5 query matching every meaningful word of ``keyword`` (the last as a prefix); None if there are none."""
+    words = [word for word in _TOKEN.findall(keyword.lower()) if word not in STOPWORDS]
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words[:-1]) + f' "{words[-1]}"*'
+
+
+def _row(event: Event, now: float) -> tuple:
+    venue = event.venue
+    return (event.id, event.name, venue.name, " ".join(filter(None, (event.category, event.genre))),
+            event.description, event.start_time.isoformat() if event.start_time else None,
+            venue.latitude, venue.longitude, event.version, encode_json(event_to_list(event)), now)
+
+
+class EventStore:
+    """Fetched events in a SQLite file, searchable by keyword within a radius and time window.
+
+    Writes go through ``ingest``; like the SQLite cache backend, the store
+    uses one connection on its own thread so disk I/O never blocks the event
+    loop.
+    """
+
+    def __init__(self, path: str, max_age: float = 86400, sweep_every: int = 50):
+        self.path = path
+        self.max_age = max_age
+        self.sweep_every = sweep_every
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="event-store")
+        self._db: Optional[sqlite3.Connection] = None
+        self._pending: List[Event] = []
+        self._batches = 0
+        self.counters = {"ingested": 0, "inserted": 0, "updated": 0, "swept": 0, "searches": 0, "hits": 0,
+                         "errors": 0}
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    async def _run(self, fn, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _ingest_sync(self, events: List[Event]) -> Tuple[int, int]:
+        """Upsert a batch; returns (inserted, updated). Unchanged events only get their seen_at bumped."""
+        now = time.time()
+        versions: Dict[str, int] = {}
+        for i in range(0, len(events), LOOKUP_CHUNK):
+            ids = [event.id for event in events[i:i + LOOKUP_CHUNK]]
+            versions.update(self.db.execute(
+                f"SELECT id, version FROM events WHERE id IN ({','.join('?' * len(ids))})", ids).fetchall())
+        new = [_row(event, now) for event in events if event.id not in versions]
+        changed = [_row(event, now) for event in events if event.id in versions and versions[event.id] != event.version]
+        unchanged = [(now, event.id) for event in events if versions.get(event.id) == event.version]
+        with self.db:
+            self.db.executemany(INSERT, new)
+            self.db.executemany(UPDATE, [(*row[1:], row[0]) for row in changed])
+            self.db.executemany("UPDATE events SET seen_at = ? WHERE id = ?", unchanged)
+        return len(new), len(changed)
+
+    def _sweep_sync(self) -> int:
+        with self.db:
+            cursor = self.db.execute("DELETE FROM events WHERE start_time < ? OR seen_at < ?",
+                                     (datetime.utcnow().isoformat(), time.time() - self.max_age))
+        return cursor.rowcount
+
+    def add(self, events: Iterable[Event]) -> None:
+        """Queue fetched events for the next ``ingest``. Events without an id are skipped."""
+        self._pending.extend(event for event in events if event.id)
+
+    async def ingest(self) -> None:
+        """Write queued events, in batches, until the queue is empty."""
+        while self._pending:
+            # Ticketmaster repeats events across pages and searches; the last copy wins
+            batch = list({event.id: event for event in self._pending}.values())
+            self._pending = []
+            try:
+                inserted, updated = await self._run(self._ingest_sync, batch)
+                self._batches += 1
+                if self._batches % self.sweep_every == 0:
+                    self.counters["swept"] += await self._run(self._sweep_sync)
+            except sqlite3.Error as e:
+                self.counters["errors"] += 1
+                print(f"Could not store events: {e}")
+                return
+            self.counters["ingested"] += len(batch)
+            self.counters["inserted"] += inserted
+            self.counters["updated"] += updated
+
+    def _search_sync(self, query: str, latitude: float, longitude: float, radius_km: float,
+                     start: datetime, end: datetime, limit: int) -> List[Event]:
+        dlat = radius_km / KM_PER_DEGREE
+        dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(min(abs(latitude) + dlat, 89.9))), 1e-6))
+        rows = self.db.execute(
+            "SELECT e.latitude, e.longitude, e.data FROM events_fts JOIN events e ON e.rowid = events_fts.rowid "
+            "WHERE events_fts MATCH ? AND e.start_time >= ? AND e.start_time < ? AND e.seen_at >= ? "
+            "AND e.latitude BETWEEN ? AND ? AND e.longitude BETWEEN ? AND ? "
+            "ORDER BY e.start_time",
+            (query, max(start, datetime.utcnow()).isoformat(), end.isoformat(), time.time() - self.max_age,
+             latitude - dlat, latitude + dlat, longitude - dlon, longitude + dlon)).fetchall()
+        events = []
+        for event_lat, event_lon, data in rows:
+            if haversine_km(latitude, longitude, event_lat, event_lon) <= radius_km:
+                events.append(event_from_list(decode_json(data)))
+                if len(events) == limit:
+                    break
+        return events
+
+    async def search(self, keyword: str, latitude: float, longitude: float, radius_km: float,
+                     date_range: Tuple[datetime, datetime], limit: int = 20) -> List[Event]:
+        """Stored events matching ``keyword`` within ``radius_km`` and the time window (local time), soonest first.
+
+        Returns an empty list on a miss, or if the store can't be read.
+        """
+        query = fts_query(keyword)
+        if query is None:
+            return []
+        self.counters["searches"] += 1
+        try:
+            events = await self._run(self._search_sync, query, latitude, longitude, radius_km, *utc_range(date_range),
+                                     limit)
+        except sqlite3.Error as e:
+            self.counters["errors"] += 1
+            print(f"Could not search stored events: {e}")
+            return []
+        if events:
+            self.counters["hits"] += 1
+        return events
+
+    def _size_sync(self) -> int:
+        return self.db.execute("SELECT count(*) FROM events").fetchone()[0]
+
+    async def size(self) -> int:
+        return await self._run(self._size_sync)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "pending": len(self._pending)}
+
+    async def close(self) -> None:
+        if self._db is not None:
+            await self._run(self._db.close)
+            self._db = None
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,184 @@
+"""Eventbrite events for the provider fan-out (see providers.py).
+
+Eventbrite's API has had no public search by location since 2020, so the
+provider follows a list of organizations (venues, promoters and community
+groups in the cities we serve) and filters their upcoming events by place,
+time and category itself. Each organization's listing is fetched at most
+once every ``ttl`` seconds, so a search normally costs no Eventbrite calls.
+"""
+import asyncio
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import httpx
+from dotenv import load_dotenv
+
+from cache import SingleFlight, TTLCache
+from event_store import STOPWORDS
+from events import Event, Venue, clip_description, format_price, utc_range
+from geo import haversine_km
+from providers import EventProvider, ProviderError, ProviderQuery, ProviderResult
+from sessions import REFINABLE_PARAMS, event_matches
+
+# Settings are read at import, so .env has to be loaded first whoever imports this module
+load_dotenv()
+EVENTBRITE_TOKEN = os.getenv('EVENTBRITE_TOKEN')
+EVENTBRITE_API_URL = os.getenv('EVENTBRITE_API_URL', "https://www.eventbriteapi.com/v3")
+# Comma-separated organization ids whose events are searched
+EVENTBRITE_ORGANIZATIONS = [org.strip() for org in os.getenv('EVENTBRITE_ORGANIZATIONS', '').split(',') if org.strip()]
+
+SOURCE = "eventbrite"
+PAGE_SIZE = 50
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def format_ticket_price(raw: Dict[str, Any]) -> str:
+    if raw.get('is_free'):
+        return "Free"
+    availability = raw.get('ticket_availability') or {}
+    low = _number((availability.get('minimum_ticket_price') or {}).get('major_value'))
+    high = _number((availability.get('maximum_ticket_price') or {}).get('major_value'))
+    return format_price([{'min': low, 'max': high}] if low is not None or high is not None else [])
+
+
+def normalize_eventbrite_event(raw: Dict[str, Any]) -> Optional[Event]:
+    """Build an Event from one Eventbrite event object (with venue and category expanded).
+
+    Returns None for online events and ones without a start time. Ids are
+    prefixed with "eventbrite:" so they never collide with Ticketmaster's.
+    """
+    start = (raw.get('start') or {}).get('utc')
+    if raw.get('online_event') or not start:
+        return None
+    start_time = datetime.fromisoformat(start.rstrip('Z'))
+    venue = raw.get('venue') or {}
+    address = venue.get('address') or {}
+    return Event(
+        id=f"{SOURCE}:{raw['id']}",
+        name=(raw.get('name') or {}).get('text') or 'Unnamed Event',
+        description=clip_description(raw.get('summary') or (raw.get('description') or {}).get('text')),
+        venue=Venue(venue.get('name', 'TBA'), address.get('address_1') or '', address.get('city') or '',
+                    _number(address.get('latitude') or venue.get('latitude')),
+                    _number(address.get('longitude') or venue.get('longitude')),
+                    id=f"{SOURCE}:{venue['id']}" if venue.get('id') else None),
+        start_time=start_time,
+        date=start_time.strftime("%Y-%m-%d"),
+        url=raw.get('url', ''),
+        category=(raw.get('category') or {}).get('name') or 'General',
+        genre=(raw.get('subcategory') or {}).get('name'),
+        price=format_ticket_price(raw),
+        image=(raw.get('logo') or {}).get('url'),
+        source=SOURCE,
+    )
+
+
+def keyword_matches(event: Event, words: Sequence[str]) -> bool:
+    """Whether every word is in the event's name, venue or description."""
+    text = f"{event.name} {event.venue.name} {event.description}".lower()
+    return all(word in text for word in words)
+
+
+class EventbriteProvider(EventProvider):
+    """Upcoming events of followed Eventbrite organizations near the searched place.
+
+    Searches with filters the provider can't check against a listing (only
+    classification, genre and keyword can be) return nothing rather than
+    unfiltered events. ``on_fetch`` is called with each freshly fetched
+    listing, so the app can index it like Ticketmaster results.
+    """
+
+    name = SOURCE
+
+    def __init__(self, client: Callable[[], httpx.AsyncClient], token: str, organizations: Sequence[str],
+                 api_url: str = EVENTBRITE_API_URL, ttl: float = 900, max_pages: int = 4,
+                 on_fetch: Callable[[List[Event]], None] = None):
+        self.client = client
+        self.token = token
+        self.organizations = list(organizations)
+        self.api_url = api_url.rstrip('/')
+        self.max_pages = max_pages
+        self.on_fetch = on_fetch
+        self._listings = TTLCache(maxsize=max(len(self.organizations), 1), ttl=ttl)
+        self._flights = SingleFlight()
+        self.counters = {"requests": 0, "errors": 0}
+
+    async def _fetch_organization(self, organization: str) -> List[Event]:
+        """Every upcoming in-person event of one organization, soonest first."""
+        events: List[Event] = []
+        params = {"status": "live", "time_filter": "current_future", "order_by": "start_asc",
+                  "expand": "venue,category,subcategory,ticket_availability", "page_size": PAGE_SIZE}
+        for _ in range(self.max_pages):
+            self.counters["requests"] += 1
+            response = await self.client().get(f"{self.api_url}/organizations/{organization}/events/",
+                                               params=params, headers={"Authorization": f"Bearer {self.token}"})
+            if response.status_code != 200:
+                self.counters["errors"] += 1
+                raise ProviderError(f"Eventbrite returned {response.status_code} for organization {organization}")
+            data = response.json()
+            for raw in data.get('events', []):
+                try:
+                    event = normalize_eventbrite_event(raw)
+                except Exception as e:
+                    print(f"Error processing Eventbrite event: {str(e)}")
+                    continue
+                if event is not None:
+                    events.append(event)
+            pagination = data.get('pagination') or {}
+            if not pagination.get('has_more_items') or not pagination.get('continuation'):
+                break
+            params = {**params, "continuation": pagination['continuation']}
+        if self.on_fetch is not None:
+            self.on_fetch(events)
+        return events
+
+    async def listing(self, organization: str) -> List[Event]:
+        """An organization's upcoming events, from the last fetch if it's recent enough."""
+        events = self._listings.get(organization)
+        if events is None:
+            async def fetch():
+                fetched = await self._fetch_organization(organization)
+                self._listings.set(organization, fetched)
+                return fetched
+
+            events = await self._flights.do(organization, fetch)
+        return events
+
+    async def search(self, query: ProviderQuery) -> ProviderResult:
+        if not REFINABLE_PARAMS.issuperset(set(query.params) - {"keyword"}):
+            return ProviderResult([])
+        listings = await asyncio.gather(*(self.listing(organization) for organization in self.organizations),
+                                        return_exceptions=True)
+        failed = [listing for listing in listings if isinstance(listing, BaseException)]
+        if failed and len(failed) == len(listings):
+            raise failed[0]
+
+        start, end = utc_range(query.date_range)
+        start = max(start, datetime.utcnow())
+        # The extracted keyword often runs on into the city ("hamilton in seattle")
+        skip = STOPWORDS | set(query.location.lower().split())
+        words = [word for word in query.params.get("keyword", "").lower().split() if word not in skip]
+        found = []
+        for listing in listings:
+            if isinstance(listing, BaseException):
+                continue
+            for event in listing:
+                latitude, longitude = event.coordinates
+                if latitude is None or longitude is None or not start <= event.start_time < end:
+                    continue
+                if haversine_km(query.latitude, query.longitude, latitude, longitude) > query.radius_km:
+                    continue
+                if event_matches(event, query.params) and keyword_matches(event, words):
+                    found.append(event)
+        found.sort(key=lambda event: event.start_time)
+        return ProviderResult(found[:query.limit])
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "organizations": len(self.organizations), "listings": self._listings.stats(),
+                "coalesced": self._flights.counters["coalesced"]}
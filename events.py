@@ -0,0 +1,247 @@
+"""Compact event model and the one normalizer for Ticketmaster Discovery API events."""
+import json
+import sys
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional: a faster decoder for large Discovery API pages
+    orjson = None
+
+DESCRIPTION_MAX_LENGTH = 200
+NO_PRICE = "Check website for prices"
+NO_DESCRIPTION = "No description available"
+DEFAULT_SOURCE = "ticketmaster"
+
+# Venues repeat across searches and pages, so normalized ones are shared by id
+_VENUES_MAX = 50000
+_venues: Dict[str, "Venue"] = {}
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value else value
+
+
+class Venue:
+    """Where an event takes place. Names, addresses and cities are interned."""
+
+    __slots__ = ("id", "name", "address", "city", "latitude", "longitude")
+
+    def __init__(self, name: str, address: str = "", city: str = "", latitude: float = None,
+                 longitude: float = None, id: str = None):
+        self.id = id
+        self.name = _intern(name)
+        self.address = _intern(address)
+        self.city = _intern(city)
+        self.latitude = latitude
+        self.longitude = longitude
+
+    @property
+    def label(self) -> str:
+        """Venue name and street address, as shown on event cards."""
+        return f"{self.name}, {self.address}" if self.address else self.name
+
+    def __repr__(self) -> str:
+        return f"Venue({self.name!r}, {self.city!r})"
+
+
+class Event:
+    """One event as cached and rendered.
+
+    Categories, genres and prices come from small vocabularies and are
+    interned, so thousands of cached events share the same string objects.
+    ``source`` names the provider the event was fetched from.
+    """
+
+    __slots__ = ("id", "name", "description", "venue", "start_time", "date", "url",
+                 "category", "genre", "price", "image", "source", "_version")
+
+    def __init__(self, name: str, venue: Venue, date: str, description: str = NO_DESCRIPTION, url: str = "",
+                 category: str = "General", genre: str = None, price: str = NO_PRICE, image: str = None,
+                 start_time: datetime = None, id: str = None, source: str = DEFAULT_SOURCE, version: int = None):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.venue = venue
+        self.start_time = start_time
+        self.date = _intern(date)
+        self.url = url
+        self.category = _intern(category)
+        self.genre = _intern(genre)
+        self.price = _intern(price)
+        self.image = image
+        self.source = _intern(source)
+        self._version = version
+
+    @property
+    def location(self) -> str:
+        return self.venue.label
+
+    @property
+    def coordinates(self) -> Tuple[float, float]:
+        return self.venue.latitude, self.venue.longitude
+
+    @property
+    def version(self) -> int:
+        """Checksum of everything a card shows; changes when Ticketmaster edits the event.
+
+        Stable across processes (unlike ``hash``), since it ends up in page markup.
+        Computed on first use and kept, since every card lookup needs it;
+        events don't change once built.
+        """
+        if self._version is None:
+            fields = (self.name, self.date, self.venue.label, self.price, self.category,
+                      self.description, self.url, self.image or "")
+            self._version = zlib.crc32("\x1f".join(fields).encode())
+        return self._version
+
+    def __repr__(self) -> str:
+        return f"Event({self.name!r}, {self.date!r}, {self.venue!r})"
+
+
+def format_price(price_ranges: List[Dict[str, Any]]) -> str:
+    if not price_ranges:
+        return NO_PRICE
+    low, high = price_ranges[0].get('min'), price_ranges[0].get('max')
+    if not low and not high:
+        return NO_PRICE
+    if low is None or high is None or low == high:
+        return f"${(low if low is not None else high):.2f}"
+    return f"${low:.2f} - ${high:.2f}"
+
+
+def pick_image(images: List[Dict[str, Any]]) -> Optional[str]:
+    """Prefer a wide 16:9 image, else the first one."""
+    for image in images:
+        if image.get('ratio') == '16_9' and image.get('width', 0) >= 640:
+            return image.get('url')
+    return images[0].get('url') if images else None
+
+
+def clip_description(text: Optional[str]) -> str:
+    """A description as stored on an event: trimmed, and cut to DESCRIPTION_MAX_LENGTH characters."""
+    description = (text or NO_DESCRIPTION).strip() or NO_DESCRIPTION
+    if len(description) > DESCRIPTION_MAX_LENGTH:
+        description = description[:DESCRIPTION_MAX_LENGTH - 3] + '...'
+    return description
+
+
+def utc_range(date_range: Tuple[datetime, datetime]) -> Tuple[datetime, datetime]:
+    """A search's time frame, in naive local time as parse_date_info makes it, as naive UTC like ``start_time``."""
+    return tuple(moment.astimezone(timezone.utc).replace(tzinfo=None) for moment in date_range)
+
+
+def normalize_venue(raw: Dict[str, Any], fallback_coordinates: Tuple[float, float] = (None, None)) -> Venue:
+    venue_id = raw.get('id')
+    if venue_id is not None:
+        venue = _venues.get(venue_id)
+        if venue is not None:
+            return venue
+
+    location = raw.get('location', {})
+    venue = Venue(
+        name=raw.get('name', 'TBA'),
+        address=raw.get('address', {}).get('line1', ''),
+        city=raw.get('city', {}).get('name', ''),
+        latitude=float(location['latitude']) if 'latitude' in location else fallback_coordinates[0],
+        longitude=float(location['longitude']) if 'longitude' in location else fallback_coordinates[1],
+        id=venue_id,
+    )
+    if venue_id is not None:
+        if len(_venues) >= _VENUES_MAX:
+            _venues.clear()
+        _venues[venue_id] = venue
+    return venue
+
+
+def normalize_event(raw: Dict[str, Any], fallback_coordinates: Tuple[float, float] = (None, None)) -> Event:
+    """Build an Event from one Discovery API event object."""
+    venues = raw.get('_embedded', {}).get('venues') or [{}]
+    start = raw.get('dates', {}).get('start', {})
+    start_time = None
+    if start.get('dateTime'):
+        # Always UTC "YYYY-MM-DDTHH:MM:SSZ"; fromisoformat is much cheaper than strptime
+        start_time = datetime.fromisoformat(start['dateTime'].rstrip('Z'))
+    classification = (raw.get('classifications') or [{}])[0]
+
+    description = clip_description(raw.get('description') or raw.get('info'))
+
+    return Event(
+        id=raw.get('id'),
+        name=raw.get('name', 'Unnamed Event'),
+        description=description,
+        venue=normalize_venue(venues[0], fallback_coordinates),
+        start_time=start_time,
+        date=start_time.strftime("%Y-%m-%d") if start_time else start.get('localDate', 'Date TBA'),
+        url=raw.get('url', ''),
+        category=classification.get('segment', {}).get('name', 'General'),
+        genre=classification.get('genre', {}).get('name'),
+        price=format_price(raw.get('priceRanges')),
+        image=pick_image(raw.get('images') or []),
+    )
+
+
+def normalize_events(raw_events: Iterable[Dict[str, Any]], fallback_coordinates: Tuple[float, float] = (None, None)) -> List[Event]:
+    """Normalize a list of Discovery API events, skipping any that are malformed."""
+    events = []
+    for raw in raw_events:
+        try:
+            events.append(normalize_event(raw, fallback_coordinates))
+        except Exception as e:
+            print(f"Error processing event: {str(e)}")
+    return events
+
+
+def decode_json(body: bytes) -> Any:
+    """Decode a JSON response body with orjson when it's installed."""
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def encode_json(value: Any) -> bytes:
+    """Compact JSON bytes, with orjson when it's installed."""
+    return orjson.dumps(value) if orjson is not None else json.dumps(value, separators=(",", ":")).encode()
+
+
+def event_to_list(event: Event) -> List[Any]:
+    """An event as a compact JSON-ready list, for caches shared between processes."""
+    venue = event.venue
+    return [event.id, event.name, event.description, event.start_time.isoformat() if event.start_time else None,
+            event.date, event.url, event.category, event.genre, event.price, event.image,
+            [venue.id, venue.name, venue.address, venue.city, venue.latitude, venue.longitude], event.source,
+            event.version]
+
+
+def event_from_list(fields: List[Any]) -> Event:
+    """Rebuild an event from ``event_to_list`` output, sharing venues already known by id."""
+    # Lists written before events had a source end at the venue (those all came from Ticketmaster), and ones
+    # written before the version was kept end at the source
+    event_id, name, description, start_time, date, url, category, genre, price, image, venue, *rest = fields
+    known = _venues.get(venue[0]) if venue[0] is not None else None
+    return Event(
+        id=event_id,
+        name=name,
+        description=description,
+        venue=known or Venue(venue[1], venue[2], venue[3], venue[4], venue[5], id=venue[0]),
+        start_time=datetime.fromisoformat(start_time) if start_time else None,
+        date=date,
+        url=url,
+        category=category,
+        genre=genre,
+        price=price,
+        image=image,
+        source=rest[0] if rest else DEFAULT_SOURCE,
+        version=rest[1] if len(rest) > 1 else None,
+    )
+
+
+def parse_discovery_page(body: bytes, fallback_coordinates: Tuple[float, float] = (None, None)) -> Tuple[List[Event], Dict[str, Any]]:
+    """Decode a Discovery API search response once and keep only what we render.
+
+    Returns the normalized events and the ``page`` block. Links, image
+    variants, sales and promoter data are dropped with the decoded payload.
+    """
+    data = decode_json(body)
+    raw_events = data.get('_embedded', {}).get('events', [])
+    return normalize_events(raw_events, fallback_coordinates), data.get('page', {})
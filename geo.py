@@ -0,0 +1,202 @@
+"""Distances and an in-memory spatial index for radius and nearest-event queries."""
+import heapq
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterator, List, NamedTuple, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+KM_PER_MILE = 1.609344
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoIndex:
+    """Items bucketed into a lat/lon grid of roughly ``cell_km`` cells (like geohash prefixes).
+
+    ``within`` scans only the cells overlapping the search circle and
+    ``nearest`` widens ring by ring until no unscanned cell could hold a
+    closer item, so queries cost about the number of items nearby rather
+    than the size of the index. Items are replaced by key and expire
+    ``ttl`` seconds after they were added; past ``maxsize`` the oldest go
+    first.
+    """
+
+    def __init__(self, cell_km: float = 5.0, maxsize: int = None, ttl: float = None):
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # cell -> {key: (lat radians, lon radians, cos lat, item)}
+        self._cells: Dict[Tuple[int, int], Dict[Hashable, tuple]] = {}
+        # key -> (cell, expires at), oldest first
+        self._keys: "OrderedDict[Hashable, Tuple[Tuple[int, int], float]]" = OrderedDict()
+        # Rows and columns that have held items (min row, max row, min column, max column); only ever grows
+        self._bounds: Optional[List[int]] = None
+        self.counters = {"added": 0, "expired": 0, "evicted": 0, "queries": 0, "scanned": 0}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def add(self, key: Hashable, lat: float, lon: float, item: Any) -> None:
+        self.discard(key)
+        cell = self._cell(lat, lon)
+        if self._bounds is None:
+            self._bounds = [cell[0], cell[0], cell[1], cell[1]]
+        else:
+            bounds = self._bounds
+            bounds[0], bounds[1] = min(bounds[0], cell[0]), max(bounds[1], cell[0])
+            bounds[2], bounds[3] = min(bounds[2], cell[1]), max(bounds[3], cell[1])
+        phi = math.radians(lat)
+        self._cells.setdefault(cell, {})[key] = (phi, math.radians(lon), math.cos(phi), item)
+        self._keys[key] = (cell, time.monotonic() + self.ttl if self.ttl is not None else math.inf)
+        self.counters["added"] += 1
+        if self.maxsize is not None and len(self._keys) > self.maxsize:
+            self._prune()
+
+    def discard(self, key: Hashable) -> None:
+        entry = self._keys.pop(key, None)
+        if entry is None:
+            return
+        bucket = self._cells[entry[0]]
+        del bucket[key]
+        if not bucket:
+            del self._cells[entry[0]]
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        # Oldest first, so expired keys are at the front unless TTLs were changed
+        for key in [key for key, (_, expires) in self._keys.items() if expires <= now]:
+            self.discard(key)
+            self.counters["expired"] += 1
+        while len(self._keys) > self.maxsize:
+            self.discard(next(iter(self._keys)))
+            self.counters["evicted"] += 1
+
+    def _scan(self, cells: Iterator[Tuple[int, int]], lat: float, lon: float) -> Iterator[Tuple[float, Any]]:
+        """(distance in km, item) for the live items in ``cells``."""
+        phi = math.radians(lat)
+        lam = math.radians(lon)
+        cos_phi = math.cos(phi)
+        now = time.monotonic()
+        sin, asin, sqrt = math.sin, math.asin, math.sqrt
+        keys = self._keys
+        scanned = 0
+        for cell in cells:
+            bucket = self._cells.get(cell)
+            if not bucket:
+                continue
+            scanned += len(bucket)
+            for key, (item_phi, item_lam, item_cos, item) in bucket.items():
+                if keys[key][1] <= now:
+                    continue
+                a = sin((item_phi - phi) / 2) ** 2 + cos_phi * item_cos * sin((item_lam - lam) / 2) ** 2
+                yield 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a))), item
+        self.counters["scanned"] += scanned
+
+    def _lon_span(self, lat: float, km: float) -> float:
+        """Degrees of longitude covering ``km`` at the widest latitude the search can reach."""
+        widest = min(abs(lat) + km / KM_PER_DEGREE, 89.9)
+        return km / (KM_PER_DEGREE * math.cos(math.radians(widest)))
+
+    def within(self, lat: float, lon: float, radius_km: float, limit: int = None) -> List[Tuple[float, Any]]:
+        """Items within ``radius_km`` of a point as (distance in km, item), nearest first."""
+        self.counters["queries"] += 1
+        dlat = radius_km / KM_PER_DEGREE
+        dlon = self._lon_span(lat, radius_km)
+        lat0, lon0 = self._cell(lat - dlat, lon - dlon)
+        lat1, lon1 = self._cell(lat + dlat, lon + dlon)
+        cells = ((i, j) for i in range(lat0, lat1 + 1) for j in range(lon0, lon1 + 1))
+        hits = [hit for hit in self._scan(cells, lat, lon) if hit[0] <= radius_km]
+        if limit is not None:
+            return heapq.nsmallest(limit, hits, key=lambda hit: hit[0])
+        hits.sort(key=lambda hit: hit[0])
+        return hits
+
+    def nearest(self, lat: float, lon: float, k: int, max_km: float = None) -> List[Tuple[float, Any]]:
+        """The ``k`` items nearest a point (optionally no further than ``max_km``), nearest first."""
+        self.counters["queries"] += 1
+        if not self._cells:
+            return []
+        center_i, center_j = self._cell(lat, lon)
+        cell_km = self.cell_deg * KM_PER_DEGREE
+        low_i, high_i, low_j, high_j = self._bounds
+        # Rings that miss every row and column that has held items are skipped
+        first_ring = max(low_i - center_i, center_i - high_i, low_j - center_j, center_j - high_j, 0)
+        last_ring = max(center_i - low_i, high_i - center_i, center_j - low_j, high_j - center_j)
+        best: List[Tuple[float, int, Any]] = []  # max-heap of the k nearest so far, by negated distance
+        counter = 0
+        ring = first_ring
+        while ring <= last_ring:
+            # The ring's square, clipped to the bounds: full top and bottom rows, then the sides between them
+            j0, j1 = max(center_j - ring, low_j), min(center_j + ring, high_j)
+            i0, i1 = max(center_i - ring + 1, low_i), min(center_i + ring - 1, high_i)
+            cells = [(i, j) for i in {center_i - ring, center_i + ring} if low_i <= i <= high_i
+                     for j in range(j0, j1 + 1)]
+            cells += [(i, j) for j in {center_j - ring, center_j + ring} if low_j <= j <= high_j
+                      for i in range(i0, i1 + 1)]
+            for distance, item in self._scan(cells, lat, lon):
+                if max_km is not None and distance > max_km:
+                    continue
+                counter += 1
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, counter, item))
+                elif -best[0][0] > distance:
+                    heapq.heapreplace(best, (-distance, counter, item))
+            # Anything in a later ring is at least this far away (east-west cells narrow with latitude)
+            covered = ring * cell_km * math.cos(math.radians(min(abs(lat) + (ring + 1) * self.cell_deg, 89.9)))
+            if (len(best) == k and -best[0][0] <= covered) or (max_km is not None and covered >= max_km):
+                break
+            ring += 1
+        return [(-negated, item) for negated, _, item in sorted(best, reverse=True)]
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "size": len(self._keys), "cells": len(self._cells), "maxsize": self.maxsize}
+
+
+class DistanceRequest(NamedTuple):
+    """What a message asks about distance: a radius (None to keep the search's) and/or results ordered by how close they are."""
+    radius_km: Optional[float]
+    by_distance: bool
+
+
+_RADIUS = re.compile(
+    r"\b(?:within|under|less than|in)\s+(?:a\s+)?(\d+(?:\.\d+)?)\s*-?\s*(miles?|mi|kilometers?|kilometres?|km)\b"
+    r"|\b(\d+(?:\.\d+)?)\s*-?\s*(miles?|mi|kilometers?|kilometres?|km)\s+(?:of|from|around|radius)\b",
+    re.IGNORECASE)
+_PROXIMITY = re.compile(
+    r"\b(?:closer|closest|nearer|nearest|nearby|close by|close to (?:me|downtown|the center|the centre)"
+    r"|downtown|walking distance|city cent(?:er|re))\b",
+    re.IGNORECASE)
+_WALKING = re.compile(r"\bwalking distance\b", re.IGNORECASE)
+# "within walking distance" without a number; "nearby" and "closer" only order by distance
+WALKING_RADIUS_KM = 5.0
+
+
+def parse_distance(text: str) -> Optional[DistanceRequest]:
+    """Find "within 5 miles", "10 km from", "closer to downtown" and the like; None if the message has none.
+
+    Only a distance ("within 2 miles") or "walking distance" narrows the
+    radius; "nearby" and "closer to downtown" keep it and sort by distance.
+    """
+    match = _RADIUS.search(text)
+    radius_km = None
+    if match:
+        amount, unit = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+        radius_km = float(amount) * (1.0 if unit.lower().startswith("k") else KM_PER_MILE)
+    by_distance = _PROXIMITY.search(text) is not None
+    if radius_km is None and not by_distance:
+        return None
+    if radius_km is None and _WALKING.search(text):
+        radius_km = WALKING_RADIUS_KM
+    return DistanceRequest(radius_km, by_distance)
@@ -0,0 +1,187 @@
+"""Geocoding with an offline gazetteer, a persistent SQLite cache and request coalescing."""
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from functools import partial
+from typing import Any, Dict, Optional
+
+DEFAULT_GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "city_coordinates.json")
+
+# Nominatim asks for at most one request per second
+NOMINATIM_MIN_INTERVAL = 1.0
+
+_MISSING = object()
+
+
+class GeocodeResult:
+    """Coordinates for a place name (same attribute names as geopy's Location)."""
+
+    __slots__ = ("latitude", "longitude", "address")
+
+    def __init__(self, latitude: float, longitude: float, address: str = ""):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.address = address
+
+    def __repr__(self) -> str:
+        return f"GeocodeResult({self.latitude}, {self.longitude}, {self.address!r})"
+
+
+def normalize_place(name: str) -> str:
+    """Normalize a place name for table and cache lookups."""
+    return " ".join(name.lower().split())
+
+
+class Geocoder:
+    """Resolve place names to coordinates, touching the network only as a last resort.
+
+    Lookups go through three layers in order:
+      1. the bundled gazetteer covering every name in ALLOWED_CITIES
+      2. a SQLite cache of earlier Nominatim answers (including misses) with a TTL
+      3. Nominatim itself, rate limited and with concurrent lookups of a name coalesced
+    """
+
+    def __init__(self, gazetteer_path: str = DEFAULT_GAZETTEER_PATH, cache_path: str = "geocode_cache.db",
+                 ttl: float = 30 * 24 * 3600, negative_ttl: float = 24 * 3600,
+                 user_agent: str = "event_chatbot", nominatim_domain: str = "nominatim.openstreetmap.org",
+                 nominatim_scheme: str = "https"):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.user_agent = user_agent
+        self.nominatim_domain = nominatim_domain
+        self.nominatim_scheme = nominatim_scheme
+        self.cache_path = cache_path
+        self.gazetteer = self._load_gazetteer(gazetteer_path)
+        self._nominatim = None
+        self._db = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._rate_lock = None
+        self._last_network_call = 0.0
+        self.counters = {
+            "gazetteer_hits": 0,
+            "cache_hits": 0,
+            "coalesced": 0,
+            "network_lookups": 0,
+            "network_errors": 0,
+            "misses": 0,
+        }
+
+    @staticmethod
+    def _load_gazetteer(path: str) -> Dict[str, GeocodeResult]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                table = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not load gazetteer from {path}: {e}")
+            return {}
+        return {name: GeocodeResult(lat, lon, name.title()) for name, (lat, lon) in table.items()}
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.cache_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                " name TEXT PRIMARY KEY, latitude REAL, longitude REAL, address TEXT, expires_at REAL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _cache_get(self, key: str) -> Any:
+        """Return a cached GeocodeResult, None for a cached miss, or _MISSING when absent/expired."""
+        row = self.db.execute(
+            "SELECT latitude, longitude, address, expires_at FROM geocode WHERE name = ?", (key,)
+        ).fetchone()
+        if row is None or row[3] < time.time():
+            return _MISSING
+        if row[0] is None:
+            return None
+        return GeocodeResult(row[0], row[1], row[2])
+
+    def _cache_put(self, key: str, result: Optional[GeocodeResult]) -> None:
+        ttl = self.ttl if result else self.negative_ttl
+        values = (result.latitude, result.longitude, result.address) if result else (None, None, None)
+        self.db.execute(
+            "INSERT OR REPLACE INTO geocode (name, latitude, longitude, address, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (key, *values, time.time() + ttl)
+        )
+        self.db.commit()
+
+    async def _lookup_network(self, name: str) -> Optional[GeocodeResult]:
+        if self._nominatim is None:
+            from geopy.geocoders import Nominatim
+            self._nominatim = Nominatim(user_agent=self.user_agent, domain=self.nominatim_domain,
+                                        scheme=self.nominatim_scheme)
+        if self._rate_lock is None:
+            self._rate_lock = asyncio.Lock()
+
+        async with self._rate_lock:
+            wait = self._last_network_call + NOMINATIM_MIN_INTERVAL - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_network_call = time.monotonic()
+
+        self.counters["network_lookups"] += 1
+        loop = asyncio.get_running_loop()
+        location = await loop.run_in_executor(None, partial(self._nominatim.geocode, name))
+        if not location:
+            return None
+        return GeocodeResult(location.latitude, location.longitude, location.address)
+
+    async def geocode(self, name: str) -> Optional[GeocodeResult]:
+        """Return coordinates for ``name`` or None if it can't be resolved."""
+        key = normalize_place(name)
+
+        result = self.gazetteer.get(key)
+        if result is not None:
+            self.counters["gazetteer_hits"] += 1
+            return result
+
+        cached = self._cache_get(key)
+        if cached is not _MISSING:
+            self.counters["cache_hits"] += 1
+            return cached
+
+        # Share one upstream lookup between concurrent callers asking for the same name
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.counters["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._lookup_network(name)
+            self._cache_put(key, result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            # Don't cache transient failures; waiters get None and the next call retries
+            print(f"Error geocoding {name}: {e}")
+            self.counters["network_errors"] += 1
+            result = None
+        finally:
+            self._inflight.pop(key, None)
+        if result is None:
+            self.counters["misses"] += 1
+        future.set_result(result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters plus the share of lookups that never left the process."""
+        lookups = self.counters["gazetteer_hits"] + self.counters["cache_hits"] + self.counters["coalesced"] + self.counters["network_lookups"]
+        offline = lookups - self.counters["network_lookups"]
+        return {
+            **self.counters,
+            "lookups": lookups,
+            "offline_ratio": round(offline / lookups, 4) if lookups else None,
+            "gazetteer_size": len(self.gazetteer),
+        }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
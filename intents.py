@@ -0,0 +1,117 @@
+"""Compiled intent classification for chat messages."""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Sequence
+
+from city_matcher import CityMatch, CityMatcher
+
+
+class IntentMatch(NamedTuple):
+    label: str
+    start: int
+    end: int
+
+
+@dataclass
+class IntentResult:
+    """Everything the chat handler needs to know about one message.
+
+    Spans refer to ``text`` (the lower-cased, stripped message).
+    """
+    text: str
+    event_query: Optional[IntentMatch] = None
+    more_results: Optional[IntentMatch] = None
+    time_only: Optional[IntentMatch] = None
+    greeting: Optional[IntentMatch] = None
+    moods: List[IntentMatch] = field(default_factory=list)
+    interests: List[IntentMatch] = field(default_factory=list)
+    event_keywords: bool = False
+    city: Optional[CityMatch] = None
+
+    @property
+    def mood(self) -> Optional[IntentMatch]:
+        return self.moods[0] if self.moods else None
+
+    @property
+    def interest(self) -> Optional[IntentMatch]:
+        return self.interests[0] if self.interests else None
+
+
+class IntentClassifier:
+    """Classify a message against every intent pattern group, compiled once.
+
+    Patterns of the same kind are folded into one alternation (one named group
+    per pattern) so each kind costs a single regex scan; keyword and phrase
+    checks are plain substring tests. ``re.search`` semantics are kept for the
+    free-text patterns and ``re.match`` semantics for the anchored time-only
+    patterns, so results match checking each pattern list separately. Moods
+    and interests are all reported, in the order of their pattern dicts.
+    """
+
+    def __init__(self, event_patterns: Sequence[str], greeting_patterns: Sequence[str],
+                 mood_patterns: Dict[str, str], interest_patterns: Dict[str, str],
+                 time_only_patterns: Sequence[str], event_keywords: FrozenSet[str] = frozenset(),
+                 interest_words: FrozenSet[str] = frozenset(), interest_verbs: FrozenSet[str] = frozenset(),
+                 event_phrases: FrozenSet[str] = frozenset(), affirmatives: FrozenSet[str] = frozenset(),
+                 more_patterns: Sequence[str] = (), city_matcher: CityMatcher = None):
+        self._time_only = self._alternation(time_only_patterns)
+        self._more = self._alternation(more_patterns) if more_patterns else None
+        self._event = self._alternation(event_patterns)
+        self._greeting = self._alternation(greeting_patterns)
+        # Every matching mood/interest is needed, so these stay one regex per label
+        self._moods = [(mood, re.compile(pattern)) for mood, pattern in mood_patterns.items()]
+        self._interests = [(interest, re.compile(pattern)) for interest, pattern in interest_patterns.items()]
+        self._keywords = tuple(sorted(event_keywords | event_phrases, key=len))
+        self._interest_words = interest_words
+        self._interest_verbs = interest_verbs
+        self._affirmatives = tuple(affirmatives)
+        self._city_matcher = city_matcher
+
+    @staticmethod
+    def _alternation(patterns: Sequence[str]):
+        """Compile patterns into one regex; returns (regex, group name -> pattern)."""
+        labels = {f"g{i}": pattern for i, pattern in enumerate(patterns)}
+        regex = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in labels.items()))
+        return regex, labels
+
+    @staticmethod
+    def _span(match, labels: Dict[str, str]) -> Optional[IntentMatch]:
+        if match is None:
+            return None
+        return IntentMatch(labels[match.lastgroup], match.start(), match.end())
+
+    def classify(self, message: str) -> IntentResult:
+        text = message.lower().strip()
+        result = IntentResult(text=text)
+
+        regex, labels = self._time_only
+        result.time_only = self._span(regex.match(text), labels)
+        if self._more is not None:
+            regex, labels = self._more
+            result.more_results = self._span(regex.search(text), labels)
+        regex, labels = self._event
+        result.event_query = self._span(regex.search(text), labels)
+        regex, labels = self._greeting
+        result.greeting = self._span(regex.search(text), labels)
+
+        for mood, regex in self._moods:
+            match = regex.search(text)
+            if match:
+                result.moods.append(IntentMatch(mood, match.start(), match.end()))
+        for interest, regex in self._interests:
+            match = regex.search(text)
+            if match:
+                result.interests.append(IntentMatch(interest, match.start(), match.end()))
+
+        words = text.split()
+        word_set = set(words)
+        result.event_keywords = (
+            bool(word_set & self._interest_verbs and word_set & self._interest_words)
+            or any(keyword in text for keyword in self._keywords)
+            # Short affirmative replies ("sure", "yes please") count as wanting events
+            or (len(words) <= 3 and any(word in text for word in self._affirmatives))
+        )
+
+        if self._city_matcher is not None:
+            result.city = self._city_matcher.find(text)
+        return result
@@ -1,52 +1,346 @@
-from fastapi import FastAPI, Form, Request, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Form, Request, Response, HTTPException
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
-import json
+from markupsafe import Markup, escape
 import os
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
-import requests
+import httpx
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from typing import List, Dict, Any, Tuple
+# Load environment variables before the local imports, some of which read their settings at import
+load_dotenv()
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple, AsyncIterator, Iterable
 import traceback
 import re
 import calendar
 import random
+import asyncio
+import time
+import hashlib
+import socket
+from functools import partial
+from geocoding import Geocoder
+from backends import BackendError, create_backend
+from cache import CacheEntry, TTLCache, VariantCache, SingleFlight, BackgroundRefresher
+from city_matcher import CityMatcher, CityMatch, FuzzyCityIndex
+from intents import IntentClassifier, IntentResult
+from pagination import CursorStore, EventPage, SearchState, SharedCursorStore, decode_page, encode_page, make_cursor
+from warmer import CacheWarmer, WarmTarget
+from ratelimit import Priority, RateLimited, RateLimiter, SharedRateLimiter
+from events import Event, Venue, parse_discovery_page, utc_range
+from event_store import EventStore
+from eventbrite_api import EVENTBRITE_ORGANIZATIONS, EVENTBRITE_TOKEN, EventbriteProvider
+from geo import KM_PER_MILE, DistanceRequest, GeoIndex, haversine_km, parse_distance
+from ticketmaster import TICKETMASTER_API_KEY, TICKETMASTER_API_URL
+from metrics import SIZE_BUCKETS, EventLoopLagMonitor, MetricsRegistry, RequestMetricsMiddleware
+from compression import CompressionMiddleware
+from providers import EventProvider, ProviderError, ProviderFanOut, ProviderQuery, ProviderResult, SearchPending
+from search_params import SearchParamIndex, extract_keyword
+from sessions import DEFAULT_RADIUS_KM, REFINABLE_PARAMS, LastSearch, Session, SessionStore, SharedSessionStore, event_matches
+from assets import REVALIDATE, Asset, AssetStore
 # from gpt4all import GPT4All # Commented out for Gemini API
-import google.generativeai as genai # Added for Gemini API
-
-# Load environment variables
-load_dotenv()
-
-# Configure Google Gemini API
-genai.configure(api_key=os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")) # Prefer GEMINI_API_KEY, fallback to GOOGLE_API_KEY
-
-try:
-    print("Listing available Gemini models...")
-    for m in genai.list_models():
-        if 'generateContent' in m.supported_generation_methods:
-            print(f"  Found model: {m.name} (supports generateContent)")
-except Exception as e:
-    print(f"Error listing Gemini models: {e}")
-    print("Please ensure your API key is correct and has the necessary permissions.")
-
-gemini_model = genai.GenerativeModel('models/gemini-1.5-pro-latest') # Updated to use the latest Pro model
+# google.generativeai is imported lazily in get_gemini_model() (it's slow to import)
+
+# Google Gemini API (configured on first use, not at import)
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY") # Prefer GEMINI_API_KEY, fallback to GOOGLE_API_KEY
+GEMINI_MODEL_NAME = 'models/gemini-1.5-pro-latest' # Updated to use the latest Pro model
+gemini_model = None
+
+def get_gemini_model() -> Any:
+    """Configure Gemini and build the model on first use; None if no API key is set."""
+    global gemini_model
+    if gemini_model is None and GEMINI_API_KEY:
+        import google.generativeai as genai
+        genai.configure(api_key=GEMINI_API_KEY)
+        gemini_model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+    return gemini_model
 
 # Initialize GPT4All # Commented out
 # print("Initializing GPT4All model...") # Commented out
 # model = GPT4All("mistral-7b-instruct-v0.1.Q4_0.gguf") # Commented out
 # print("Model initialized successfully") # Commented out
 
-app = FastAPI()
+# Shared HTTP client for upstream APIs (connection pooling, keep-alive)
+http_client: httpx.AsyncClient = None
 
-# Initialize geopy
-geolocator = Nominatim(user_agent="event_chatbot")
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared async HTTP client, creating it on first use."""
+    global http_client
+    if http_client is None or http_client.is_closed:
+        http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
+    return http_client
+
+# Last result of the background upstream check (see check_upstreams)
+upstream_status: Dict[str, Any] = {"checked_at": None, "upstreams": {}}
+
+# Metrics served at /metrics in Prometheus text format
+metrics_registry = MetricsRegistry()
+REQUEST_SECONDS = metrics_registry.histogram(
+    "eventbot_request_duration_seconds", "Time to send the full response, by route.", ["path"])
+RESPONSES = metrics_registry.counter("eventbot_responses_total", "Responses sent, by route and status.", ["path", "status"])
+RESPONSE_BYTES = metrics_registry.histogram(
+    "eventbot_response_bytes", "Response body bytes on the wire, by route and content encoding.",
+    ["path", "encoding"], buckets=SIZE_BUCKETS)
+COMPRESSION = metrics_registry.counter(
+    "eventbot_compression_total", "Responses by compression outcome (compressed, too_small, skipped).", ["outcome"])
+COMPRESSION_BYTES = metrics_registry.counter(
+    "eventbot_compression_bytes_total", "Bytes before (in) and after (out) response compression.", ["direction"])
+STAGE_SECONDS = metrics_registry.histogram(
+    "eventbot_stage_duration_seconds",
+    "Time spent in each chat pipeline stage (classify, geocode, event_store, providers, ticketmaster, parse, gemini_reply, gemini_intro, render).",
+    ["stage"])
+UPSTREAM_REQUESTS = metrics_registry.counter(
+    "eventbot_upstream_requests_total", "Upstream API calls by outcome.", ["upstream", "outcome"])
+FALLBACKS = metrics_registry.counter(
+    "eventbot_fallbacks_total", "Responses served from fallbacks (mock_events, template_reply).", ["kind"])
+SEARCHES = metrics_registry.counter(
+    "eventbot_searches_total",
+    "Event searches, by source (refined: filtered from the session's last results; nearby: from the spatial index; "
+    "stored: keyword searches answered from the event store).",
+    ["source"])
+LOCATIONS = metrics_registry.counter(
+    "eventbot_locations_total", "Cities read from messages, by how (exact, pattern, alias, fuzzy).", ["match"])
+LOOP_LAG_SECONDS = metrics_registry.histogram(
+    "eventbot_event_loop_lag_seconds", "How late the event loop woke a sleeping task.")
+loop_lag_monitor = EventLoopLagMonitor(LOOP_LAG_SECONDS)
+
+def cache_lookup_samples():
+    caches = {"events": event_cache.stats(), "llm": llm_cache.stats(), "cursors": cursor_store.stats(),
+              "cards": card_cache.stats()}
+    for name, stats in caches.items():
+        for result in ("hits", "stale_hits", "misses"):
+            yield (name, result), stats[result]
+    geocoding = geocoder.stats()
+    for result in ("gazetteer_hits", "cache_hits", "coalesced", "network_lookups", "misses"):
+        yield ("geocode", result), geocoding[result]
+
+def cache_hit_ratio_samples():
+    yield ("events",), event_cache.stats()["hit_ratio"]
+    yield ("llm",), llm_cache.stats()["hit_ratio"]
+    yield ("cards",), card_cache.stats()["hit_ratio"]
+    yield ("geocode",), geocoder.stats()["offline_ratio"]
+
+def ticketmaster_limiter_samples():
+    for result in ("allowed", "throttled", "rejected", "upstream_429"):
+        yield (result,), ticketmaster_limiter.counters[result]
+    yield ("coalesced",), event_flights.counters["coalesced"]
+
+metrics_registry.callback("eventbot_cache_lookups_total", "Cache lookups by cache and result.", "counter",
+                          ["cache", "result"], cache_lookup_samples)
+metrics_registry.callback("eventbot_cache_hit_ratio", "Share of lookups served from cache (geocode: without network).",
+                          "gauge", ["cache"], cache_hit_ratio_samples)
+metrics_registry.callback("eventbot_ticketmaster_calls_total", "Ticketmaster limiter decisions and coalesced calls.",
+                          "counter", ["result"], ticketmaster_limiter_samples)
+
+def provider_samples():
+    for provider, outcomes in event_providers.outcomes.items():
+        for outcome, count in outcomes.items():
+            yield (provider, outcome), count
+
+metrics_registry.callback("eventbot_provider_results_total",
+                          "Event provider answers in fan-out searches, by outcome (ok, empty, unused, late, error).",
+                          "counter", ["provider", "outcome"], provider_samples)
+
+def session_samples():
+    # Only known for the in-process store; a shared backend expires sessions itself
+    stats = session_store.stats()
+    yield ("count",), stats.get("size")
+    yield ("bytes",), stats.get("bytes")
+
+metrics_registry.callback("eventbot_sessions", "Live conversation sessions and their estimated memory.", "gauge",
+                          ["measure"], session_samples)
+metrics_registry.callback("eventbot_event_loop_lag_last_seconds", "Most recent event loop lag sample.", "gauge",
+                          [], lambda: [((), loop_lag_monitor.last_lag)])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the shared HTTP client on startup and close it on shutdown."""
+    get_http_client()
+    # Probe upstreams in the background so startup never waits on the network
+    check_task = asyncio.create_task(check_upstreams()) if UPSTREAM_CHECK_ENABLED else None
+    if not cache_backend.shared and int(os.getenv("WEB_CONCURRENCY", 1)) > 1:
+        print("Warning: several workers with CACHE_BACKEND=memory; each has its own caches and Ticketmaster quota")
+    if WARMER_ENABLED:
+        cache_warmer.start()
+    loop_lag_monitor.start()
+    yield
+    await loop_lag_monitor.stop()
+    await cache_warmer.stop()
+    if check_task is not None and not check_task.done():
+        check_task.cancel()
+    await event_providers.drain()
+    await event_refresher.drain()
+    await event_ingests.drain()
+    await llm_refresher.drain()
+    if http_client is not None:
+        await http_client.aclose()
+    geocoder.close()
+    await event_store.close()
+    await cache_backend.close()
+
+# Responses of at least COMPRESS_MIN_SIZE bytes are sent brotli- or gzip-compressed when the client accepts it
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+
+app = FastAPI(lifespan=lifespan)
+# Added first so it runs inside the metrics middleware, which then sees bytes as sent
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESS_MIN_SIZE, outcomes=COMPRESSION,
+                   body_bytes=COMPRESSION_BYTES)
+app.add_middleware(RequestMetricsMiddleware, duration=REQUEST_SECONDS, responses=RESPONSES,
+                   paths=["/", "/chat", "/chat/stream", "/events/more", "/ready", "/stats", "/metrics"],
+                   response_bytes=RESPONSE_BYTES)
+
+# Initialize geocoder (offline gazetteer for ALLOWED_CITIES, SQLite cache, then Nominatim)
+geocoder = Geocoder(
+    cache_path=os.getenv("GEOCODE_CACHE_PATH", "geocode_cache.db"),
+    nominatim_domain=os.getenv("NOMINATIM_DOMAIN", "nominatim.openstreetmap.org"),
+    nominatim_scheme=os.getenv("NOMINATIM_SCHEME", "https")
+)
+
+async def geocode(location: str) -> Any:
+    """Geocode a location without blocking the event loop."""
+    with STAGE_SECONDS.time("geocode"):
+        return await geocoder.geocode(location)
+
+# State shared by all worker processes: cached search pages, cursors, sessions and the Ticketmaster quota.
+# memory (the default) suits a single worker; use sqlite:///<path> for several workers on one host or
+# redis://<host>:6379/0 for several hosts. Per-process caches stay in front of it.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+cache_backend = create_backend(CACHE_BACKEND)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Discovery API limits: about 5 requests/second and a daily quota, shared by every caller
+TICKETMASTER_RATE_LIMIT = float(os.getenv('TICKETMASTER_RATE_LIMIT', 5))
+TICKETMASTER_DAILY_QUOTA = int(os.getenv('TICKETMASTER_DAILY_QUOTA', 5000))
+# New searches ask every event provider at once and show what has arrived after PROVIDER_DEADLINE seconds.
+# A user's search queues for a Ticketmaster token for at most half of that, leaving the rest for the call itself,
+# so a throttled search is reported as such instead of just running late.
+PROVIDER_DEADLINE = float(os.getenv('PROVIDER_DEADLINE', 2.5))
+TICKETMASTER_MAX_WAITS = {
+    Priority.INTERACTIVE: min(RateLimiter.DEFAULT_MAX_WAITS[Priority.INTERACTIVE], PROVIDER_DEADLINE / 2)
+}
 
-# API Configuration
-TICKETMASTER_API_KEY = os.getenv('TICKETMASTER_API_KEY', 'NcUvrnDN536mgv3soGAziWR6KNalhfno')
-TICKETMASTER_API_URL = "https://app.ticketmaster.com/discovery/v2/events.json"
+if cache_backend.shared:
+    ticketmaster_limiter = SharedRateLimiter(cache_backend, "ticketmaster", rate=TICKETMASTER_RATE_LIMIT,
+                                             daily_limit=TICKETMASTER_DAILY_QUOTA, max_waits=TICKETMASTER_MAX_WAITS)
+else:
+    ticketmaster_limiter = RateLimiter(rate=TICKETMASTER_RATE_LIMIT, daily_limit=TICKETMASTER_DAILY_QUOTA,
+                                       max_waits=TICKETMASTER_MAX_WAITS)
+
+# Gemini reply cache: up to LLM_CACHE_VARIANTS replies per normalized prompt + context
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 3600))
+LLM_CACHE_MAXSIZE = int(os.getenv('LLM_CACHE_MAXSIZE', 1024))
+LLM_CACHE_VARIANTS = int(os.getenv('LLM_CACHE_VARIANTS', 3))
+
+llm_cache = VariantCache(maxsize=LLM_CACHE_MAXSIZE, ttl=LLM_CACHE_TTL, variants=LLM_CACHE_VARIANTS)
+llm_flights = SingleFlight()
+llm_refresher = BackgroundRefresher()
+
+# Cache warming for the most requested cities (set WARMER=0 to disable)
+WARMER_ENABLED = os.getenv('WARMER', '1') != '0'
+WARM_INTERVAL = int(os.getenv('WARM_INTERVAL', 60))
+WARM_REFRESH_MARGIN = WARM_INTERVAL * 1.5
+# Time windows as phrased to parse_date_info ("" is the default 30 days)
+WARM_WINDOWS = ["today", "this weekend", "next week", ""]
+
+cache_warmer = CacheWarmer(
+    refresh=lambda target: warm_target(target),
+    needs_refresh=lambda target: warm_target_needs_refresh(target),
+    windows=WARM_WINDOWS,
+    top_cities=int(os.getenv('WARM_TOP_CITIES', 5)),
+    top_classifications=int(os.getenv('WARM_TOP_CLASSIFICATIONS', 2)),
+    budget_per_hour=int(os.getenv('WARM_BUDGET_PER_HOUR', 60)),
+    interval=WARM_INTERVAL,
+    seed_cities=[city.strip().lower() for city in os.getenv('WARM_SEED_CITIES', '').split(',') if city.strip()],
+    should_run=(lambda: claim_warm_cycle()) if cache_backend.shared else None
+)
+
+# Background upstream check on startup (set UPSTREAM_CHECK=0 to disable)
+UPSTREAM_CHECK_ENABLED = os.getenv('UPSTREAM_CHECK', '1') != '0'
+UPSTREAM_CHECK_TIMEOUT = 10.0
+
+# Ticketmaster search result cache (fresh for EVENT_CACHE_TTL, then served stale while refreshing)
+EVENT_CACHE_TTL = int(os.getenv('EVENT_CACHE_TTL', 300))
+EVENT_CACHE_STALE_TTL = int(os.getenv('EVENT_CACHE_STALE_TTL', 1800))
+EVENT_CACHE_MAXSIZE = int(os.getenv('EVENT_CACHE_MAXSIZE', 2048))
+EVENT_CACHE_LATLONG_PRECISION = 2  # ~1 km
+
+event_cache = TTLCache(maxsize=EVENT_CACHE_MAXSIZE, ttl=EVENT_CACHE_TTL, stale_ttl=EVENT_CACHE_STALE_TTL)
+event_refresher = BackgroundRefresher()
+# Every cached event by venue location, for "within 2 miles" and "closer to downtown" follow-ups
+EVENT_INDEX_MAXSIZE = int(os.getenv('EVENT_INDEX_MAXSIZE', 50000))
+event_index = GeoIndex(cell_km=5, maxsize=EVENT_INDEX_MAXSIZE, ttl=EVENT_CACHE_TTL + EVENT_CACHE_STALE_TTL)
+# Every fetched event on disk with a full-text index, so keyword and artist searches can skip Ticketmaster.
+# Events drop out once started or when no search has returned them for EVENT_STORE_MAX_AGE seconds.
+event_store = EventStore(os.getenv('EVENT_STORE_PATH', 'events.db'),
+                         max_age=int(os.getenv('EVENT_STORE_MAX_AGE', 86400)))
+event_ingests = BackgroundRefresher()
+event_flights = SingleFlight()
+# Eventbrite organization listings are refetched every EVENTBRITE_TTL seconds
+EVENTBRITE_TTL = int(os.getenv('EVENTBRITE_TTL', 900))
+# Sample events are only shown when no real event provider is configured, never in place of real listings
+SAMPLE_EVENTS_ONLY = not TICKETMASTER_API_KEY and not (EVENTBRITE_TOKEN and EVENTBRITE_ORGANIZATIONS)
+# With a shared backend, only one worker at a time refreshes a stale page
+REFRESH_LOCK_TTL = 30
+
+# Event card markup: autoescaped templates compiled once at import, plus rendered cards
+# keyed by event id and content version so popular cards are built once
+templates = Jinja2Templates(directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates"))
+event_card_template = templates.get_template("event_card.html")
+events_response_template = templates.get_template("events_response.html")
+more_button_macro = templates.get_template("more_button.html").module.more_button
+CARD_CACHE_MAXSIZE = int(os.getenv('CARD_CACHE_MAXSIZE', 4096))
+# Cards show this much of the description; the rest loads when "more" is tapped
+CARD_SUMMARY_LENGTH = 90
+CARD_SUMMARY_SLACK = 30  # don't truncate if only this much more would be hidden
+card_cache = TTLCache(maxsize=CARD_CACHE_MAXSIZE, ttl=EVENT_CACHE_STALE_TTL)
+
+def split_template(template: Any, slots: Iterable[str], **context: Any) -> List[str]:
+    """Render a template once with placeholder slots and split it around them.
+
+    Returns static markup and slot names, alternating (even items markup,
+    odd items names), so a response is a join of the static parts and the
+    escaped values without a template call per response.
+    """
+    placeholders = {name: Markup(f"\x00{name}\x00") for name in slots}
+    return re.split("\x00(\\w+)\x00", template.render(**context, **placeholders))
+
+def fill_template(parts: List[str], **values: Any) -> str:
+    """Join ``split_template`` parts with the slot values (escaped unless they're Markup)."""
+    # Markup goes in as is: escape() would copy the whole cards fragment just to re-wrap it
+    return "".join([part if i % 2 == 0 else values[part] if isinstance(values[part], Markup) else escape(values[part])
+                    for i, part in enumerate(parts)])
+
+# The events response (events_response.html) with and without its intro
+EVENTS_RESPONSE_PARTS = split_template(events_response_template, ("intro", "heading", "cards", "more_button"))
+MORE_EVENTS_RESPONSE_PARTS = split_template(events_response_template, ("heading", "cards", "more_button"), intro=None)
+
+# Chat UI: static files and the page that links them are hashed and compressed once at startup
+static_assets = AssetStore(os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"))
+index_page = Asset("index.html", templates.get_template("index.html").render(asset_url=static_assets.url).encode())
+
+# Conversation sessions, keyed by cookie: recent turns, location and the last search with its results
+SESSION_COOKIE = "eventbot_session"
+SESSION_TTL = int(os.getenv('SESSION_TTL', 1800))
+SESSION_MAXSIZE = int(os.getenv('SESSION_MAXSIZE', 10000))
+SESSION_MAX_BYTES = int(os.getenv('SESSION_MAX_MB', 64)) * 1024 * 1024
+SESSION_MAX_TURNS = 10
+SESSION_COOKIE_SECURE = os.getenv('SESSION_COOKIE_SECURE', '0') == '1'
+if cache_backend.shared:
+    session_store = SharedSessionStore(cache_backend, ttl=SESSION_TTL, max_turns=SESSION_MAX_TURNS)
+else:
+    session_store = SessionStore(maxsize=SESSION_MAXSIZE, ttl=SESSION_TTL, max_bytes=SESSION_MAX_BYTES,
+                                 max_turns=SESSION_MAX_TURNS)
+
+# Paging through search results ("show me more")
+EVENTS_PAGE_SIZE = 20
+TICKETMASTER_MAX_RESULTS = 1000
+if cache_backend.shared:
+    cursor_store = SharedCursorStore(cache_backend, ttl=EVENT_CACHE_STALE_TTL)
+else:
+    cursor_store = CursorStore(ttl=EVENT_CACHE_STALE_TTL)
 
 # Event-related keywords that trigger event search
 EVENT_KEYWORDS = {
@@ -150,6 +444,35 @@ ALLOWED_CITIES = {
     "youngstown"
 }
 
+# Built once at import: finds every allowed city in a message in one pass
+CITY_MATCHER = CityMatcher(ALLOWED_CITIES)
+
+# Nicknames people use for allowed cities; one- and two-letter ones only count in capitals ("LA")
+CITY_ALIASES = {
+    "nyc": "new york city", "ny": "new york", "the big apple": "new york city", "manhattan": "new york city",
+    "brooklyn": "new york city", "philly": "philadelphia", "la": "los angeles", "sf": "san francisco",
+    "san fran": "san francisco", "frisco": "san francisco", "vegas": "las vegas", "nola": "new orleans",
+    "chi town": "chicago", "chitown": "chicago", "dc": "washington", "washington dc": "washington",
+    "slc": "salt lake city", "okc": "oklahoma city", "kc": "kansas city", "st louis": "saint louis",
+    "atl": "atlanta", "motown": "detroit", "beantown": "boston", "nashvegas": "nashville", "htown": "houston",
+    "h town": "houston", "the twin cities": "minneapolis", "indy": "indianapolis", "jax": "jacksonville",
+    "pdx": "portland", "abq": "albuquerque", "cincy": "cincinnati", "sac": "sacramento",
+}
+# Built once at import: typo-tolerant lookup ("seatle", "pittsburg") for messages with no exact city
+CITY_RESOLVER = FuzzyCityIndex(ALLOWED_CITIES, CITY_ALIASES)
+CITY_MIN_CONFIDENCE = 0.8
+
+# Fallback patterns for locations phrased as "in X", "near X", ... (checked against allowed cities)
+LOCATION_PATTERNS = [re.compile(pattern) for pattern in [
+    r'in ([A-Za-z\s,]+?)(?:\s(?:tonight|today|tomorrow|this weekend|next week|this summer|in \w+)|[.!?]|$)',
+    r'near ([A-Za-z\s,]+?)(?:\s(?:tonight|today|tomorrow|this weekend|next week|this summer|in \w+)|[.!?]|$)',
+    r'around ([A-Za-z\s,]+?)(?:\s(?:tonight|today|tomorrow|this weekend|next week|this summer|in \w+)|[.!?]|$)',
+    r'at ([A-Za-z\s,]+?)(?:\s(?:tonight|today|tomorrow|this weekend|next week|this summer|in \w+)|[.!?]|$)',
+    r'for ([A-Za-z\s,]+?)(?:\s(?:tonight|today|tomorrow|this weekend|next week|this summer|in \w+)|[.!?]|$)',
+    r'(?:^|\s)([A-Za-z\s,]+?)(?:\s(?:events|things|activities|concerts|shows))',
+    r'(?:going to|visiting) ([A-Za-z\s,]+)'
+]]
+
 # Conversation patterns and responses
 GREETING_PATTERNS = [
     r'h[ei](?:llo)?|hey|hi there|howdy|sup|good (morning|afternoon|evening)',
@@ -201,103 +524,141 @@ EVENT_PATTERNS = [
     r'music venues?'
 ]
 
-def contains_event_keywords(text: str) -> bool:
+# Word and phrase lists behind contains_event_keywords
+INTEREST_WORDS = frozenset({
+    'art', 'music', 'sports', 'food', 'shows', 'concerts', 'events', 'activities',
+    'restaurant', 'restaurants', 'dining', 'band', 'bands', 'festival', 'festivals',
+    'performance', 'performances', 'venue', 'venues', 'gallery', 'galleries',
+    'museum', 'museums', 'theater', 'theatre', 'food', 'dining', 'cuisine',
+    'entertainment', 'nightlife', 'bar', 'bars', 'club', 'clubs'
+})
+
+INTEREST_VERBS = frozenset({
+    'like', 'love', 'enjoy', 'interested', 'want', 'looking', 'seeking',
+    'searching', 'find', 'discover', 'explore', 'check', 'see', 'visit',
+    'try', 'experience', 'attend', 'go'
+})
+
+# Food- and music-specific phrases
+EVENT_PHRASES = frozenset({
+    'places to eat', 'good food', 'restaurants', 'dining', 'hungry',
+    'food scene', 'best restaurants', 'local food', 'cuisine',
+    'live music', 'concerts', 'bands', 'shows', 'performances', 'gigs',
+    'music venue', 'playing tonight', 'performing', 'music scene'
+})
+
+AFFIRMATIVE_WORDS = frozenset({'yes', 'yeah', 'sure', 'ok', 'okay', 'fine', 'please'})
+
+# Messages that only change the time frame of the previous search
+TIME_ONLY_PATTERNS = [
+    r'^(tonight|today|tomorrow|this weekend|next week|in \w+)$',
+    r'^what about (tonight|today|tomorrow|this weekend|next week|in \w+)\??$',
+    r'^show me (tonight|today|tomorrow|this weekend|next week|in \w+)\??$',
+    r'^(january|february|march|april|may|june|july|august|september|october|november|december)\??$',
+    r'^in (january|february|march|april|may|june|july|august|september|october|november|december)\??$',
+    r'^what about (january|february|march|april|may|june|july|august|september|october|november|december)\??$',
+    r'^what about later in (january|february|march|april|may|june|july|august|september|october|november|december)\??$'
+]
+
+# Follow-ups asking for the next page of the previous results
+MORE_PATTERNS = [
+    r'^(?:show me |show |see |any )?(?:some )?more(?: events| results| options| please)?\??$',
+    r'\bnext page\b',
+    r'\b(?:show|see|get) (?:me )?(?:some )?more\b',
+    r'\bwhat else\b'
+]
+
+# Built once at import: evaluates all of the pattern groups above in a single pass
+INTENT_CLASSIFIER = IntentClassifier(
+    event_patterns=EVENT_PATTERNS,
+    greeting_patterns=GREETING_PATTERNS,
+    mood_patterns=MOOD_PATTERNS,
+    interest_patterns=INTEREST_PATTERNS,
+    time_only_patterns=TIME_ONLY_PATTERNS,
+    event_keywords=frozenset(EVENT_KEYWORDS),
+    interest_words=INTEREST_WORDS,
+    interest_verbs=INTEREST_VERBS,
+    event_phrases=EVENT_PHRASES,
+    affirmatives=AFFIRMATIVE_WORDS,
+    more_patterns=MORE_PATTERNS,
+    city_matcher=CITY_MATCHER
+)
+
+def classify_intent(text: str) -> IntentResult:
+    """Classify a message once; the result is passed along the request path."""
+    return INTENT_CLASSIFIER.classify(text)
+
+def contains_event_keywords(text: str, intent: IntentResult = None) -> bool:
     """Check if the message contains any event-related keywords."""
-    text_lower = text.lower()
-    
-    # Expanded interest words and verbs
-    interest_words = {
-        'art', 'music', 'sports', 'food', 'shows', 'concerts', 'events', 'activities',
-        'restaurant', 'restaurants', 'dining', 'band', 'bands', 'festival', 'festivals',
-        'performance', 'performances', 'venue', 'venues', 'gallery', 'galleries',
-        'museum', 'museums', 'theater', 'theatre', 'food', 'dining', 'cuisine',
-        'entertainment', 'nightlife', 'bar', 'bars', 'club', 'clubs'
-    }
-    
-    interest_verbs = {
-        'like', 'love', 'enjoy', 'interested', 'want', 'looking', 'seeking',
-        'searching', 'find', 'discover', 'explore', 'check', 'see', 'visit',
-        'try', 'experience', 'attend', 'go'
-    }
-    
-    # Food-specific phrases
-    food_phrases = {
-        'places to eat', 'good food', 'restaurants', 'dining', 'hungry',
-        'food scene', 'best restaurants', 'local food', 'cuisine'
-    }
-    
-    # Music-specific phrases
-    music_phrases = {
-        'live music', 'concerts', 'bands', 'shows', 'performances', 'gigs',
-        'music venue', 'playing tonight', 'performing', 'music scene'
-    }
-    
-    words = set(text_lower.split())
-    
-    # Check for direct interest expressions
-    if (words & interest_verbs) and (words & interest_words):
-        return True
-    
-    # Check for food-specific phrases
-    if any(phrase in text_lower for phrase in food_phrases):
-        return True
-        
-    # Check for music-specific phrases
-    if any(phrase in text_lower for phrase in music_phrases):
-        return True
-        
-    # Consider short affirmative responses as event-related if they're the main content
-    if len(text_lower.split()) <= 3 and any(word in text_lower for word in {'yes', 'yeah', 'sure', 'ok', 'okay', 'fine', 'please'}):
-        return True
-        
-    return any(keyword in text_lower for keyword in EVENT_KEYWORDS)
+    return (intent or classify_intent(text)).event_keywords
+
+def find_city(text: str) -> CityMatch:
+    """Return the leftmost-longest allowed city mentioned in the message, with its position."""
+    return CITY_MATCHER.find(text)
+
+class LocationReading(NamedTuple):
+    """A city named in a message: how it was read (exact, pattern, alias or fuzzy) and the words read as it."""
+    city: str
+    how: str
+    phrase: str
+    confidence: float = 1.0
+
+def extract_location(text: str, intent: IntentResult = None) -> Optional[LocationReading]:
+    """The city named in a message, or None.
+
+    Only looks: the reading is counted and logged by ``resolve_location``,
+    once for the turn that uses it.
+    """
+    intent = intent or classify_intent(text)
 
-def extract_location(text: str) -> str:
-    """Extract location from message or return None."""
     # Skip location extraction if the message is just about time
-    time_only_patterns = [
-        r'^(tonight|today|tomorrow|this weekend|next week|in \w+)$',
-        r'^what about (tonight|today|tomorrow|this weekend|next week|in \w+)\??$',
-        r'^show me (tonight|today|tomorrow|this weekend|next week|in \w+)\??$',
-        r'^(january|february|march|april|may|june|july|august|september|october|november|december)\??$',
-        r'^in (january|february|march|april|may|june|july|august|september|october|november|december)\??$',
-        r'^what about (january|february|march|april|may|june|july|august|september|october|november|december)\??$',
-        r'^what about later in (january|february|march|april|may|june|july|august|september|october|november|december)\??$'
-    ]
-    
-    for pattern in time_only_patterns:
-        if re.match(pattern, text.lower().strip()):
-            return None
-    
-    # First try to find exact city matches
-    text_lower = text.lower()
-    for city in ALLOWED_CITIES:
-        # Check for exact city mentions with word boundaries
-        if re.search(rf'\b{re.escape(city)}\b', text_lower):
-            return city.title()
+    if intent.time_only:
+        return None
     
+    # First try to find exact city matches (found by the classifier's single pass)
+    if intent.city:
+        return LocationReading(intent.city.city.title(), "exact", intent.city.city)
+
     # If no exact match found, try the common location patterns but verify against allowed cities
-    location_patterns = [
-        r'in ([A-Za-z\s,]+?)(?:\s(?:tonight|today|tomorrow|this weekend|next week|this summer|in \w+)|[.!?]|$)',
-        r'near ([A-Za-z\s,]+?)(?:\s(?:tonight|today|tomorrow|this weekend|next week|this summer|in \w+)|[.!?]|$)',
-        r'around ([A-Za-z\s,]+?)(?:\s(?:tonight|today|tomorrow|this weekend|next week|this summer|in \w+)|[.!?]|$)',
-        r'at ([A-Za-z\s,]+?)(?:\s(?:tonight|today|tomorrow|this weekend|next week|this summer|in \w+)|[.!?]|$)',
-        r'for ([A-Za-z\s,]+?)(?:\s(?:tonight|today|tomorrow|this weekend|next week|this summer|in \w+)|[.!?]|$)',
-        r'(?:^|\s)([A-Za-z\s,]+?)(?:\s(?:events|things|activities|concerts|shows))',
-        r'(?:going to|visiting) ([A-Za-z\s,]+)'
-    ]
-    
-    for pattern in location_patterns:
-        match = re.search(pattern, text_lower)
+    text_lower = text.lower()
+    for pattern in LOCATION_PATTERNS:
+        match = pattern.search(text_lower)
         if match:
-            location = match.group(1).strip()
-            # Check if the extracted location matches any allowed city
-            for city in ALLOWED_CITIES:
-                if city in location.lower():
-                    return city.title()
-    
+            # Check if the extracted location contains any allowed city
+            city_match = CITY_MATCHER.find(match.group(1).strip(), whole_words=False)
+            if city_match:
+                return LocationReading(city_match.city.title(), "pattern", match.group(1).strip())
+
+    # Misspellings and nicknames ("seatle", "philly")
+    candidate = CITY_RESOLVER.find(text)
+    if candidate is not None and candidate.confidence >= CITY_MIN_CONFIDENCE:
+        return LocationReading(candidate.city.title(), "alias" if candidate.confidence == 1.0 else "fuzzy",
+                               candidate.phrase, candidate.confidence)
     return None
 
+class TurnLocation(NamedTuple):
+    """Where a message is about: the city it names (None if it names none) and the one to use for this turn."""
+    named: Optional[str]
+    current: Optional[str]
+
+def resolve_location(message: str, location: str, intent: IntentResult) -> TurnLocation:
+    """Pick the location for this turn: a city named in the message, else the previous one.
+
+    Resolved once per request by the chat handlers and passed down, so the
+    message is only scanned for a city once.
+    """
+    # Time-only follow-ups ("what about tomorrow?") never name a new city
+    if intent.time_only and location:
+        return TurnLocation(None, location)
+    # Only update location if we found a valid city
+    reading = extract_location(message, intent)
+    if reading is None:
+        return TurnLocation(None, location or None)
+    LOCATIONS.inc(reading.how)
+    if reading.how in ("alias", "fuzzy"):
+        print(f"Read {reading.phrase!r} as {reading.city} (confidence {reading.confidence})")
+    return TurnLocation(reading.city, reading.city)
+
 def parse_date_info(text: str) -> Tuple[datetime, datetime]:
     """Extract date range from user input."""
     text = text.lower()
@@ -313,8 +674,8 @@ def parse_date_info(text: str) -> Tuple[datetime, datetime]:
         end_date = start_date + timedelta(days=2)  # Include Sunday
         return start_date, end_date
 
-    # Handle "today"
-    if 'today' in text:
+    # Handle "today" / "tonight"
+    if 'today' in text or 'tonight' in text:
         return today, today + timedelta(days=1)
 
     # Handle "tomorrow"
@@ -334,7 +695,14 @@ def parse_date_info(text: str) -> Tuple[datetime, datetime]:
     # Default to next 30 days
     return today, today + timedelta(days=30)
 
-def get_mock_events_for_city(location: str, location_data: Any, start_date: datetime) -> List[Dict[Any, Any]]:
+# Time frames parse_date_info understands; a follow-up without one keeps the previous search's
+DATE_WORDS = ('weekend', 'today', 'tonight', 'tomorrow', 'next week', 'this month')
+
+def mentions_date(text: str) -> bool:
+    text = text.lower()
+    return any(word in text for word in DATE_WORDS)
+
+def get_mock_events_for_city(location: str, location_data: Any, start_date: datetime) -> List[Event]:
     """Generate high-quality mock events specific to a city."""
     events = []
     
@@ -496,242 +864,585 @@ def get_mock_events_for_city(location: str, location_data: Any, start_date: date
     event_list = city_specific_events.get(location.lower(), default_events)
     
     # Generate events with proper dates and coordinates
+    latitude, longitude = (location_data.latitude, location_data.longitude) if location_data else (0, 0)
     for i, event in enumerate(event_list):
-        if isinstance(event, dict):
-            event_data = event.copy()
-        else:
-            # Handle old tuple format if it exists
-            venue, name, category, desc = event
-            event_data = {
-                "name": name,
-                "venue": venue,
-                "category": category,
-                "description": desc,
-                "price": "$" + str(15 + (i * 10))
-            }
-            
-        # Add common fields
-        event_data.update({
-            "location": event_data["venue"],
-            "date": (start_date + timedelta(days=i+1)).strftime("%Y-%m-%d"),
-            "url": f"https://www.eventbrite.com/d/{location.lower()}/{event_data['category'].lower()}/",
-            "coordinates": (location_data.latitude, location_data.longitude) if location_data else (0, 0)
-        })
-        events.append(event_data)
+        events.append(Event(
+            name=event["name"],
+            venue=Venue(event["venue"], city=location, latitude=latitude, longitude=longitude),
+            date=(start_date + timedelta(days=i+1)).strftime("%Y-%m-%d"),
+            description=event["description"],
+            url=f"https://www.eventbrite.com/d/{location.lower()}/{event['category'].lower()}/",
+            category=event["category"],
+            price=event["price"],
+            source="mock"
+        ))
     
     return events
 
+# Vocabularies for Ticketmaster search params, in priority order (ties go to the value listed first)
+SEARCH_CATEGORIES = {
+    "music": ["music", "concert", "band", "singer", "gig", "performance", "live music", "dj"],
+    "sports": ["sports", "sport", "game", "match", "tournament", "competition", "athletic", "racing", "marathon",
+               "basketball", "baseball", "football", "soccer", "hockey", "nba", "nfl", "mlb", "nhl", "mls"],
+    "arts": ["art", "arts", "theatre", "theater", "dance", "ballet", "opera", "gallery", "exhibition", "museum",
+             "painting", "sculpture", "musical", "broadway", "play"],
+    "family": ["family", "kids", "children", "child", "parent", "toddler", "baby", "teen", "youth"],
+    "comedy": ["comedy", "comedian", "stand-up", "standup", "improv", "funny", "humor"],
+    "film": ["film", "movie", "cinema", "screening", "premiere", "documentary"],
+    "food": ["food", "dining", "culinary", "cooking", "tasting", "wine", "beer", "festival", "restaurant", "chef"],
+    "educational": ["learning", "workshop", "seminar", "class", "course", "lecture", "training", "education"],
+    "business": ["networking", "conference", "meetup", "professional", "business", "entrepreneur", "startup"],
+    "community": ["community", "neighborhood", "local", "charity", "volunteer", "social", "meetup"],
+    "outdoor": ["outdoor", "nature", "hiking", "camping", "adventure", "park", "garden", "beach"],
+    "wellness": ["wellness", "health", "fitness", "yoga", "meditation", "mindfulness", "spa"],
+    "technology": ["tech", "technology", "digital", "gaming", "esports", "virtual", "computer"],
+    "nightlife": ["club", "party", "dance", "dj", "nightclub", "bar", "pub"],
+    "shopping": ["market", "fair", "bazaar", "shopping", "craft", "vintage", "antique", "pop-up"]
+}
+SEARCH_GENRES = {
+    "rock": ["rock", "alternative", "indie", "punk", "metal", "grunge"],
+    "pop": ["pop", "top 40", "mainstream"],
+    "hip-hop-rap": ["hip hop", "rap", "hip-hop", "r&b", "rhythm and blues"],
+    "country": ["country", "country music", "folk", "americana", "bluegrass"],
+    "jazz": ["jazz", "blues", "swing", "bebop", "fusion"],
+    "classical": ["classical", "orchestra", "symphony", "chamber", "opera"],
+    "electronic": ["electronic", "edm", "techno", "house", "house music", "trance", "dubstep"],
+    "world": ["world music", "international", "global", "ethnic", "traditional"],
+    "latin": ["latin", "salsa", "reggaeton", "bachata", "merengue"],
+    "reggae": ["reggae", "ska", "dub", "caribbean"],
+    "experimental": ["experimental", "avant-garde", "contemporary", "modern"]
+}
+FAMILY_KEYWORDS = ["family friendly", "kid friendly", "children", "family", "all ages", "kid", "child", "parent",
+                   "toddler", "baby", "teen", "youth"]
+# Words that suggest a value without settling it ("house party", "country fair", "food festival" vs "music festival")
+WEAK_SEARCH_TERMS = ["performance", "festival", "local", "social", "digital", "virtual", "modern", "contemporary",
+                     "international", "global", "traditional", "chamber", "fusion", "house", "dub", "swing",
+                     "country", "play", "park", "bar", "market", "professional", "parent", "teen", "youth",
+                     "baby", "health", "training"]
+# Built once at import: every vocabulary phrase, matched in one pass over the message's tokens
+SEARCH_PARAM_INDEX = SearchParamIndex(
+    {"classificationName": SEARCH_CATEGORIES, "genreName": SEARCH_GENRES, "familyFriendly": {"yes": FAMILY_KEYWORDS}},
+    weak=WEAK_SEARCH_TERMS
+)
+# Words that introduce an artist, performer or event name ("see taylor swift")
+ARTIST_INDICATORS = ["by", "from", "see", "watch", "featuring", "feat", "with", "performing", "presents", "starring",
+                     "showcasing"]
+
 def extract_search_parameters(text: str) -> Dict[str, Any]:
-    """Extract additional search parameters from user input."""
+    """Classification, genre, family-friendly and keyword params for a Ticketmaster search."""
+    params: Dict[str, Any] = SEARCH_PARAM_INDEX.choose(text)
+    keyword = extract_keyword(text, ARTIST_INDICATORS, skip=frozenset({"in", "at", "on", "the"}))
+    if keyword:
+        params["keyword"] = keyword
+    return params
+
+def make_event_cache_key(location_data: Any, radius_mi: int, start_date: datetime, end_date: datetime, search_params: Dict[str, Any]) -> Tuple:
+    """Build a normalized cache key for a Ticketmaster search."""
+    return (
+        round(location_data.latitude, EVENT_CACHE_LATLONG_PRECISION),
+        round(location_data.longitude, EVENT_CACHE_LATLONG_PRECISION),
+        radius_mi,
+        start_date.strftime("%Y-%m-%d"),
+        end_date.strftime("%Y-%m-%d"),
+        tuple(sorted(search_params.items()))
+    )
+
+def drop_past_events(events: List[Event]) -> List[Event]:
+    """Remove events whose start time has already passed."""
+    now = datetime.utcnow()
+    return [event for event in events if event.start_time is None or event.start_time >= now]
+
+def ticketmaster_throttled(response: httpx.Response) -> RateLimited:
+    """Back the limiter off after a 429 and return the error to raise."""
+    retry_after = response.headers.get('Retry-After')
+    retry_after = float(retry_after) if retry_after and retry_after.isdigit() else None
+    quota_exhausted = response.headers.get('Rate-Limit-Available') == '0'
+    ticketmaster_limiter.upstream_throttled(retry_after, quota_exhausted)
+    return RateLimited("quota" if quota_exhausted else "upstream", retry_after)
+
+async def search_ticketmaster(params: Dict[str, Any], location_data: Any, priority: Priority = Priority.INTERACTIVE) -> EventPage:
+    """Run one Discovery API search and normalize one page of results.
+
+    Returns None on upstream errors; raises RateLimited if the limiter or
+    Ticketmaster refuses the request.
+    """
+    await ticketmaster_limiter.acquire(priority)
+    print(f"\n=== Making Ticketmaster API Request ===")
+    print(f"URL: {TICKETMASTER_API_URL}")
+    print(f"Parameters: {params}")
+
+    try:
+        with STAGE_SECONDS.time("ticketmaster"):
+            response = await get_http_client().get(TICKETMASTER_API_URL, params=params)
+    except httpx.HTTPError:
+        UPSTREAM_REQUESTS.inc("ticketmaster", "error")
+        raise
+    print(f"Response status: {response.status_code}")
+
+    if response.status_code == 429:
+        UPSTREAM_REQUESTS.inc("ticketmaster", "throttled")
+        raise ticketmaster_throttled(response)
+    if response.status_code != 200:
+        UPSTREAM_REQUESTS.inc("ticketmaster", "error")
+        print(f"Error response from Ticketmaster: {response.text[:500]}")
+        return None
+    UPSTREAM_REQUESTS.inc("ticketmaster", "ok")
+
+    with STAGE_SECONDS.time("parse"):
+        events, page_info = parse_discovery_page(response.content, (location_data.latitude, location_data.longitude))
+    page_number = page_info.get('number', params.get('page', 0))
+    # The Discovery API won't page past the 1000th result
+    total_pages = min(page_info.get('totalPages', 1), TICKETMASTER_MAX_RESULTS // params.get('size', 20))
+    print(f"Parsed {len(events)} events (page {page_number + 1} of {total_pages})")
+
+    return EventPage(events, page_number, total_pages)
+
+async def refresh_event_cache(cache_key: Tuple, params: Dict[str, Any], location_data: Any, priority: Priority = Priority.INTERACTIVE) -> EventPage:
+    """Fetch a search page from Ticketmaster and store it in the event cache.
+
+    Concurrent fetches of the same page (e.g. a prefetch and the user's
+    follow-up) share one upstream call.
+    """
+    async def fetch():
+        page = await search_ticketmaster(params, location_data, priority)
+        if page is not None:
+            event_cache.set(cache_key, page)
+            index_events(page.events)
+            if cache_backend.shared:
+                await store_shared_page(cache_key, page)
+        return page
+
+    return await event_flights.do(cache_key, fetch)
+
+def index_events(events: List[Event]) -> None:
+    """Add fetched events to the spatial index (replacing older copies) and queue them for the event store."""
+    for event in events:
+        latitude, longitude = event.coordinates
+        if event.id and latitude is not None and longitude is not None:
+            event_index.add(event.id, latitude, longitude, event)
+    event_store.add(events)
+    event_ingests.schedule("events", event_store.ingest)
+
+def shared_page_key(cache_key: Tuple) -> str:
+    return "events:" + hashlib.sha1(repr(cache_key).encode()).hexdigest()
+
+async def store_shared_page(cache_key: Tuple, page: EventPage) -> None:
+    """Publish a fetched page to the other workers."""
+    try:
+        await cache_backend.set(shared_page_key(cache_key), encode_page(page, time.time()),
+                                EVENT_CACHE_TTL + EVENT_CACHE_STALE_TTL)
+    except BackendError as e:
+        print(f"Could not share cached events: {e}")
+
+async def load_shared_page(cache_key: Tuple) -> Optional[CacheEntry]:
+    """Copy a page another worker fetched into the local event cache; returns its entry, or None."""
+    try:
+        data = await cache_backend.get(shared_page_key(cache_key))
+    except BackendError as e:
+        print(f"Could not load shared cached events: {e}")
+        return None
+    if data is None:
+        return None
+    page, fetched_at = decode_page(data)
+    index_events(page.events)
+    # Keeps the age it had upstream, so it goes stale here when it does everywhere else
+    event_cache.set(cache_key, page, ttl=EVENT_CACHE_TTL - (time.time() - fetched_at))
+    return event_cache.get_entry(cache_key, count=False)
+
+async def refresh_shared_page(cache_key: Tuple, params: Dict[str, Any], location_data: Any, priority: Priority) -> EventPage:
+    """Background refresh of a stale or missing page, unless another worker has done or is doing it.
+
+    With a shared backend, a fresh copy there is used as is, and otherwise a
+    short lock makes sure only one worker goes upstream for the page; the
+    rest pick up its result on a later request.
+    """
+    if not cache_backend.shared:
+        return await refresh_event_cache(cache_key, params, location_data, priority)
+    entry = await load_shared_page(cache_key)
+    if entry is not None and not entry.is_stale:
+        return entry.value
+    lock = "refresh:" + shared_page_key(cache_key)
+    try:
+        if not await cache_backend.add(lock, WORKER_ID.encode(), REFRESH_LOCK_TTL):
+            return None
+    except BackendError:
+        pass
+    try:
+        return await refresh_event_cache(cache_key, params, location_data, priority)
+    finally:
+        try:
+            await cache_backend.delete(lock)
+        except BackendError:
+            pass
+
+async def get_cached_events(cache_key: Tuple, params: Dict[str, Any], location_data: Any) -> EventPage:
+    """Serve a search page from the event cache, refreshing stale entries in the background."""
+    entry = event_cache.get_entry(cache_key)
+    if entry is None and cache_backend.shared:
+        entry = await load_shared_page(cache_key)
+    if entry is not None:
+        events = drop_past_events(entry.value.events)
+        if entry.is_stale:
+            event_refresher.schedule(cache_key, lambda: refresh_shared_page(cache_key, params, location_data, Priority.BACKGROUND))
+        # Only go upstream if everything we had cached has already started
+        if events or not entry.value.events:
+            print(f"Serving {len(events)} events from cache ({'stale' if entry.is_stale else 'fresh'})")
+            return entry.value._replace(events=events)
+
+    page = await refresh_event_cache(cache_key, params, location_data)
+    return page._replace(events=drop_past_events(page.events)) if page is not None else None
+
+def page_request(search: SearchState, page: int) -> Tuple[Tuple, Dict[str, Any]]:
+    """Cache key and API params for one page of a search."""
+    if page == 0:
+        return search.cache_key, search.params
+    return search.cache_key + (page,), {**search.params, "page": page}
+
+async def fetch_event_page(search: SearchState, page: int) -> EventPage:
+    """Return one page of a search (from cache or upstream) and prefetch the page after it."""
+    cache_key, params = page_request(search, page)
+    result = await get_cached_events(cache_key, params, search.location_data)
+    if result is not None:
+        search.total_pages = result.total_pages
+        if result.has_more:
+            prefetch_event_page(search, page + 1)
+    return result
+
+def prefetch_event_page(search: SearchState, page: int) -> None:
+    """Start loading a page in the background unless it's already cached."""
+    cache_key, params = page_request(search, page)
+    if cache_key in event_cache:
+        return
+    event_refresher.schedule(cache_key, lambda: refresh_shared_page(cache_key, params, search.location_data, Priority.PREFETCH))
+
+def build_search(location: str, location_data: Any, radius_km: float = DEFAULT_RADIUS_KM, date_range: Tuple[datetime, datetime] = None, search_params: Dict[str, Any] = None) -> SearchState:
+    """Build the Discovery API params and cache key for a search."""
+    search_params = search_params or {}
+
+    # Convert radius to miles (Ticketmaster uses miles)
+    radius_mi = max(1, round(radius_km / KM_PER_MILE))
+
+    # Use provided date range or default
+    if not date_range:
+        start_date = datetime.now()
+        end_date = start_date + timedelta(days=90)
+    else:
+        start_date, end_date = date_range
+
+    # Prepare API request (dates in ISO format)
     params = {
-        "classificationName": None,
-        "genreName": None,
-        "familyFriendly": None,
-        "keyword": None
-    }
-    
-    text_lower = text.lower()
-    
-    # Expanded classifications/categories
-    categories = {
-        "music": ["music", "concert", "concerts", "band", "singer", "musical", "gig", "performance", "live music"],
-        "sports": ["sports", "sport", "game", "match", "tournament", "competition", "athletic", "racing", "marathon"],
-        "arts": ["art", "arts", "theatre", "theater", "dance", "ballet", "opera", "gallery", "exhibition", "museum", "painting", "sculpture"],
-        "family": ["family", "kids", "children", "child", "parent", "toddler", "baby", "teen", "youth"],
-        "comedy": ["comedy", "comedian", "stand-up", "standup", "improv", "funny", "humor"],
-        "film": ["film", "movie", "cinema", "screening", "premiere", "documentary"],
-        "food": ["food", "dining", "culinary", "cooking", "tasting", "wine", "beer", "festival", "restaurant", "chef"],
-        "educational": ["learning", "workshop", "seminar", "class", "course", "lecture", "training", "education"],
-        "business": ["networking", "conference", "meetup", "professional", "business", "entrepreneur", "startup"],
-        "community": ["community", "neighborhood", "local", "charity", "volunteer", "social", "meetup"],
-        "outdoor": ["outdoor", "nature", "hiking", "camping", "adventure", "park", "garden", "beach"],
-        "wellness": ["wellness", "health", "fitness", "yoga", "meditation", "mindfulness", "spa"],
-        "technology": ["tech", "technology", "digital", "gaming", "esports", "virtual", "computer"],
-        "nightlife": ["club", "party", "dance", "DJ", "nightclub", "bar", "pub"],
-        "shopping": ["market", "fair", "bazaar", "shopping", "craft", "vintage", "antique", "pop-up"]
-    }
-    
-    # Expanded genres (music and more)
-    genres = {
-        "rock": ["rock", "alternative", "indie", "punk", "metal", "grunge"],
-        "pop": ["pop", "popular", "top 40", "mainstream"],
-        "hip-hop-rap": ["hip hop", "rap", "hip-hop", "r&b", "rhythm and blues"],
-        "country": ["country", "folk", "americana", "bluegrass"],
-        "jazz": ["jazz", "blues", "swing", "bebop", "fusion"],
-        "classical": ["classical", "orchestra", "symphony", "chamber", "opera"],
-        "electronic": ["electronic", "edm", "techno", "house", "trance", "dubstep"],
-        "world": ["world", "international", "global", "ethnic", "traditional"],
-        "latin": ["latin", "salsa", "reggaeton", "bachata", "merengue"],
-        "reggae": ["reggae", "ska", "dub", "caribbean"],
-        "experimental": ["experimental", "avant-garde", "contemporary", "modern"]
-    }
-    
-    # Activity types
-    activities = {
-        "active": ["sports", "fitness", "exercise", "workout", "training", "competition"],
-        "relaxing": ["spa", "wellness", "meditation", "yoga", "relaxation"],
-        "social": ["meetup", "social", "gathering", "party", "networking"],
-        "learning": ["class", "workshop", "seminar", "course", "training"],
-        "entertainment": ["show", "performance", "concert", "movie", "theatre"],
-        "outdoor": ["hiking", "camping", "nature", "adventure", "park"],
-        "food_drink": ["dining", "tasting", "cooking", "food", "drink"],
-        "shopping": ["market", "shopping", "fair", "bazaar"]
+        "apikey": TICKETMASTER_API_KEY,
+        "latlong": f"{location_data.latitude},{location_data.longitude}",
+        "radius": radius_mi,
+        "startDateTime": start_date.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "endDateTime": end_date.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "size": EVENTS_PAGE_SIZE,  # Number of events to return
+        "sort": "date,asc",
+        **search_params  # Add extracted search parameters
     }
-    
-    # Check categories
-    for category, keywords in categories.items():
-        if any(keyword in text_lower for keyword in keywords):
-            params["classificationName"] = category
-            break
-    
-    # Check genres
-    for genre, keywords in genres.items():
-        if any(keyword in text_lower for keyword in keywords):
-            params["genreName"] = genre
-            break
-    
-    # Check for family-friendly indicators
-    family_keywords = [
-        "family friendly", "kid friendly", "children", "family", "all ages",
-        "kid", "child", "parent", "toddler", "baby", "teen", "youth"
-    ]
-    if any(keyword in text_lower for keyword in family_keywords):
-        params["familyFriendly"] = "yes"
-    
-    # Extract specific artist/performer/event names
-    artist_indicators = [
-        "by", "from", "see", "watch", "featuring", "feat", "with",
-        "performing", "presents", "starring", "showcasing"
-    ]
-    for indicator in artist_indicators:
-        if indicator in text_lower:
-            parts = text_lower.split(indicator)
-            if len(parts) > 1:
-                # Take the next word group as potential artist/event name
-                name_part = parts[1].strip().split()
-                if name_part and not name_part[0] in ["in", "at", "on", "the"]:
-                    # Take up to 3 words for the name
-                    name = " ".join(name_part[:3])
-                    params["keyword"] = name
-                    break
-    
-    return {k: v for k, v in params.items() if v is not None}
 
-def get_events_from_ticketmaster(location: str, radius_km: int = 10, date_range: Tuple[datetime, datetime] = None, search_text: str = "") -> List[Dict[Any, Any]]:
-    """Fetch events from Ticketmaster API based on location and date range."""
+    cache_key = make_event_cache_key(location_data, radius_mi, start_date, end_date, search_params)
+    return SearchState(cache_key, params, location, location_data, total_pages=1)
+
+async def search_events(location: str, radius_km: float = DEFAULT_RADIUS_KM, date_range: Tuple[datetime, datetime] = None, search_text: str = "", search_params: Dict[str, Any] = None) -> Tuple[List[Event], str, bool]:
+    """Fetch the first page of events for a search from every event provider.
+
+    Search params are extracted from ``search_text`` unless given. Returns the
+    events, a cursor for Ticketmaster's next page (None if there are no more
+    pages or mock events were served) and whether the events are all the
+    search found (not if a provider failed or missed the deadline). Raises
+    RateLimited or SearchPending when there's nothing to show because
+    Ticketmaster was throttled or a provider failed or ran late.
+    """
+    start_date = date_range[0] if date_range else datetime.now()
+    location_data = None
     try:
         # Get coordinates for the location
-        location_data = geolocator.geocode(location)
+        location_data = await geocode(location)
         if not location_data:
             print(f"Could not geocode location: {location}")
-            return get_mock_events_for_city(location, None, datetime.now())
+            if not SAMPLE_EVENTS_ONLY:
+                return [], None, True
+            FALLBACKS.inc("mock_events")
+            return get_mock_events_for_city(location, None, datetime.now()), None, True
 
-        # Convert radius to miles (Ticketmaster uses miles)
-        radius_mi = int(radius_km * 0.621371)
+        # Extract additional search parameters
+        if search_params is None:
+            search_params = extract_search_parameters(search_text)
+        if location.lower() in ALLOWED_CITIES:
+            cache_warmer.record(location.lower(), search_params.get("classificationName"))
+
+        query = ProviderQuery(location, location_data.latitude, location_data.longitude, radius_km,
+                              date_range or (start_date, start_date + timedelta(days=90)), search_params,
+                              EVENTS_PAGE_SIZE)
+        with STAGE_SECONDS.time("providers"):
+            result = await event_providers.search(query)
+
+        if result.fallback:
+            FALLBACKS.inc("mock_events")
+            print("No event provider configured, showing mock events")
+            return result.events, None, result.complete
+        if not result.events and result.missing:
+            # "No events" would be wrong too: the providers that didn't answer may well have some
+            throttled = result.errors.get(TicketmasterProvider.name)
+            if isinstance(throttled, RateLimited):
+                raise throttled
+            raise SearchPending(result.missing)
+
+        print(f"Successfully found {len(result.events)} events "
+              f"({', '.join(f'{name}: {outcome}' for name, outcome in result.outcomes.items())})")
+        return result.events, result.cursor, result.complete
+
+    except (RateLimited, SearchPending):
+        raise
+    except Exception as e:
+        print(f"Error in event fetching: {str(e)}")
+        traceback.print_exc()
+        if not SAMPLE_EVENTS_ONLY:
+            return [], None, False
+        FALLBACKS.inc("mock_events")
+        return get_mock_events_for_city(location, location_data, start_date), None, True
+
+def warm_search(target: WarmTarget) -> Optional[SearchState]:
+    """The search a live request for this city, time window and classification would make."""
+    location_data = geocoder.gazetteer.get(target.city)
+    if location_data is None:
+        return None
+    search_params = {"classificationName": target.classification} if target.classification else {}
+    return build_search(target.city.title(), location_data, DEFAULT_RADIUS_KM, parse_date_info(target.window), search_params)
+
+def warm_target_needs_refresh(target: WarmTarget) -> bool:
+    """True if the target's first page is missing or expires within the refresh margin."""
+    search = warm_search(target)
+    if search is None:
+        return False
+    entry = event_cache.get_entry(search.cache_key, count=False)
+    return entry is None or entry.fresh_until - time.monotonic() < WARM_REFRESH_MARGIN
+
+async def warm_target(target: WarmTarget) -> None:
+    search = warm_search(target)
+    if cache_backend.shared:
+        # Another worker may have refreshed it since this one last looked
+        entry = await load_shared_page(search.cache_key)
+        if entry is not None and entry.fresh_until - time.monotonic() >= WARM_REFRESH_MARGIN:
+            return
+    await refresh_event_cache(search.cache_key, search.params, search.location_data, Priority.BACKGROUND)
+
+async def claim_warm_cycle() -> bool:
+    """With several workers, let whichever gets here first run this warming cycle."""
+    try:
+        return await cache_backend.add("warmer:cycle", WORKER_ID.encode(), WARM_INTERVAL * 0.9)
+    except BackendError as e:
+        print(f"Could not coordinate cache warming, skipping this cycle: {e}")
+        return False
 
-        # Use provided date range or default
-        if not date_range:
-            start_date = datetime.now()
-            end_date = start_date + timedelta(days=90)
-        else:
-            start_date, end_date = date_range
+async def get_events_from_ticketmaster(location: str, radius_km: float = DEFAULT_RADIUS_KM, date_range: Tuple[datetime, datetime] = None, search_text: str = "") -> List[Event]:
+    """Fetch events from Ticketmaster API based on location and date range."""
+    events, _, _ = await search_events(location, radius_km, date_range, search_text)
+    return events
 
-        # Format dates in ISO format
-        start_date_str = start_date.strftime("%Y-%m-%dT%H:%M:%SZ")
-        end_date_str = end_date.strftime("%Y-%m-%dT%H:%M:%SZ")
+def plan_search(user_input: str, location: str, follow_up: bool,
+                session: Session = None) -> Tuple[Tuple[datetime, datetime], Dict[str, Any], DistanceRequest]:
+    """Date range, search params and radius for a message.
 
-        # Extract additional search parameters
-        search_params = extract_search_parameters(search_text)
+    A follow-up (no city named, same place as the last search) keeps the last
+    search's filters and, unless it names new ones, its time frame and radius.
+    """
+    date_range = parse_date_info(user_input)
+    search_params = extract_search_parameters(user_input)
+    distance = parse_distance(user_input)
+    radius_km = distance.radius_km if distance and distance.radius_km is not None else DEFAULT_RADIUS_KM
+    last = session.last_search if session is not None else None
+    if follow_up and last is not None and last.location.lower() == location.lower():
+        if not mentions_date(user_input):
+            date_range = last.date_range
+        if distance is None or distance.radius_km is None:
+            radius_km = last.radius_km
+        search_params = {**last.params, **search_params}
+    return date_range, search_params, DistanceRequest(radius_km, distance is not None and distance.by_distance)
+
+async def events_near(location: str, date_range: Tuple[datetime, datetime], search_params: Dict[str, Any],
+                      radius_km: float) -> List[Event]:
+    """Up to a page of cached events within ``radius_km`` of a location that fit a search, nearest first."""
+    location_data = await geocode(location)
+    if not location_data:
+        return []
+    start, end = utc_range(date_range)
+    now = datetime.utcnow()
+    events = []
+    for _, event in event_index.within(location_data.latitude, location_data.longitude, radius_km):
+        if event.start_time is None or not max(start, now) <= event.start_time < end:
+            continue
+        if event_matches(event, search_params):
+            events.append(event)
+            if len(events) == EVENTS_PAGE_SIZE:
+                break
+    return events
 
-        # Prepare API request
-        params = {
-            "apikey": TICKETMASTER_API_KEY,
-            "latlong": f"{location_data.latitude},{location_data.longitude}",
-            "radius": radius_mi,
-            "startDateTime": start_date_str,
-            "endDateTime": end_date_str,
-            "size": 20,  # Number of events to return
-            "sort": "date,asc",
-            **search_params  # Add extracted search parameters
-        }
+async def stored_events(location: str, date_range: Tuple[datetime, datetime], search_params: Dict[str, Any],
+                        radius_km: float) -> List[Event]:
+    """Up to a page of stored events for a keyword search, soonest first; empty if the store has none.
 
-        print(f"\n=== Making Ticketmaster API Request ===")
-        print(f"URL: {TICKETMASTER_API_URL}")
-        print(f"Parameters: {params}")
+    Only searches whose other filters can be checked locally qualify.
+    """
+    if "keyword" not in search_params or not REFINABLE_PARAMS.issuperset(set(search_params) - {"keyword"}):
+        return []
+    # The extracted keyword often runs on into the city ("hamilton in seattle")
+    city_words = set(location.lower().split())
+    keyword = " ".join(word for word in search_params["keyword"].split() if word not in city_words)
+    location_data = await geocode(location)
+    if not keyword or not location_data:
+        return []
+    with STAGE_SECONDS.time("event_store"):
+        found = await event_store.search(keyword, location_data.latitude, location_data.longitude,
+                                         radius_km, date_range, limit=EVENTS_PAGE_SIZE * 5)
+    return [event for event in found if event_matches(event, search_params)][:EVENTS_PAGE_SIZE]
+
+async def sort_by_distance(events: List[Event], location: str) -> List[Event]:
+    """Events nearest the location first; ones without coordinates go last."""
+    location_data = await geocode(location)
+    if not location_data:
+        return events
 
-        response = requests.get(TICKETMASTER_API_URL, params=params)
-        print(f"Response status: {response.status_code}")
-        
-        if response.status_code != 200:
-            print(f"Error response from Ticketmaster: {response.text[:500]}")
-            return get_mock_events_for_city(location, location_data, start_date)
+    def distance(event: Event) -> float:
+        latitude, longitude = event.coordinates
+        if latitude is None or longitude is None:
+            return float("inf")
+        return haversine_km(location_data.latitude, location_data.longitude, latitude, longitude)
 
-        events_data = response.json()
-        print(f"API Response: {json.dumps(events_data, indent=2)[:500]}...")
-        
-        # Check if we have any events
-        if not events_data.get('_embedded', {}).get('events', []):
-            print("No events found in API response")
-            return get_mock_events_for_city(location, location_data, start_date)
-
-        events = []
-        for event in events_data['_embedded']['events']:
-            try:
-                # Get venue information
-                venue = event.get('_embedded', {}).get('venues', [{}])[0]
-                
-                # Get price ranges
-                price_ranges = event.get('priceRanges', [])
-                if price_ranges:
-                    min_price = price_ranges[0].get('min', 0)
-                    max_price = price_ranges[0].get('max', 0)
-                    price = f"${min_price:.2f} - ${max_price:.2f}" if min_price or max_price else "Check website for prices"
-                else:
-                    price = "Check website for prices"
-                
-                # Get event description
-                description = event.get('description', event.get('info', 'No description available'))
-                if len(description) > 200:
-                    description = description[:197] + '...'
-                
-                # Format the event data
-                event_data = {
-                    "name": event.get('name', 'Unnamed Event'),
-                    "description": description,
-                    "location": f"{venue.get('name', 'TBA')}, {venue.get('address', {}).get('line1', '')}",
-                    "date": datetime.strptime(event['dates']['start']['dateTime'], "%Y-%m-%dT%H:%M:%SZ").strftime("%Y-%m-%d"),
-                    "url": event.get('url', ''),
-                    "coordinates": (
-                        float(venue.get('location', {}).get('latitude', location_data.latitude)),
-                        float(venue.get('location', {}).get('longitude', location_data.longitude))
-                    ),
-                    "category": event.get('classifications', [{}])[0].get('segment', {}).get('name', 'General'),
-                    "price": price,
-                    "image": event.get('images', [{}])[0].get('url') if event.get('images') else None
-                }
-                events.append(event_data)
-                print(f"Successfully processed event: {event_data['name']}")
-            except Exception as e:
-                print(f"Error processing event: {str(e)}")
-                continue
+    return sorted(events, key=distance)
 
-        if not events:
-            print("No valid events found, falling back to mock events")
-            return get_mock_events_for_city(location, location_data, start_date)
+class TicketmasterProvider(EventProvider):
+    """The Discovery API, through the event cache; pages further with a search cursor."""
 
-        print(f"Successfully found {len(events)} events")
-        return events
+    name = "ticketmaster"
 
-    except Exception as e:
-        print(f"Error in event fetching: {str(e)}")
-        traceback.print_exc()
-        return get_mock_events_for_city(location, location_data if 'location_data' in locals() else None, start_date if 'start_date' in locals() else datetime.now())
+    async def search(self, query: ProviderQuery) -> ProviderResult:
+        location_data = await geocode(query.location)
+        search = build_search(query.location, location_data, query.radius_km, query.date_range, query.params)
+        page = await fetch_event_page(search, 0)
+        if page is None:
+            raise ProviderError("Ticketmaster search failed")
+        cursor = make_cursor(await cursor_store.register(search), 1) if page.has_more else None
+        return ProviderResult(page.events, cursor)
+
+class LocalProvider(EventProvider):
+    """Events already fetched: the spatial index, or the event store for keyword searches.
+
+    Stands in for a provider that failed or was too slow; otherwise it would
+    only repeat their results.
+    """
+
+    name = "local"
+    standby = True
+
+    async def search(self, query: ProviderQuery) -> ProviderResult:
+        if not REFINABLE_PARAMS.issuperset(set(query.params) - {"keyword"}):
+            return ProviderResult([])
+        if "keyword" in query.params:
+            events = await stored_events(query.location, query.date_range, query.params, query.radius_km)
+        else:
+            events = await events_near(query.location, query.date_range, query.params, query.radius_km)
+        return ProviderResult(events)
+
+class MockProvider(EventProvider):
+    """Sample events for the city, for running without any real provider configured."""
+
+    name = "mock"
+    fallback = True
+
+    async def search(self, query: ProviderQuery) -> ProviderResult:
+        return ProviderResult(get_mock_events_for_city(query.location, query, query.date_range[0]))
+
+# Searched side by side in this order of precedence (for duplicates and paging); each real provider only when
+# configured, sample events only when none is
+if EVENTBRITE_TOKEN and EVENTBRITE_ORGANIZATIONS:
+    eventbrite_provider = EventbriteProvider(get_http_client, EVENTBRITE_TOKEN, EVENTBRITE_ORGANIZATIONS,
+                                             ttl=EVENTBRITE_TTL, on_fetch=index_events)
+else:
+    eventbrite_provider = None
+event_providers = ProviderFanOut(
+    ([TicketmasterProvider()] if TICKETMASTER_API_KEY else []) + ([eventbrite_provider] if eventbrite_provider else [])
+    + [LocalProvider()] + ([MockProvider()] if SAMPLE_EVENTS_ONLY else []),
+    deadline=PROVIDER_DEADLINE
+)
+
+async def find_events(location: str, date_range: Tuple[datetime, datetime], search_params: Dict[str, Any], search_text: str = "",
+                      session: Session = None, distance: DistanceRequest = None) -> Tuple[List[Event], str]:
+    """Search for events, answering narrower follow-ups from the session's last results or the spatial index.
+
+    A smaller radius or "closer to downtown" after a search is answered from
+    the events already cached around the place, as long as they're known to
+    be all the last search found in the time frame and the search's filters
+    can be checked against a cached event (a keyword can't: it goes to the
+    event store instead).
+    """
+    distance = distance or DistanceRequest(DEFAULT_RADIUS_KM, False)
+    if session is not None and session.covers(location, date_range, search_params, distance.radius_km):
+        if (REFINABLE_PARAMS.issuperset(search_params) and session.knows_all(date_range)
+                and (distance.by_distance or distance.radius_km < session.last_search.radius_km)):
+            nearby = await events_near(location, date_range, search_params, distance.radius_km)
+            if nearby:
+                SEARCHES.inc("nearby")
+                print(f"Found {len(nearby)} cached events within {distance.radius_km:.1f} km of {location}")
+                return nearby, None
+        refined = session.refine(location, date_range, search_params, distance.radius_km)
+        if refined:
+            SEARCHES.inc("refined")
+            print(f"Refined {len(refined)} of the session's last {len(session.last_events)} events")
+            if distance.by_distance:
+                refined = await sort_by_distance(refined, location)
+            return refined, None
+    events = await stored_events(location, date_range, search_params, distance.radius_km)
+    if events:
+        SEARCHES.inc("stored")
+        print(f"Found {len(events)} stored events for {search_params['keyword']!r} in {location}")
+        cursor, complete = None, True
+    else:
+        SEARCHES.inc("search")
+        events, cursor, complete = await search_events(location, distance.radius_km, date_range, search_text,
+                                                       search_params)
+    if session is not None:
+        session.remember_search(LastSearch(location, date_range, search_params, distance.radius_km), events,
+                                complete=complete)
+        await session_store.save(session)
+    if distance.by_distance:
+        # Only this page is reordered; "show me more" continues in date order
+        events = await sort_by_distance(events, location)
+    return events, cursor
+
+def is_follow_up(message_location: Optional[str], session: Session = None) -> bool:
+    """True if a message builds on the session's last search rather than starting a new one."""
+    return session is not None and session.last_search is not None and message_location is None
+
+def wants_events(intent: IntentResult, follow_up: bool, user_input: str = "") -> bool:
+    """Event questions, plus time-only ("what about tomorrow?") and distance ("any within 2 miles?")
+    follow-ups to an earlier search."""
+    if intent.event_query is not None:
+        return True
+    return follow_up and (intent.time_only is not None or parse_distance(user_input) is not None)
 
-def get_events_near_location(location: str, date_range: Tuple[datetime, datetime], query: str = "") -> List[Dict[str, Any]]:
+async def get_more_events(cursor: str) -> Tuple[SearchState, List[Event], str]:
+    """Fetch the page a cursor points at.
+
+    Returns (search, events, next cursor); search is None if the cursor is unknown or expired.
+    """
+    resolved = await cursor_store.resolve(cursor)
+    if resolved is None:
+        return None, [], None
+    search_id, search, page_number = resolved
+    page = await fetch_event_page(search, page_number)
+    if page is None:
+        return search, [], None
+    next_cursor = make_cursor(search_id, page_number + 1) if page.has_more else None
+    return search, page.events, next_cursor
+
+async def get_events_near_location(location: str, date_range: Tuple[datetime, datetime], query: str = "",
+                                   radius_km: float = 50 * KM_PER_MILE) -> List[Event]:
     """Search for events near a location using Ticketmaster API."""
     try:
         # Get coordinates for the location
-        location_info = geolocator.geocode(location)
+        location_info = await geocode(location)
         if not location_info:
             print(f"Could not geocode location: {location}")
             return []
@@ -740,7 +1451,7 @@ def get_events_near_location(location: str, date_range: Tuple[datetime, datetime
         params = {
             'apikey': TICKETMASTER_API_KEY,
             'latlong': f"{location_info.latitude},{location_info.longitude}",
-            'radius': '50',  # 50-mile radius
+            'radius': str(max(1, round(radius_km / KM_PER_MILE))),
             'unit': 'miles',
             'startDateTime': date_range[0].strftime('%Y-%m-%dT%H:%M:%SZ'),
             'endDateTime': date_range[1].strftime('%Y-%m-%dT%H:%M:%SZ'),
@@ -761,59 +1472,15 @@ def get_events_near_location(location: str, date_range: Tuple[datetime, datetime
         print(f"Making Ticketmaster API request with params: {params}")
         
         # Make API request
-        response = requests.get(TICKETMASTER_API_URL, params=params)
+        await ticketmaster_limiter.acquire(Priority.INTERACTIVE)
+        response = await get_http_client().get(TICKETMASTER_API_URL, params=params)
         if response.status_code != 200:
             print(f"Error from Ticketmaster API: {response.status_code}")
             return []
 
-        data = response.json()
-        if '_embedded' not in data or 'events' not in data['_embedded']:
+        events, _ = parse_discovery_page(response.content, (location_info.latitude, location_info.longitude))
+        if not events:
             print("No events found in API response")
-            return []
-
-        events = []
-        for event in data['_embedded']['events']:
-            try:
-                # Extract event details with safe fallbacks
-                event_data = {
-                    'name': event.get('name', 'Event Name Not Available'),
-                    'date': event.get('dates', {}).get('start', {}).get('localDate', 'Date TBA'),
-                    'location': event.get('_embedded', {}).get('venues', [{}])[0].get('name', 'Venue TBA'),
-                    'url': event.get('url', '#'),  # Fallback to '#' if no URL available
-                    'category': event.get('classifications', [{}])[0].get('segment', {}).get('name', 'Event'),
-                    'description': event.get('info', event.get('description', 'No description available')),
-                    'price': 'Check ticket site for prices'
-                }
-
-                # Add price range if available
-                if 'priceRanges' in event:
-                    price_range = event['priceRanges'][0]
-                    if price_range.get('min') == price_range.get('max'):
-                        event_data['price'] = f"${price_range['min']:.2f}"
-                    else:
-                        event_data['price'] = f"${price_range['min']:.2f} - ${price_range['max']:.2f}"
-
-                # Add image if available
-                if 'images' in event and event['images']:
-                    # Find the best image (prefer 16:9 ratio if available)
-                    best_image = None
-                    for img in event['images']:
-                        if img.get('ratio') == '16_9' and img.get('width', 0) >= 640:
-                            best_image = img
-                            break
-                    if not best_image and event['images']:
-                        best_image = event['images'][0]
-                    
-                    if best_image:
-                        event_data['image'] = best_image.get('url')
-
-                events.append(event_data)
-                print(f"Successfully processed event: {event_data['name']}")
-
-            except Exception as e:
-                print(f"Error processing event: {str(e)}")
-                continue
-
         return events
 
     except Exception as e:
@@ -821,76 +1488,208 @@ def get_events_near_location(location: str, date_range: Tuple[datetime, datetime
         traceback.print_exc()
         return []
 
-def get_conversation_response(text: str, context: Dict[str, Any] = None) -> str:
+# Create a system prompt that defines the chatbot's role
+SYSTEM_PROMPT = """You are a friendly event chatbot assistant. You help users find events and activities they might enjoy.
+        You are knowledgeable about various types of events including concerts, sports, arts, and more.
+        Keep your responses friendly, concise, and focused on helping users discover events."""
+
+GEMINI_GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "max_output_tokens": 100, # Max tokens for response
+}
+
+# Replies shorter than this are treated as failures and replaced with a template response
+MIN_RESPONSE_LENGTH = 10
+
+def build_conversation_prompt(text: str, context: Dict[str, Any] = None) -> str:
+    """Combine the system prompt, context, earlier turns and user's message into one Gemini prompt."""
+    parts = [SYSTEM_PROMPT]
+    if context and context.get('location'):
+        parts.append(f"User's location: {context['location']}")
+    if context and context.get('history'):
+        parts.append(f"Conversation so far:\n{context['history']}")
+    parts.append(f"User: {text}\nAssistant:")
+    return "\n".join(parts)
+
+def conversation_context(location: str = None, session: Session = None, **extra: Any) -> Optional[Dict[str, Any]]:
+    """Context for a conversational reply: location and, if there are any, the session's earlier turns."""
+    context = {'location': location} if location else {}
+    if session is not None and session.turns:
+        context['history'] = session.history()
+    context.update(extra)
+    return context or None
+
+async def remember_turn(session: Optional[Session], user_input: str, reply: str) -> None:
+    """Add an exchange to the session's history."""
+    if session is None:
+        return
+    session.add_turn("user", user_input)
+    session.add_turn("assistant", reply)
+    await session_store.save(session)
+
+def events_summary(ai_intro: str, location: str, date_info: str, count: int) -> str:
+    """How a results message is remembered in the conversation history."""
+    return f"{ai_intro} [Showed {count} events in {location}{date_info}]".strip()
+
+def llm_cache_key(text: str, context: Dict[str, Any] = None) -> Tuple:
+    """Normalize a prompt and its context into an LLM cache key."""
+    normalized_text = " ".join(text.lower().split()).strip(" .!?")
+    normalized_context = tuple(sorted(
+        (key, str(value).lower()) for key, value in (context or {}).items() if value is not None
+    ))
+    return normalized_text, normalized_context
+
+def gemini_stage(context: Dict[str, Any] = None) -> str:
+    """Metrics label telling event intros apart from conversational replies."""
+    return "gemini_intro" if context and 'event_count' in context else "gemini_reply"
+
+async def generate_conversation_text(model: Any, text: str, context: Dict[str, Any], cache_key: Tuple) -> str:
+    """Ask Gemini for a reply and add it to the LLM cache. Returns None if the reply is unusable."""
+    print("Generating response with Google Gemini API...")
+    try:
+        with STAGE_SECONDS.time(gemini_stage(context)):
+            response = await model.generate_content_async(build_conversation_prompt(text, context), generation_config=GEMINI_GENERATION_CONFIG)
+    except Exception:
+        UPSTREAM_REQUESTS.inc("gemini", "error")
+        raise
+
+    # Extract text from the response
+    generated_text = response.text.strip()
+    print(f"Gemini API response: {generated_text}")
+
+    # If the response is empty or too short, the caller falls back to template responses
+    if not generated_text or len(generated_text) < MIN_RESPONSE_LENGTH:
+        UPSTREAM_REQUESTS.inc("gemini", "too_short")
+        print("Gemini response too short, falling back to template")
+        return None
+
+    UPSTREAM_REQUESTS.inc("gemini", "ok")
+    llm_cache.add(cache_key, generated_text)
+    return generated_text
+
+def fill_llm_variants(model: Any, text: str, context: Dict[str, Any], cache_key: Tuple) -> None:
+    """Generate another cached variant in the background until the pool for this prompt is full."""
+    if llm_cache.needs_variants(cache_key):
+        llm_refresher.schedule(cache_key, lambda: generate_conversation_text(model, text, context, cache_key))
+
+async def get_conversation_response(text: str, context: Dict[str, Any] = None, intent: IntentResult = None) -> str:
     """Generate a conversational response based on user input."""
     try:
         # Use Gemini API instead of local GPT4All
-        if 'gemini_model' not in globals() or globals().get('gemini_model') is None:
+        model = get_gemini_model()
+        if model is None:
             print("Gemini model not configured, using template response.")
-            return get_template_response(text)
+            return get_template_response(text, intent)
 
-        # Create a system prompt that defines the chatbot's role
-        system_prompt = """You are a friendly event chatbot assistant. You help users find events and activities they might enjoy.
-        You are knowledgeable about various types of events including concerts, sports, arts, and more.
-        Keep your responses friendly, concise, and focused on helping users discover events."""
+        cache_key = llm_cache_key(text, context)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            fill_llm_variants(model, text, context, cache_key)
+            return cached
 
-        # Combine the context with the user's message
-        if context and context.get('location'):
-            full_prompt = f"{system_prompt}\nUser's location: {context['location']}\nUser: {text}\nAssistant:"
-        else:
-            full_prompt = f"{system_prompt}\nUser: {text}\nAssistant:"
-
-        print("Generating response with Google Gemini API...")
-        # Generate response using Gemini
-        response = globals()['gemini_model'].generate_content(
-            full_prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.7,
-                max_output_tokens=100, # Max tokens for response
-            )
+        # Identical prompts in flight at the same time share one Gemini call
+        generated_text = await llm_flights.do(cache_key, lambda: generate_conversation_text(model, text, context, cache_key))
+        return generated_text or get_template_response(text, intent)
+
+    except Exception as e:
+        print(f"Error in conversation response: {str(e)}")
+        traceback.print_exc()
+        return get_template_response(text, intent)
+
+async def stream_conversation_response(text: str, context: Dict[str, Any] = None, intent: IntentResult = None) -> AsyncIterator[str]:
+    """Yield a conversational response as Gemini generates it."""
+    sent = False
+    leader = False
+    try:
+        model = get_gemini_model()
+        if model is None:
+            print("Gemini model not configured, using template response.")
+            yield get_template_response(text, intent)
+            return
+
+        cache_key = llm_cache_key(text, context)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            fill_llm_variants(model, text, context, cache_key)
+            yield cached
+            return
+
+        # Someone is already generating this reply; wait for it instead of asking again
+        pending = llm_flights.inflight(cache_key)
+        if pending is not None:
+            yield await asyncio.shield(pending) or get_template_response(text, intent)
+            return
+        llm_flights.begin(cache_key)
+        leader = True
+        started = time.perf_counter()
+
+        print("Streaming response from Google Gemini API...")
+        response = await model.generate_content_async(
+            build_conversation_prompt(text, context), generation_config=GEMINI_GENERATION_CONFIG, stream=True
         )
-        
-        # Extract text from the response
-        generated_text = response.text.strip()
-        print(f"Gemini API response: {generated_text}")
 
-        # If the response is empty or too short, fall back to template responses
-        if not generated_text or len(generated_text) < 10:
+        # Hold back the first few characters so a too-short reply can still fall back to a template
+        buffered = ""
+        full_text = ""
+        async for chunk in response:
+            buffered += chunk.text
+            full_text += chunk.text
+            if sent:
+                yield buffered
+                buffered = ""
+            elif len(buffered.strip()) >= MIN_RESPONSE_LENGTH:
+                yield buffered.lstrip()
+                buffered = ""
+                sent = True
+
+        STAGE_SECONDS.observe(time.perf_counter() - started, gemini_stage(context))
+        if sent:
+            UPSTREAM_REQUESTS.inc("gemini", "ok")
+            if buffered.rstrip():
+                yield buffered.rstrip()
+            llm_cache.add(cache_key, full_text.strip())
+            llm_flights.finish(cache_key, full_text.strip())
+        else:
+            UPSTREAM_REQUESTS.inc("gemini", "too_short")
             print("Gemini response too short, falling back to template")
-            return get_template_response(text)
-            
-        return generated_text
+            llm_flights.finish(cache_key, None)
+            yield get_template_response(text, intent)
 
     except Exception as e:
-        print(f"Error in conversation response: {str(e)}")
+        if leader:
+            UPSTREAM_REQUESTS.inc("gemini", "error")
+        print(f"Error in streamed conversation response: {str(e)}")
         traceback.print_exc()
-        return get_template_response(text)
-
-def get_template_response(text: str) -> str:
+        if not sent:
+            yield get_template_response(text, intent)
+    finally:
+        # Release any waiters if we bailed out early (error or client disconnect)
+        if leader:
+            llm_flights.finish(cache_key, None)
+
+def get_template_response(text: str, intent: IntentResult = None) -> str:
     """Fallback function for template-based responses."""
-    text_lower = text.lower()
+    FALLBACKS.inc("template_reply")
+    intent = intent or classify_intent(text)
     
     # Check for greetings
-    for pattern in GREETING_PATTERNS:
-        if re.search(pattern, text_lower):
-            return random.choice([
-                "Hey there! 😊 How can I help make your day more exciting?",
-                "Hi! I'm always happy to chat and help you discover fun things to do!",
-                "Hello! Looking for something fun? I know lots of great events and activities!",
-                "Hey! Whether you want to find events or just chat, I'm here to help!"
-            ])
+    if intent.greeting:
+        return random.choice([
+            "Hey there! 😊 How can I help make your day more exciting?",
+            "Hi! I'm always happy to chat and help you discover fun things to do!",
+            "Hello! Looking for something fun? I know lots of great events and activities!",
+            "Hey! Whether you want to find events or just chat, I'm here to help!"
+        ])
     
     # Check for moods
-    for mood, pattern in MOOD_PATTERNS.items():
-        if re.search(pattern, text_lower):
-            if mood in MOOD_KEYWORDS:
-                return random.choice(MOOD_KEYWORDS[mood])
+    for mood in intent.moods:
+        if mood.label in MOOD_KEYWORDS:
+            return random.choice(MOOD_KEYWORDS[mood.label])
     
     # Check for interests
-    for interest, pattern in INTEREST_PATTERNS.items():
-        if re.search(pattern, text_lower):
-            if interest in INTEREST_KEYWORDS:
-                return random.choice(INTEREST_KEYWORDS[interest])
+    for interest in intent.interests:
+        if interest.label in INTEREST_KEYWORDS:
+            return random.choice(INTEREST_KEYWORDS[interest.label])
     
     # Default responses
     return random.choice([
@@ -900,440 +1699,405 @@ def get_template_response(text: str) -> str:
         "Ready to find something fun to do? Just let me know which city you're interested in! 😊"
     ])
 
-def generate_response(user_input: str, user_location: str = None) -> str:
-    """Generate a response based on user input and nearby events."""
+def describe_date_range(date_range: Tuple[datetime, datetime], user_input: str) -> str:
+    """Describe a search date range for headings, e.g. " this weekend"."""
+    if date_range[0].month == date_range[1].month:
+        return f" in {calendar.month_name[date_range[0].month]} {date_range[0].year}"
+    if date_range[1] - date_range[0] <= timedelta(days=2):
+        if "weekend" in user_input.lower():
+            return " this weekend"
+        return f" from {date_range[0].strftime('%B %d')} to {date_range[1].strftime('%B %d')}"
+    return ""
+
+def card_summary(description: str) -> Tuple[str, bool]:
+    """Shorten a description for a card at a word boundary; the rest is fetched on demand."""
+    if len(description) <= CARD_SUMMARY_LENGTH + CARD_SUMMARY_SLACK:
+        return description, False
+    return description[:CARD_SUMMARY_LENGTH].rsplit(" ", 1)[0].rstrip(" ,.;:-"), True
+
+def render_event_card(event: Event) -> Markup:
+    """Render one event as an HTML card, reusing the cached fragment while the event is unchanged."""
+    key = (event.id or event.name, event.version)
+    entry = card_cache.get(key)
+    return entry[0] if entry is not None else build_event_card(event, key)
+
+def build_event_card(event: Event, key: Tuple[str, int]) -> Markup:
+    """Render a card from the template and cache it under ``key``."""
+    summary, truncated = card_summary(event.description)
+    card = Markup(event_card_template.render(event=event, summary=summary, truncated=truncated,
+                                             key=key[0], version=key[1]))
+    # The event is kept with its card so the full description can be served on request
+    card_cache.set(key, (card, event))
+    if truncated and cache_backend.shared:
+        share_description(key, event.description)
+    return card
+
+# Full descriptions of shortened cards waiting to be written to the shared backend, so
+# "more" works whichever worker it reaches
+pending_descriptions: Dict[Tuple[str, int], str] = {}
+description_writer: Optional[asyncio.Task] = None
+
+def description_key(event_key: str, version: int) -> str:
+    return f"description:{event_key}:{version}"
+
+def share_description(key: Tuple[str, int], description: str) -> None:
+    """Queue a description for the backend; rendering stays synchronous and the writes are batched."""
+    global description_writer
+    pending_descriptions[key] = description
+    if description_writer is None or description_writer.done():
+        try:
+            description_writer = asyncio.get_running_loop().create_task(write_descriptions())
+        except RuntimeError:
+            # Rendering outside the server (benchmarks); nobody will ask for these
+            pending_descriptions.clear()
+
+async def write_descriptions() -> None:
+    while pending_descriptions:
+        key, description = pending_descriptions.popitem()
+        try:
+            await cache_backend.set(description_key(*key), description.encode(), EVENT_CACHE_STALE_TTL)
+        except BackendError as e:
+            print(f"Could not share event descriptions: {e}")
+            pending_descriptions.clear()
+
+def render_event_cards(events: List[Event]) -> Markup:
+    """Render a run of cards as one fragment, looking them all up in the card cache at once."""
+    keys = [(event.id or event.name, event.version) for event in events]
+    entries = card_cache.get_many(keys)
+    return Markup("".join([entry[0] if entry is not None else build_event_card(event, key)
+                           for event, key, entry in zip(events, keys, entries)]))
+
+def render_more_button(cursor: str) -> Markup:
+    """Render the button that loads the next page of results."""
+    return more_button_macro(cursor)
+
+def render_events_response(ai_intro: str, location: str, date_info: str, events: List[Event], cursor: str = None) -> str:
+    """Render the intro, heading and event cards as one HTML fragment."""
+    return fill_template(EVENTS_RESPONSE_PARTS, intro=ai_intro, heading=f"Events in {location}{date_info}",
+                         cards=render_event_cards(events), more_button=render_more_button(cursor))
+
+def render_more_events_response(location: str, events: List[Event], cursor: str = None) -> str:
+    """Render a further page of results as its own chat message."""
+    return fill_template(MORE_EVENTS_RESPONSE_PARTS, heading=f"More events in {location}",
+                         cards=render_event_cards(events), more_button=render_more_button(cursor))
+
+def intro_prompt(location: str, date_info: str, event_count: int) -> Tuple[str, Dict[str, Any]]:
+    """Prompt and context used to have Gemini introduce a list of events."""
+    return f"Introduce these {event_count} events in {location}{date_info}", {'location': location, 'event_count': event_count}
+
+async def generate_response(user_input: str, user_location: str = None, intent: IntentResult = None, cursor: str = None, session: Session = None,
+                            turn: TurnLocation = None) -> str:
+    """Generate a response based on user input and nearby events.
+
+    With a session, earlier turns go into the prompt, follow-ups build on the
+    last search and the exchange is added to the session's history. ``turn``
+    is the message's location as already resolved by the caller; without it
+    the message is resolved against ``user_location`` here.
+    """
     try:
-        # First try to extract location from the current message
-        message_location = extract_location(user_input)
-        
-        # Use the most recently mentioned location (from message or previous location)
-        location = message_location or user_location
+        intent = intent or classify_intent(user_input)
+
+        # "Show me more" continues the previous search from its cursor
+        if intent.more_results and cursor:
+            search, events, next_cursor = await get_more_events(cursor)
+            if events:
+                await remember_turn(session, user_input, f"[Showed {len(events)} more events in {search.location}]")
+                with STAGE_SECONDS.time("render"):
+                    return render_more_events_response(search.location, events, next_cursor)
+
+        # The city named in the message, else the most recently mentioned one
+        message_location, location = turn or resolve_location(user_input, user_location, intent)
+        follow_up = is_follow_up(message_location, session)
         
-        # Check if the message contains event-related keywords
-        contains_event_query = any(re.search(pattern, user_input.lower()) for pattern in EVENT_PATTERNS)
-        
-        if contains_event_query and location:
+        if wants_events(intent, follow_up, user_input) and location:
             # If asking about events and we have a location, show events
-            date_range = parse_date_info(user_input)
+            date_range, search_params, distance = plan_search(user_input, location, follow_up, session)
             print(f"Searching for events in: {location}")
             print(f"Date range: {date_range[0].strftime('%Y-%m-%d')} to {date_range[1].strftime('%Y-%m-%d')}")
-            nearby_events = get_events_from_ticketmaster(location, 10, date_range, user_input)
+            nearby_events, next_cursor = await find_events(location, date_range, search_params, user_input, session,
+                                                           distance)
             
             if not nearby_events:
                 # If no events found, get AI response explaining why and suggesting alternatives
-                context = {'location': location, 'no_events': True}
-                return get_conversation_response(user_input, context)
-            
-            # Create event response HTML
-            date_info = ""
-            if date_range[0].month == date_range[1].month:
-                date_info = f" in {calendar.month_name[date_range[0].month]} {date_range[0].year}"
-            elif date_range[1] - date_range[0] <= timedelta(days=2):
-                if "weekend" in user_input.lower():
-                    date_info = " this weekend"
-                else:
-                    date_info = f" from {date_range[0].strftime('%B %d')} to {date_range[1].strftime('%B %d')}"
+                context = conversation_context(location, session, no_events=True)
+                reply = await get_conversation_response(user_input, context, intent)
+                await remember_turn(session, user_input, reply)
+                return reply
             
             # Get AI response to introduce the events
-            intro_context = {'location': location, 'event_count': len(nearby_events)}
-            ai_intro = get_conversation_response(f"Introduce these {len(nearby_events)} events in {location}{date_info}", intro_context)
+            date_info = describe_date_range(date_range, user_input)
+            prompt, intro_context = intro_prompt(location, date_info, len(nearby_events))
+            ai_intro = await get_conversation_response(prompt, intro_context)
+            await remember_turn(session, user_input, events_summary(ai_intro, location, date_info, len(nearby_events)))
             
-            response = [f"<div class='events-response'><p>{ai_intro}</p><h2>Events in {location}{date_info}</h2><div class='events-grid'>"]
-            
-            for event in nearby_events:
-                image_html = f"<img src='{event['image']}' alt='{event['name']}' class='event-image'>" if event.get('image') else ""
-                response.append(
-                    f"<div class='event-card'>"
-                    f"{image_html}"
-                    f"<div class='event-content'>"
-                    f"<h3>{event['name']}</h3>"
-                    f"<div class='event-details'>"
-                    f"<p><strong>📅</strong> {event['date']}</p>"
-                    f"<p><strong>📍</strong> {event['location']}</p>"
-                    f"<p><strong>💰</strong> {event['price']}</p>"
-                    f"<p><strong>🏷️</strong> {event['category']}</p>"
-                    f"<p>{event['description']}</p>"
-                    f"</div>"
-                    f"<a href='{event['url']}' target='_blank' class='ticket-button'>Get Tickets →</a>"
-                    f"</div>"
-                    f"</div>"
-                )
-            
-            response.append("</div></div>")
-            return "".join(response)
+            with STAGE_SECONDS.time("render"):
+                return render_events_response(ai_intro, location, date_info, nearby_events, next_cursor)
         else:
             # Handle conversation
-            context = {'location': location} if location else None
-            return get_conversation_response(user_input, context)
-
+            reply = await get_conversation_response(user_input, conversation_context(location, session), intent)
+            await remember_turn(session, user_input, reply)
+            return reply
+
+    except RateLimited as e:
+        print(f"Ticketmaster request refused by rate limiter: {e.reason}")
+        return rate_limited_message(e)
+    except SearchPending as e:
+        print(f"No events to show yet, waiting on: {e}")
+        return SEARCH_PENDING_MESSAGE
     except Exception as e:
         print(f"Error generating response: {str(e)}")
         traceback.print_exc()
         return "I encountered an error while processing your request. Could you try rephrasing that?"
 
-@app.get("/", response_class=HTMLResponse)
-async def root():
-    """Serve the chat interface."""
-    return """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Your Event Companion</title>
-        <style>
-            body { 
-                font-family: Arial, sans-serif; 
-                max-width: 1200px; 
-                margin: 0 auto; 
-                padding: 20px;
-                background-color: #f5f5f5;
-            }
-            .chat-container { 
-                border: 1px solid #ddd;
-                padding: 20px;
-                border-radius: 10px;
-                height: 500px;  /* Increased height */
-                overflow-y: auto;
-                background-color: white;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                margin-bottom: 20px;
-            }
-            .message { 
-                margin: 10px 0;
-                padding: 10px 15px;
-                border-radius: 15px;
-                max-width: 80%;
-                word-wrap: break-word;
-            }
-            .user-message { 
-                background-color: #1a73e8;
-                color: white;
-                margin-left: auto;
-            }
-            .bot-message { 
-                background-color: #e9ecef;
-                color: #212529;
-            }
-            .welcome-message {
-                text-align: center;
-                margin-bottom: 30px;
-                color: #333;
-                max-width: 800px;  /* Increased width */
-                margin-left: auto;
-                margin-right: auto;
-                padding: 20px;
-            }
-            .welcome-message h1 {
-                color: #1a73e8;
-                margin-bottom: 15px;
-                font-size: 2em;
-            }
-            .welcome-message p {
-                font-size: 1.1em;
-                line-height: 1.6;
-                color: #555;
-                margin-bottom: 20px;
-            }
-            .chat-suggestions {
-                display: flex;
-                gap: 15px;
-                flex-wrap: wrap;
-                margin-top: 20px;
-                justify-content: center;
-            }
-            .suggestion-chip {
-                background-color: #e8f0fe;
-                color: #1a73e8;
-                padding: 10px 20px;
-                border-radius: 25px;
-                cursor: pointer;
-                font-size: 1em;
-                transition: all 0.2s ease;
-                border: 1px solid #1a73e8;
-                user-select: none;
-            }
-            .suggestion-chip:hover {
-                background-color: #1a73e8;
-                color: white;
-                transform: translateY(-2px);
-                box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-            }
-            .input-container { 
-                display: flex;
-                gap: 15px;
-                margin-top: 20px;
-                background-color: white;
-                padding: 20px;
-                border-radius: 10px;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            }
-            input { 
-                flex-grow: 1;
-                padding: 12px 20px;
-                border: 2px solid #ddd;
-                border-radius: 25px;
-                font-size: 16px;
-                transition: border-color 0.2s;
-            }
-            input:focus {
-                outline: none;
-                border-color: #1a73e8;
-            }
-            button { 
-                padding: 12px 25px;
-                background-color: #1a73e8;
-                color: white;
-                border: none;
-                border-radius: 25px;
-                cursor: pointer;
-                font-size: 16px;
-                font-weight: bold;
-                transition: all 0.2s;
-            }
-            button:hover { 
-                background-color: #1557b0;
-                transform: translateY(-2px);
-                box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-            }
-            .events-grid {
-                display: grid;
-                grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
-                gap: 20px;
-                margin-top: 20px;
-            }
-            .event-card {
-                border: 1px solid #ddd;
-                border-radius: 12px;
-                background-color: white;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                transition: transform 0.2s, box-shadow 0.2s;
-                overflow: hidden;
-                height: 400px;
-                display: flex;
-                flex-direction: column;
-            }
-            .event-card:hover {
-                transform: translateY(-4px);
-                box-shadow: 0 6px 12px rgba(0,0,0,0.15);
-            }
-            .event-image {
-                width: 100%;
-                height: 150px;
-                object-fit: cover;
-                border-bottom: 1px solid #eee;
-            }
-            .event-content {
-                padding: 15px;
-                flex-grow: 1;
-                display: flex;
-                flex-direction: column;
-            }
-            .event-card h3 {
-                margin: 0 0 10px 0;
-                color: #1a73e8;
-                font-size: 1.1em;
-                line-height: 1.3;
-            }
-            .event-details {
-                font-size: 13px;
-                line-height: 1.4;
-                flex-grow: 1;
-                overflow-y: auto;
-            }
-            .event-details p {
-                margin: 5px 0;
-            }
-            .ticket-button {
-                display: block;
-                margin-top: 10px;
-                padding: 8px 15px;
-                background-color: #1a73e8;
-                color: white;
-                text-decoration: none;
-                border-radius: 20px;
-                font-weight: bold;
-                transition: background-color 0.2s;
-                text-align: center;
-            }
-            .ticket-button:hover {
-                background-color: #1557b0;
-                text-decoration: none;
-            }
-            .filters-container {
-                display: none;  /* Hide filters initially */
-            }
-            .chat-suggestions {
-                display: flex;
-                gap: 10px;
-                flex-wrap: wrap;
-                margin-top: 15px;
-                justify-content: center;
-            }
-            .suggestion-chip {
-                background-color: #e8f0fe;
-                color: #1a73e8;
-                padding: 8px 15px;
-                border-radius: 20px;
-                cursor: pointer;
-                font-size: 14px;
-                transition: background-color 0.2s;
-            }
-            .suggestion-chip:hover {
-                background-color: #d2e3fc;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="welcome-message">
-            <h1>Hi there! 👋</h1>
-            <p>I'm your friendly event companion! Whether you're looking for something specific or just want to chat about what's happening around town, I'm here to help. Feel free to start with a simple hello!</p>
-            <div class="chat-suggestions">
-                <div class="suggestion-chip" data-text="Hi! How are you?">👋 Say Hello</div>
-                <div class="suggestion-chip" data-text="I am feeling bored">😕 Feeling Bored</div>
-                <div class="suggestion-chip" data-text="What fun things are there to do?">🎉 Find Fun Activities</div>
-                <div class="suggestion-chip" data-text="I love music!">🎵 Talk About Music</div>
-            </div>
-        </div>
-        
-        <div class="chat-container" id="chat-container">
-            <div class="message bot-message">
-                Hi! I'm your event finding assistant. You can ask me anything about events, or we can just chat about what interests you. How are you doing today?
-            </div>
-        </div>
-        
-        <div class="input-container">
-            <input type="text" id="message" placeholder="Type your message here... (e.g., 'How are you?' or 'What's happening in New York?')" />
-            <button id="send-button">Send</button>
-        </div>
-        
-        <script>
-            let userLocation = '';
-            
-            function sendSuggestion(text) {
-                if (!text) return;
-                const messageInput = document.getElementById('message');
-                messageInput.value = text;
-                sendMessage();
-            }
-            
-            async function sendMessage() {
-                const messageInput = document.getElementById('message');
-                const chatContainer = document.getElementById('chat-container');
-                
-                const message = messageInput.value.trim();
-                if (!message) return;
-                
-                // Add user message to chat
-                const userMessageDiv = document.createElement('div');
-                userMessageDiv.className = 'message user-message';
-                userMessageDiv.textContent = message;
-                chatContainer.appendChild(userMessageDiv);
-                
-                messageInput.value = '';
-                
-                try {
-                    // Send to backend with current location
-                    const response = await fetch('/chat', {
-                        method: 'POST',
-                        headers: {'Content-Type': 'application/x-www-form-urlencoded'},
-                        body: `message=${encodeURIComponent(message)}&location=${encodeURIComponent(userLocation)}`
-                    });
-                    
-                    const data = await response.text();
-                    
-                    if (!response.ok) {
-                        throw new Error(data || 'Failed to get response');
-                    }
-                    
-                    // Add bot response to chat
-                    const botMessageDiv = document.createElement('div');
-                    botMessageDiv.className = 'message bot-message';
-                    botMessageDiv.innerHTML = data;
-                    chatContainer.appendChild(botMessageDiv);
-                    
-                    // Update location if a new one was found in the message
-                    const locationMatch = message.match(/in ([A-Za-z\s,]+?)(?:\s|$)/i);
-                    if (locationMatch) {
-                        userLocation = locationMatch[1].trim();
-                    }
-                    
-                } catch (error) {
-                    const errorDiv = document.createElement('div');
-                    errorDiv.className = 'message bot-message';
-                    errorDiv.textContent = 'Sorry, I encountered an error. Please try again.';
-                    chatContainer.appendChild(errorDiv);
-                }
-                
-                // Scroll to bottom
-                chatContainer.scrollTop = chatContainer.scrollHeight;
-            }
+def rate_limited_message(error: RateLimited) -> str:
+    """What to tell the user when Ticketmaster can't be asked right now."""
+    if error.reason == "quota":
+        return "I've reached today's limit for live event lookups, so I can't search Ticketmaster right now. Please try again later."
+    return "Ticketmaster is getting a lot of requests right now, so I couldn't look up live events. Please try again in a few seconds."
+
+# What to tell the user when event providers didn't answer in time (or failed) and there's nothing else to show
+SEARCH_PENDING_MESSAGE = "I'm still waiting on the event listings for this search. Please try again in a moment."
 
-            // Set up event listeners when the DOM is loaded
-            document.addEventListener('DOMContentLoaded', function() {
-                // Add click listeners to suggestion chips
-                const chips = document.querySelectorAll('.suggestion-chip');
-                chips.forEach(chip => {
-                    chip.addEventListener('click', function() {
-                        const text = this.getAttribute('data-text');
-                        if (text) {
-                            sendSuggestion(text);
-                        }
-                    });
-                });
-
-                // Add click listener to send button
-                document.getElementById('send-button').addEventListener('click', sendMessage);
-
-                // Add enter key listener to input field
-                document.getElementById('message').addEventListener('keypress', function(e) {
-                    if (e.key === 'Enter') {
-                        sendMessage();
-                    }
-                });
-            });
-        </script>
-    </body>
-    </html>
+def sse_event(event: str, data: str = "") -> str:
+    """Format one server-sent event; multi-line data is split across data: lines."""
+    lines = data.split("\n") if data else [""]
+    return f"event: {event}\n" + "".join(f"data: {line}\n" for line in lines) + "\n"
+
+async def stream_response(user_input: str, user_location: str = None, intent: IntentResult = None, cursor: str = None, session: Session = None,
+                          turn: TurnLocation = None) -> AsyncIterator[str]:
+    """Stream a response as server-sent events, sending each part as soon as it's ready.
+
+    Events: ``location`` (resolved city), ``status`` (progress text), ``events``
+    (empty results container), ``card`` (one event card), ``intro`` (intro text
+    delta), ``text`` (conversational text delta), ``error`` and finally ``done``.
+    Sessions and ``turn`` are used as in ``generate_response``.
     """
+    try:
+        intent = intent or classify_intent(user_input)
+
+        # "Show me more" continues the previous search from its cursor
+        if intent.more_results and cursor:
+            search, events, next_cursor = await get_more_events(cursor)
+            if events:
+                await remember_turn(session, user_input, f"[Showed {len(events)} more events in {search.location}]")
+                with STAGE_SECONDS.time("render"):
+                    cards = [render_event_card(event) for event in events]
+                yield sse_event("events", render_more_events_response(search.location, [], next_cursor))
+                for card in cards:
+                    yield sse_event("card", card)
+                yield sse_event("done")
+                return
+
+        message_location, location = turn or resolve_location(user_input, user_location, intent)
+        if location:
+            yield sse_event("location", location)
+        follow_up = is_follow_up(message_location, session)
+
+        if wants_events(intent, follow_up, user_input) and location:
+            date_range, search_params, distance = plan_search(user_input, location, follow_up, session)
+            yield sse_event("status", f"Looking for events in {location}...")
+            nearby_events, next_cursor = await find_events(location, date_range, search_params, user_input, session,
+                                                           distance)
+
+            if not nearby_events:
+                context = conversation_context(location, session, no_events=True)
+                reply = ""
+                async for delta in stream_conversation_response(user_input, context, intent):
+                    reply += delta
+                    yield sse_event("text", delta)
+                await remember_turn(session, user_input, reply)
+            else:
+                # Cards go out first; the intro streams into the placeholder above them
+                date_info = describe_date_range(date_range, user_input)
+                with STAGE_SECONDS.time("render"):
+                    cards = [render_event_card(event) for event in nearby_events]
+                yield sse_event("events", render_events_response("", location, date_info, [], next_cursor))
+                for card in cards:
+                    yield sse_event("card", card)
+                prompt, intro_context = intro_prompt(location, date_info, len(nearby_events))
+                ai_intro = ""
+                async for delta in stream_conversation_response(prompt, intro_context):
+                    ai_intro += delta
+                    yield sse_event("intro", delta)
+                await remember_turn(session, user_input, events_summary(ai_intro, location, date_info, len(nearby_events)))
+        else:
+            reply = ""
+            async for delta in stream_conversation_response(user_input, conversation_context(location, session), intent):
+                reply += delta
+                yield sse_event("text", delta)
+            await remember_turn(session, user_input, reply)
+
+    except RateLimited as e:
+        print(f"Ticketmaster request refused by rate limiter: {e.reason}")
+        yield sse_event("error", rate_limited_message(e))
+    except SearchPending as e:
+        print(f"No events to show yet, waiting on: {e}")
+        yield sse_event("error", SEARCH_PENDING_MESSAGE)
+    except Exception as e:
+        print(f"Error streaming response: {str(e)}")
+        traceback.print_exc()
+        yield sse_event("error", "I encountered an error while processing your request. Could you try rephrasing that?")
+
+    yield sse_event("done")
+
+@app.get("/", response_class=HTMLResponse)
+async def root(request: Request):
+    """Serve the chat interface; it's revalidated on each visit and unchanged pages get a 304."""
+    return static_assets.respond(index_page, request.headers, REVALIDATE)
+
+@app.get("/static/{path:path}")
+async def static_file(path: str, request: Request):
+    """Serve a static asset; hashed names are cacheable forever."""
+    response = static_assets.response(path, request.headers)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return response
+
+async def check_gemini() -> Dict[str, Any]:
+    """Confirm the Gemini API key works and the configured model exists."""
+    loop = asyncio.get_running_loop()
+    # Importing and configuring the SDK is slow, so do it off the event loop
+    if await loop.run_in_executor(None, get_gemini_model) is None:
+        return {"ok": False, "error": "GEMINI_API_KEY not set"}
+    import google.generativeai as genai
+    model_info = await loop.run_in_executor(
+        None, partial(genai.get_model, GEMINI_MODEL_NAME, request_options={"timeout": UPSTREAM_CHECK_TIMEOUT})
+    )
+    return {"ok": 'generateContent' in model_info.supported_generation_methods, "model": model_info.name}
+
+async def check_ticketmaster() -> Dict[str, Any]:
+    """Make a minimal Discovery API call to confirm the key is accepted."""
+    if not TICKETMASTER_API_KEY:
+        return {"ok": False, "error": "TICKETMASTER_API_KEY not set"}
+    await ticketmaster_limiter.acquire(Priority.BACKGROUND)
+    response = await get_http_client().get(TICKETMASTER_API_URL, params={"apikey": TICKETMASTER_API_KEY, "size": 1})
+    return {"ok": response.status_code == 200, "status_code": response.status_code}
+
+async def check_upstreams() -> Dict[str, Any]:
+    """Probe each upstream once and record the result in upstream_status."""
+    checks = {"gemini": check_gemini, "ticketmaster": check_ticketmaster}
+    for name, check in checks.items():
+        try:
+            upstream_status["upstreams"][name] = await asyncio.wait_for(check(), UPSTREAM_CHECK_TIMEOUT)
+        except Exception as e:
+            upstream_status["upstreams"][name] = {"ok": False, "error": str(e) or type(e).__name__}
+        print(f"Upstream check {name}: {upstream_status['upstreams'][name]}")
+    upstream_status["checked_at"] = datetime.utcnow().isoformat() + "Z"
+    return upstream_status
+
+@app.get("/ready")
+async def ready():
+    """Report whether the app is serving and what the last upstream check found."""
+    upstreams = upstream_status["upstreams"]
+    return {
+        "status": "ok",
+        "upstreams_ok": all(u.get("ok") for u in upstreams.values()) if upstreams else None,
+        **upstream_status,
+    }
+
+@app.get("/stats")
+async def stats():
+    """Report cache and upstream usage counters."""
+    return {
+        "geocoding": geocoder.stats(),
+        "event_cache": {**event_cache.stats(), "refreshes": event_refresher.counters, "singleflight": event_flights.counters},
+        "event_index": event_index.stats(),
+        "event_store": {**event_store.stats(), "ingests": event_ingests.counters},
+        "cursors": cursor_store.stats(),
+        "card_cache": card_cache.stats(),
+        "sessions": session_store.stats(),
+        "static": static_assets.stats(),
+        "warmer": cache_warmer.stats(),
+        "backend": cache_backend.stats(),
+        "ticketmaster": {**ticketmaster_limiter.stats(), "coalesced": event_flights.counters["coalesced"]},
+        "providers": {**event_providers.stats(),
+                      **({"eventbrite": eventbrite_provider.stats()} if eventbrite_provider else {})},
+        "llm_cache": {**llm_cache.stats(), "singleflight": llm_flights.counters, "variant_fills": llm_refresher.counters},
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Expose latency histograms, cache and upstream counters in Prometheus text format."""
+    return PlainTextResponse(metrics_registry.render(), media_type=metrics_registry.content_type)
+
+@app.get("/events/more", response_class=HTMLResponse)
+async def more_events(cursor: str):
+    """Return the next page of event cards (plus a button for the page after) for a cursor."""
+    try:
+        search, events, next_cursor = await get_more_events(cursor)
+    except RateLimited as e:
+        headers = {"Retry-After": str(int(e.retry_after) + 1)} if e.retry_after else None
+        raise HTTPException(status_code=503, detail=rate_limited_message(e), headers=headers)
+    if search is None:
+        raise HTTPException(status_code=404, detail="These results have expired. Try searching again.")
+    return render_event_cards(events) + render_more_button(next_cursor)
+
+@app.get("/events/{event_key:path}/description", response_class=PlainTextResponse)
+async def event_description(event_key: str, version: int):
+    """Full description for a card whose text was shortened."""
+    entry = card_cache.get_entry((event_key, version), count=False)
+    if entry is not None:
+        return entry.value[1].description
+    if cache_backend.shared:
+        try:
+            description = await cache_backend.get(description_key(event_key, version))
+        except BackendError:
+            description = None
+        if description is not None:
+            return description.decode()
+    raise HTTPException(status_code=404, detail="This event is no longer available.")
+
+async def load_session(request: Request) -> Session:
+    """The session named by the request's cookie, or a new one."""
+    session, _ = await session_store.get_or_create(request.cookies.get(SESSION_COOKIE))
+    return session
+
+def set_session_cookie(response: Response, session: Session) -> None:
+    """(Re)issue the session cookie; it's renewed on every message, like the session's idle timeout."""
+    response.set_cookie(SESSION_COOKIE, session.id, max_age=SESSION_TTL, httponly=True, samesite="lax",
+                        secure=SESSION_COOKIE_SECURE)
 
 @app.post("/chat")
-async def chat(message: str = Form(...), location: str = Form(default="")):
+async def chat(request: Request, response: Response, message: str = Form(...), location: str = Form(default=""), cursor: str = Form(default="")):
     """Handle chat messages."""
     try:
+        session = await load_session(request)
+        set_session_cookie(response, session)
+        # The location form field is still accepted from clients without the cookie
+        location = location or session.location or ""
         print(f"Processing request - Location: {location}, Message: {message}")
         
-        # First check if this is a time-only query
-        time_only_patterns = [
-            r'^(tonight|today|tomorrow|this weekend|next week|in \w+)$',
-            r'^what about (tonight|today|tomorrow|this weekend|next week|in \w+)\??$',
-            r'^show me (tonight|today|tomorrow|this weekend|next week|in \w+)\??$',
-            r'^(january|february|march|april|may|june|july|august|september|october|november|december)\??$',
-            r'^in (january|february|march|april|may|june|july|august|september|october|november|december)\??$',
-            r'^what about (january|february|march|april|may|june|july|august|september|october|november|december)\??$',
-            r'^what about later in (january|february|march|april|may|june|july|august|september|october|november|december)\??$'
-        ]
-        
-        is_time_only_query = any(re.match(pattern, message.lower().strip()) for pattern in time_only_patterns)
+        # Classify the message once and reuse the result for the rest of the request
+        with STAGE_SECONDS.time("classify"):
+            intent = classify_intent(message)
+            turn = resolve_location(message, location, intent)
+        session.location = turn.current or session.location
         
-        # If it's a time-only query and we have a previous location, use that
-        if is_time_only_query and location:
-            response = generate_response(message, location)
-        else:
-            # Try to extract a new location
-            new_location = extract_location(message)
-            
-            # Only update location if we found a valid city
-            if new_location:
-                location = new_location
-            
-            response = generate_response(message, location if location else None)
-        
-        return response
+        return await generate_response(message, location, intent, cursor or None, session, turn)
 
     except Exception as e:
         print(f"Error in chat endpoint: {str(e)}")
         traceback.print_exc()
         return "I encountered an error. Could you try rephrasing your message?"
 
+@app.post("/chat/stream")
+async def chat_stream(request: Request, message: str = Form(...), location: str = Form(default=""), cursor: str = Form(default="")):
+    """Handle chat messages, streaming the response as server-sent events."""
+    session = await load_session(request)
+    location = location or session.location or ""
+    print(f"Processing streaming request - Location: {location}, Message: {message}")
+    with STAGE_SECONDS.time("classify"):
+        intent = classify_intent(message)
+        turn = resolve_location(message, location, intent)
+    session.location = turn.current or session.location
+    response = StreamingResponse(
+        stream_response(message, location, intent, cursor or None, session, turn),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    set_session_cookie(response, session)
+    return response
+
 if __name__ == "__main__":
     import uvicorn
     # Render provides the PORT environment variable
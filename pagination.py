@@ -0,0 +1,143 @@
+"""Server-side cursors for paging through Ticketmaster search results."""
+import secrets
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from backends import Backend, BackendError
+from cache import TTLCache
+from events import Event, decode_json, encode_json, event_from_list, event_to_list
+from geocoding import GeocodeResult
+
+
+class EventPage(NamedTuple):
+    """One page of normalized events plus the Discovery API paging metadata."""
+    events: List[Event]
+    page: int
+    total_pages: int
+
+    @property
+    def has_more(self) -> bool:
+        return self.page + 1 < self.total_pages
+
+
+class SearchState:
+    """Everything needed to fetch further pages of a search."""
+
+    __slots__ = ("cache_key", "params", "location", "location_data", "total_pages")
+
+    def __init__(self, cache_key: Tuple, params: Dict[str, Any], location: str, location_data: Any, total_pages: int):
+        self.cache_key = cache_key
+        self.params = params
+        self.location = location
+        self.location_data = location_data
+        self.total_pages = total_pages
+
+
+def encode_page(page: EventPage, fetched_at: float) -> bytes:
+    """Serialize a page for a shared cache; ``fetched_at`` is wall-clock time."""
+    return encode_json({"events": [event_to_list(event) for event in page.events], "page": page.page,
+                        "total_pages": page.total_pages, "fetched_at": fetched_at})
+
+
+def decode_page(data: bytes) -> Tuple[EventPage, float]:
+    """Return (page, fetched_at) from ``encode_page`` output."""
+    fields = decode_json(data)
+    events = [event_from_list(event) for event in fields["events"]]
+    return EventPage(events, fields["page"], fields["total_pages"]), fields["fetched_at"]
+
+
+def encode_search(state: SearchState) -> bytes:
+    location = state.location_data
+    return encode_json({"cache_key": state.cache_key, "params": state.params, "location": state.location,
+                        "location_data": [location.latitude, location.longitude, getattr(location, "address", "")],
+                        "total_pages": state.total_pages})
+
+
+def decode_search(data: bytes) -> SearchState:
+    fields = decode_json(data)
+    # JSON turns the key's tuples into lists; the search params are its last item, as (name, value) pairs
+    *head, search_params = fields["cache_key"]
+    cache_key = (*head, tuple(tuple(item) for item in search_params))
+    return SearchState(cache_key, fields["params"], fields["location"], GeocodeResult(*fields["location_data"]),
+                       fields["total_pages"])
+
+
+def make_cursor(search_id: str, page: int) -> str:
+    return f"{search_id}:{page}"
+
+
+def parse_cursor(cursor: str) -> Optional[Tuple[str, int]]:
+    """Split a cursor into (search id, page); None if it is malformed."""
+    search_id, _, page = (cursor or "").partition(":")
+    if not search_id or not page.isdigit():
+        return None
+    return search_id, int(page)
+
+
+class CursorStore:
+    """Keeps recent searches so clients can page through them by cursor.
+
+    Cursors are opaque ``<search id>:<page>`` strings, so asking for the same
+    cursor twice returns the same page rather than advancing a shared position.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 1800):
+        self._searches = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def register(self, state: SearchState) -> str:
+        """Store a search and return its id."""
+        search_id = secrets.token_urlsafe(8)
+        self._searches.set(search_id, state)
+        return search_id
+
+    async def _load(self, search_id: str) -> Optional[SearchState]:
+        return self._searches.get(search_id)
+
+    async def resolve(self, cursor: str) -> Optional[Tuple[str, SearchState, int]]:
+        """Return (search id, search state, page) for a cursor, or None if unknown/expired."""
+        parsed = parse_cursor(cursor)
+        if parsed is None:
+            return None
+        search_id, page = parsed
+        state = await self._load(search_id)
+        if state is None or page >= state.total_pages:
+            return None
+        return search_id, state, page
+
+    def stats(self) -> Dict[str, Any]:
+        return self._searches.stats()
+
+
+class SharedCursorStore(CursorStore):
+    """A CursorStore whose searches are kept in a shared backend, so any worker can serve a cursor.
+
+    Searches this worker registered or resolved are also kept locally, which
+    saves a round trip for the common case of paging on the same worker.
+    """
+
+    def __init__(self, backend: Backend, maxsize: int = 10000, ttl: float = 1800):
+        super().__init__(maxsize, ttl)
+        self.backend = backend
+        self.ttl = ttl
+
+    async def register(self, state: SearchState) -> str:
+        search_id = await super().register(state)
+        try:
+            await self.backend.set(f"search:{search_id}", encode_search(state), self.ttl)
+        except BackendError as e:
+            print(f"Could not share search {search_id}: {e}")
+        return search_id
+
+    async def _load(self, search_id: str) -> Optional[SearchState]:
+        entry = self._searches.get_entry(search_id)
+        if entry is not None:
+            return entry.value
+        try:
+            data = await self.backend.get(f"search:{search_id}")
+        except BackendError as e:
+            print(f"Could not load search {search_id}: {e}")
+            return None
+        if data is None:
+            return None
+        state = decode_search(data)
+        self._searches.set(search_id, state)
+        return state
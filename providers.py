@@ -0,0 +1,249 @@
+"""Event searches fanned out to several providers under one deadline, with cross-provider duplicates merged.
+
+Each provider (Ticketmaster, Eventbrite, events we already have, sample
+events) answers the same ``ProviderQuery``. They all start at once and the
+search returns whatever has arrived when the deadline passes, so a slow
+provider costs at most the deadline, never its own latency. Providers still
+running then are left to finish in the background: a late Ticketmaster page
+still lands in the event cache for the next search.
+
+The same concert often shows up on several providers under slightly
+different names ("Taylor Swift | The Eras Tour" and "TAYLOR SWIFT - THE ERAS
+TOUR"). Results are merged in provider order and an event is dropped when
+an earlier provider already has one at about the same time, at the same
+venue, with a similar name. Every event keeps ``source``, the provider it came from.
+"""
+import asyncio
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from events import Event
+from geo import haversine_km
+
+# Words that vary between providers' listings of one event
+FILLER_WORDS = frozenset({"a", "an", "and", "at", "the", "of", "in", "with", "live", "presents", "featuring", "feat",
+                          "ft", "w", "tour", "concert", "show", "tickets"})
+# Providers geocode venues differently: listings further apart than this are different places whatever the venue
+# names, and closer than SAME_VENUE_KM the same place even when the names differ
+DIFFERENT_VENUE_KM = 1.0
+SAME_VENUE_KM = 0.15
+# Listings starting further apart than this are different shows (an early and a late one), not one event
+SAME_START_SECONDS = 90 * 60
+# Share of name words two listings have in common to be the same event
+SAME_NAME_OVERLAP = 0.6
+# Spellings providers disagree on ("Paramount Theatre", "Paramount Theater")
+SPELLINGS = {"theatre": "theater", "centre": "center", "amphitheatre": "amphitheater", "colour": "color"}
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class ProviderError(Exception):
+    """A provider couldn't answer (upstream error, unusable response)."""
+
+
+class SearchPending(Exception):
+    """Nothing to show yet: providers that count failed or missed the deadline and no other had events.
+
+    Raised by callers of the fan-out rather than by the fan-out itself, so
+    the user is told to try again instead of seeing "no events" or samples.
+    """
+
+    def __init__(self, providers: Sequence[str]):
+        super().__init__(", ".join(providers))
+        self.providers = list(providers)
+
+
+class ProviderQuery(NamedTuple):
+    """One search, as every provider sees it."""
+    location: str
+    latitude: float
+    longitude: float
+    radius_km: float
+    date_range: Tuple[datetime, datetime]
+    params: Dict[str, Any]
+    limit: int = 20
+
+
+class ProviderResult(NamedTuple):
+    """A provider's answer: its events and, if it has more, a cursor for the next page."""
+    events: List[Event]
+    cursor: Optional[str] = None
+
+
+class EventProvider:
+    """A source of events. Subclasses set ``name`` and implement ``search``.
+
+    ``search`` returns a ProviderResult, or raises if the provider is
+    unavailable; the fan-out records the error and carries on with the rest.
+    """
+
+    name = "provider"
+    # Merged only when a provider without this flag failed or missed the deadline (e.g. copies of its events we
+    # already have, which would otherwise repeat its results)
+    standby = False
+    # Used only when no other provider found anything and none that counts failed or ran late (e.g. sample events
+    # when no real provider is configured), so samples never stand in for real listings that are just slow
+    fallback = False
+
+    async def search(self, query: ProviderQuery) -> ProviderResult:
+        raise NotImplementedError
+
+
+class FanOutResult(NamedTuple):
+    """Merged events of a fan-out search.
+
+    ``outcomes`` maps each provider to ok, empty, unused (answered, but a
+    standby or fallback that wasn't needed), late or error; ``errors`` holds
+    the exceptions of the ones that failed. ``complete`` is true when every
+    provider that counts answered in time and none has more pages;
+    ``fallback`` when the events are a fallback provider's; ``missing``
+    lists the providers that count (neither standby nor fallback) that
+    failed or missed the deadline.
+    """
+    events: List[Event]
+    cursor: Optional[str]
+    complete: bool
+    fallback: bool
+    outcomes: Dict[str, str]
+    errors: Dict[str, BaseException]
+    missing: List[str]
+
+
+def _words(text: str) -> FrozenSet[str]:
+    return frozenset(SPELLINGS.get(word, word) for word in _WORD.findall(text.lower()) if word not in FILLER_WORDS)
+
+
+def _similar(a: FrozenSet[str], b: FrozenSet[str]) -> bool:
+    """Same words, or enough of the shorter name in the longer one."""
+    if not a or not b:
+        return a == b
+    return len(a & b) / min(len(a), len(b)) >= SAME_NAME_OVERLAP
+
+
+def same_event(a: Event, b: Event) -> bool:
+    """Whether two listings are one event: same day and time, same venue (by name or location) and a similar name."""
+    if a.id is not None and a.id == b.id:
+        return True
+    if a.date != b.date or not _similar(_words(a.name), _words(b.name)):
+        return False
+    if a.start_time and b.start_time and abs((a.start_time - b.start_time).total_seconds()) > SAME_START_SECONDS:
+        return False
+    (lat_a, lon_a), (lat_b, lon_b) = a.coordinates, b.coordinates
+    distance = haversine_km(lat_a, lon_a, lat_b, lon_b) if None not in (lat_a, lon_a, lat_b, lon_b) else None
+    if distance is not None and distance > DIFFERENT_VENUE_KM:
+        return False
+    return (distance is not None and distance <= SAME_VENUE_KM) or _similar(_words(a.venue.name), _words(b.venue.name))
+
+
+def merge_events(results: Iterable[List[Event]]) -> List[Event]:
+    """Events of several providers, in priority order, without cross-provider duplicates, soonest first.
+
+    Of duplicates the first provider's listing is kept; a provider's own
+    listings are left as they are (a show and its VIP package, say). Events
+    without a start time go last.
+    """
+    kept: List[Event] = []
+    by_day: Dict[str, List[Tuple[int, Event]]] = {}
+    for i, events in enumerate(results):
+        for event in events:
+            same_day = by_day.setdefault(event.date, [])
+            if any(j != i and same_event(event, other) for j, other in same_day):
+                continue
+            same_day.append((i, event))
+            kept.append(event)
+    return sorted(kept, key=lambda event: (event.start_time is None, event.start_time or datetime.min))
+
+
+class ProviderFanOut:
+    """Query providers concurrently and merge what arrives within ``deadline`` seconds.
+
+    Providers are listed in priority order: the first one's listing wins a
+    duplicate, and only the first one to return a cursor pages further.
+    """
+
+    def __init__(self, providers: Sequence[EventProvider], deadline: float = 2.5):
+        self.providers = list(providers)
+        self.deadline = deadline
+        self._stragglers: Set[asyncio.Task] = set()
+        self.counters = {"searches": 0, "deadline_hit": 0, "duplicates": 0}
+        self.outcomes: Dict[str, Dict[str, int]] = {provider.name: {} for provider in self.providers}
+
+    async def _timed(self, provider: EventProvider, query: ProviderQuery) -> Tuple[ProviderResult, float]:
+        start = time.perf_counter()
+        return await provider.search(query), time.perf_counter() - start
+
+    def _straggle(self, name: str, task: asyncio.Task) -> None:
+        """Let a late provider finish in the background, keeping a reference until it does."""
+        def done(task: asyncio.Task) -> None:
+            self._stragglers.discard(task)
+            if not task.cancelled() and task.exception() is not None:
+                print(f"Provider {name} failed after the deadline: {task.exception()}")
+
+        self._stragglers.add(task)
+        task.add_done_callback(done)
+
+    async def search(self, query: ProviderQuery, deadline: float = None) -> FanOutResult:
+        """Every provider's events for ``query`` that arrive by the deadline, merged."""
+        deadline = self.deadline if deadline is None else deadline
+        self.counters["searches"] += 1
+        loop = asyncio.get_running_loop()
+        tasks = {provider.name: loop.create_task(self._timed(provider, query)) for provider in self.providers}
+        try:
+            _, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+        except asyncio.CancelledError:
+            for name, task in tasks.items():
+                if not task.done():
+                    self._straggle(name, task)
+            raise
+        if pending:
+            self.counters["deadline_hit"] += 1
+
+        results: Dict[str, ProviderResult] = {}
+        outcomes: Dict[str, str] = {}
+        errors: Dict[str, BaseException] = {}
+        for provider in self.providers:
+            task = tasks[provider.name]
+            if task in pending:
+                outcomes[provider.name] = "late"
+                self._straggle(provider.name, task)
+            elif task.exception() is not None:
+                outcomes[provider.name] = "error"
+                errors[provider.name] = task.exception()
+            else:
+                result, seconds = task.result()
+                results[provider.name] = result
+                outcomes[provider.name] = "ok" if result.events else "empty"
+                print(f"Provider {provider.name}: {len(result.events)} events in {seconds * 1000:.0f} ms")
+
+        primary = [provider for provider in self.providers if not provider.standby and not provider.fallback]
+        missing = [provider.name for provider in primary if outcomes[provider.name] in ("late", "error")]
+        used = [provider for provider in self.providers if not provider.fallback and (missing or not provider.standby)]
+        found = [results[provider.name].events for provider in used if provider.name in results]
+        fallback = not any(found) and not missing
+        if fallback:
+            used = [provider for provider in self.providers if provider.fallback]
+            found = [results[provider.name].events for provider in used if provider.name in results]
+        for provider in self.providers:
+            if outcomes[provider.name] == "ok" and provider not in used:
+                outcomes[provider.name] = "unused"
+        for name, outcome in outcomes.items():
+            self.outcomes[name][outcome] = self.outcomes[name].get(outcome, 0) + 1
+
+        events = merge_events(found)
+        self.counters["duplicates"] += sum(len(events) for events in found) - len(events)
+        cursor = next((results[provider.name].cursor for provider in used
+                       if provider.name in results and results[provider.name].cursor), None)
+        complete = not missing and cursor is None
+        return FanOutResult(events, cursor, complete, fallback and bool(events), outcomes, errors, missing)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "providers": self.outcomes, "stragglers": len(self._stragglers),
+                "deadline": self.deadline}
+
+    async def drain(self) -> None:
+        """Cancel providers still running after their search's deadline (used on shutdown)."""
+        for task in list(self._stragglers):
+            task.cancel()
+        if self._stragglers:
+            await asyncio.gather(*self._stragglers, return_exceptions=True)
@@ -0,0 +1,246 @@
+"""Client-side rate limiting for upstream APIs with per-second and daily limits."""
+import asyncio
+import math
+import time
+from datetime import datetime, timezone
+from enum import IntEnum
+from typing import Any, Dict, Optional, Set
+
+from backends import Backend, BackendError
+
+
+class Priority(IntEnum):
+    """How much a request matters; lower-priority work is shed first."""
+    INTERACTIVE = 0  # a user is waiting on it
+    PREFETCH = 1     # a page the user will probably ask for next
+    BACKGROUND = 2   # stale-while-revalidate refreshes and cache warming
+
+
+class RateLimited(Exception):
+    """Raised instead of calling upstream when the limiter won't allow a request."""
+
+    def __init__(self, reason: str, retry_after: float = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket allowing ``rate`` requests per second with bursts up to ``capacity``.
+
+    The default capacity of one token paces requests evenly instead of letting
+    a burst through. Waiting callers reserve their slot up front, so they are
+    released in arrival order and stay within the rate even when many wait.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until a token would be available for a new caller."""
+        now = time.monotonic()
+        self._refill(now)
+        wait = max(0.0, (1 - self._tokens) / self.rate)
+        return max(wait, self._paused_until - now)
+
+    async def acquire(self, max_wait: float) -> float:
+        """Take a token, waiting up to ``max_wait`` seconds; returns how long it waited."""
+        wait = self.wait_time()
+        if wait > max_wait:
+            raise RateLimited("rate", retry_after=wait)
+        self._tokens -= 1
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for ``seconds`` (e.g. after the upstream returns 429)."""
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._refill(now)
+        self._tokens = min(self._tokens, 0)
+
+
+class DailyQuota:
+    """Counts requests against a quota that resets at midnight UTC."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._day = None
+        self._used = 0
+
+    def _roll(self) -> None:
+        today = datetime.now(timezone.utc).date()
+        if today != self._day:
+            self._day = today
+            self._used = 0
+
+    @property
+    def used(self) -> int:
+        self._roll()
+        return self._used
+
+    @property
+    def remaining(self) -> int:
+        return max(self.limit - self.used, 0)
+
+    def spend(self) -> None:
+        self._roll()
+        self._used += 1
+
+    def exhaust(self) -> None:
+        """Treat the rest of today's quota as spent (the upstream said so)."""
+        self._roll()
+        self._used = max(self._used, self.limit)
+
+
+class RateLimiter:
+    """Shared limiter for one upstream: a token bucket plus a daily quota.
+
+    As the daily quota runs down, lower priorities are cut off first: each
+    priority may only spend quota while more than its reserved fraction is
+    left, so the tail of the budget is kept for interactive requests. Lower
+    priorities also give up sooner when they would have to queue for a token.
+    """
+
+    DEFAULT_RESERVES = {Priority.INTERACTIVE: 0.0, Priority.PREFETCH: 0.1, Priority.BACKGROUND: 0.25}
+    DEFAULT_MAX_WAITS = {Priority.INTERACTIVE: 3.0, Priority.PREFETCH: 1.0, Priority.BACKGROUND: 0.5}
+
+    def __init__(self, rate: float, daily_limit: int, burst: float = 1,
+                 reserves: Dict[Priority, float] = None, max_waits: Dict[Priority, float] = None):
+        self.bucket = TokenBucket(rate, burst)
+        self.quota = DailyQuota(daily_limit)
+        self.reserves = {**self.DEFAULT_RESERVES, **(reserves or {})}
+        self.max_waits = {**self.DEFAULT_MAX_WAITS, **(max_waits or {})}
+        self.counters = {"allowed": 0, "throttled": 0, "rejected": 0, "upstream_429": 0}
+        self.rejected_by_priority = {priority.name.lower(): 0 for priority in Priority}
+
+    def _reject(self, priority: Priority, reason: str, retry_after: float = None) -> RateLimited:
+        self.counters["rejected"] += 1
+        self.rejected_by_priority[priority.name.lower()] += 1
+        return RateLimited(reason, retry_after)
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE) -> None:
+        """Wait for permission to make one request, or raise RateLimited."""
+        if self.quota.remaining <= self.quota.limit * self.reserves[priority]:
+            raise self._reject(priority, "quota")
+        try:
+            waited = await self.bucket.acquire(self.max_waits[priority])
+        except RateLimited as e:
+            raise self._reject(priority, e.reason, e.retry_after)
+        if waited:
+            self.counters["throttled"] += 1
+        self.counters["allowed"] += 1
+        self.quota.spend()
+
+    def upstream_throttled(self, retry_after: Optional[float] = None, quota_exhausted: bool = False) -> None:
+        """Record a 429 from the upstream and back off accordingly."""
+        self.counters["upstream_429"] += 1
+        if quota_exhausted:
+            self.quota.exhaust()
+        self.bucket.pause(retry_after if retry_after is not None else 1.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "rejected_by_priority": dict(self.rejected_by_priority),
+            "rate": self.bucket.rate,
+            "daily_limit": self.quota.limit,
+            "daily_used": self.quota.used,
+            "daily_remaining": self.quota.remaining,
+        }
+
+
+class SharedRateLimiter(RateLimiter):
+    """A RateLimiter whose pacing, daily quota and 429 back-off live in a shared backend.
+
+    Every worker using the same backend and ``name`` draws from one budget.
+    Time is cut into slots of ``1 / rate`` seconds and a request claims the
+    first free one with set-if-absent, so requests are paced evenly across
+    all workers without any read-modify-write.
+    If the backend fails, the local limiter inherited from RateLimiter takes
+    over for that request, so an outage degrades to per-process limits
+    instead of letting everything through.
+    """
+
+    def __init__(self, backend: Backend, name: str, rate: float, daily_limit: int, **kwargs: Any):
+        super().__init__(rate, daily_limit, **kwargs)
+        self.backend = backend
+        self.name = name
+        self.counters["backend_errors"] = 0
+        # Last quota usage seen in the backend, for stats()
+        self._shared_used = 0
+        self._pending: Set[asyncio.Task] = set()
+
+    def _quota_key(self) -> str:
+        return f"{self.name}:quota:{datetime.now(timezone.utc).date().isoformat()}"
+
+    async def _reserve_slot(self, max_wait: float) -> float:
+        """Claim the first free send slot within ``max_wait`` seconds; returns how long to wait for it."""
+        now = time.time()
+        paused = await self.backend.get(f"{self.name}:paused_until")
+        start = max(now, float(paused)) if paused else now
+        rate = self.bucket.rate
+        slot = math.floor(start * rate)
+        while slot / rate - now <= max_wait:
+            if await self.backend.add(f"{self.name}:slot:{slot}", b"1", ttl=max_wait + 60):
+                return max(0.0, slot / rate - now)
+            slot += 1
+        raise RateLimited("rate", retry_after=slot / rate - now)
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE) -> None:
+        try:
+            used = await self.backend.get(self._quota_key())
+            self._shared_used = int(used) if used else 0
+            if self.quota.limit - self._shared_used <= self.quota.limit * self.reserves[priority]:
+                raise self._reject(priority, "quota")
+            try:
+                wait = await self._reserve_slot(self.max_waits[priority])
+            except RateLimited as e:
+                raise self._reject(priority, e.reason, e.retry_after)
+            # Counted up front; a waiting caller has its slot, so it will spend the quota
+            self._shared_used = await self.backend.incr(self._quota_key(), 1, ttl=2 * 86400)
+        except BackendError as e:
+            self.counters["backend_errors"] += 1
+            print(f"Shared rate limiter unavailable, limiting locally: {e}")
+            await super().acquire(priority)
+            return
+        if wait:
+            self.counters["throttled"] += 1
+            await asyncio.sleep(wait)
+        self.counters["allowed"] += 1
+
+    async def _record_throttle(self, pause: float, quota_exhausted: bool) -> None:
+        try:
+            paused = f"{time.time() + pause}".encode()
+            await self.backend.set(f"{self.name}:paused_until", paused, ttl=pause)
+            if quota_exhausted:
+                self._shared_used = await self.backend.incr(
+                    self._quota_key(), max(self.quota.limit - self._shared_used, 0), ttl=2 * 86400)
+        except BackendError as e:
+            self.counters["backend_errors"] += 1
+            print(f"Could not share upstream back-off: {e}")
+
+    def upstream_throttled(self, retry_after: Optional[float] = None, quota_exhausted: bool = False) -> None:
+        """Back off locally right away and tell the other workers in the background."""
+        super().upstream_throttled(retry_after, quota_exhausted)
+        task = asyncio.get_running_loop().create_task(
+            self._record_throttle(retry_after if retry_after is not None else 1.0, quota_exhausted))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "backend": self.backend.name,
+            "daily_used": self._shared_used,
+            "daily_remaining": max(self.quota.limit - self._shared_used, 0),
+        }
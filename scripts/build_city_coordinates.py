@@ -0,0 +1,113 @@
+"""Rebuild data/city_coordinates.json from the GeoNames US city list.
+
+The table gives the geocoder an offline answer for every name in ALLOWED_CITIES.
+Coordinates come from the ``geonamescache`` package (GeoNames cities1000 dump);
+when a name is shared by several US cities the most populous one wins, which
+is usually what Nominatim ranks first for a bare city name. Where it isn't
+("Saint Louis" is a small town in Michigan, but users mean St. Louis, MO),
+OVERRIDES names the city meant, and the table is checked against the known
+centers of major metros before it's written.
+
+Usage:
+    pip install geonamescache
+    python scripts/build_city_coordinates.py
+"""
+import ast
+import json
+import os
+
+import geonamescache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT_PATH = os.path.join(ROOT, "data", "city_coordinates.json")
+
+# Names in ALLOWED_CITIES that GeoNames spells differently, that refer to a county/metro area, or whose most
+# populous namesake isn't the metro meant
+OVERRIDES = {
+    "boise city": "boise",
+    "clarke county": "athens",
+    "davidson county": "nashville",
+    "greenbay": "green bay",
+    "gulfport-biloxi": "gulfport",
+    "new york": "new york city",
+    "port st. lucie": "port saint lucie",
+    "richmond county": "augusta",
+    "saint louis": "st. louis",
+    "saint petersburg": "st. petersburg",
+    "san buenaventura": "ventura",
+    "st. paul": "saint paul",
+    "winston": "winston-salem",
+}
+
+# City centers of major metros (and of names that once resolved to a small namesake), to catch a wrong match
+KNOWN_CENTERS = {
+    "new york": (40.7128, -74.0060),
+    "los angeles": (34.0522, -118.2437),
+    "chicago": (41.8781, -87.6298),
+    "houston": (29.7604, -95.3698),
+    "phoenix": (33.4484, -112.0740),
+    "philadelphia": (39.9526, -75.1652),
+    "san antonio": (29.4241, -98.4936),
+    "san diego": (32.7157, -117.1611),
+    "dallas": (32.7767, -96.7970),
+    "seattle": (47.6062, -122.3321),
+    "denver": (39.7392, -104.9903),
+    "boston": (42.3601, -71.0589),
+    "atlanta": (33.7490, -84.3880),
+    "miami": (25.7617, -80.1918),
+    "portland": (45.5152, -122.6784),
+    "kansas city": (39.0997, -94.5786),
+    "saint louis": (38.6270, -90.1994),
+    "boise city": (43.6150, -116.2023),
+    "winston": (36.0999, -80.2442),
+}
+# How far (in degrees of latitude or longitude) a city's coordinates may be from its known center
+KNOWN_CENTER_TOLERANCE = 0.2
+
+
+def load_allowed_cities() -> set:
+    """Read ALLOWED_CITIES from main.py without importing the app."""
+    with open(os.path.join(ROOT, "main.py"), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "ALLOWED_CITIES" for t in node.targets):
+            return ast.literal_eval(node.value)
+    raise RuntimeError("ALLOWED_CITIES not found in main.py")
+
+
+def main() -> None:
+    cities = geonamescache.GeonamesCache(min_city_population=1000).get_cities()
+
+    # Keep the most populous US city for each lower-cased name
+    best = {}
+    for city in cities.values():
+        if city["countrycode"] != "US":
+            continue
+        name = city["name"].lower()
+        if name not in best or city["population"] > best[name]["population"]:
+            best[name] = city
+
+    table = {}
+    for name in sorted(load_allowed_cities()):
+        match = best.get(OVERRIDES.get(name, name))
+        if match is None:
+            raise RuntimeError(f"No coordinates found for {name!r}; add it to OVERRIDES")
+        table[name] = [round(match["latitude"], 5), round(match["longitude"], 5)]
+
+    for name, (latitude, longitude) in KNOWN_CENTERS.items():
+        if name not in table:
+            continue
+        found = table[name]
+        if abs(found[0] - latitude) > KNOWN_CENTER_TOLERANCE or abs(found[1] - longitude) > KNOWN_CENTER_TOLERANCE:
+            raise RuntimeError(f"{name!r} resolved to {found}, not near {[latitude, longitude]}; add it to OVERRIDES")
+
+    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+    with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
+        # One city per line keeps the file diffable
+        lines = [f"  {json.dumps(name)}: {json.dumps(coords)}" for name, coords in table.items()]
+        f.write("{\n" + ",\n".join(lines) + "\n}\n")
+    print(f"Wrote {len(table)} cities to {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
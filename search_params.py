@@ -0,0 +1,120 @@
+"""Token-indexed extraction of Ticketmaster search params (classification, genre, family-friendly)."""
+import re
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+_TOKEN = re.compile(r"[a-z0-9&]+")
+
+
+class ParamMatch(NamedTuple):
+    """One vocabulary phrase found in a message: the param and value it suggests, its weight and token span."""
+    param: str
+    value: str
+    weight: float
+    start: int
+    end: int
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word tokens; hyphens and slashes split words, so "hip-hop" is "hip hop"."""
+    return _TOKEN.findall(text.lower())
+
+
+class SearchParamIndex:
+    """Find every classification, genre and family-friendly phrase in a message in one pass.
+
+    ``vocabularies`` maps a Ticketmaster param to ``{value: phrases}``. All
+    phrases are tokenized once into a table keyed by token tuple; a message
+    is scanned left to right taking, for each param, the longest phrase at
+    each token, so "live music" is one match and "art" never matches inside
+    "party". Plurals, in phrases and messages alike, are read as their
+    singular when the vocabulary has it ("concerts", "kids", "parties").
+
+    A phrase listed under several values of one param splits its weight
+    between them, and phrases in ``weak`` count half: on their own they're a
+    hint ("festival", "house"), not a choice. ``choose`` picks, per param,
+    the value with the highest total weight if it reaches ``min_score``;
+    ties go to the value listed first.
+    """
+
+    def __init__(self, vocabularies: Dict[str, Dict[str, Sequence[str]]], weak: Iterable[str] = (),
+                 min_score: float = 1.0, weak_weight: float = 0.5):
+        self.min_score = min_score
+        self._vocabulary: FrozenSet[str] = frozenset(
+            token for values in vocabularies.values() for phrases in values.values() for phrase in phrases
+            for token in tokenize(phrase))
+        weak_phrases = {self._tokens(phrase) for phrase in weak}
+        self._order: Dict[Tuple[str, str], int] = {}
+        listed: Dict[Tuple[str, Tuple[str, ...]], List[str]] = {}
+        for param, values in vocabularies.items():
+            for value, phrases in values.items():
+                self._order[(param, value)] = len(self._order)
+                for phrase in phrases:
+                    tokens = self._tokens(phrase)
+                    if tokens and value not in listed.setdefault((param, tokens), []):
+                        listed[(param, tokens)].append(value)
+        self._phrases: Dict[Tuple[str, ...], List[Tuple[str, str, float]]] = {}
+        for (param, tokens), values in listed.items():
+            weight = (weak_weight if tokens in weak_phrases else 1.0) / len(values)
+            self._phrases.setdefault(tokens, []).extend((param, value, weight) for value in values)
+        self._longest = max((len(tokens) for tokens in self._phrases), default=0)
+
+    def _singular(self, token: str) -> str:
+        if token.endswith("ies") and token[:-3] + "y" in self._vocabulary:
+            return token[:-3] + "y"
+        if token.endswith("es") and token[:-2] in self._vocabulary:
+            return token[:-2]
+        if token.endswith("s") and token[:-1] in self._vocabulary:
+            return token[:-1]
+        return token
+
+    def _tokens(self, text: str) -> Tuple[str, ...]:
+        return tuple(self._singular(token) for token in tokenize(text))
+
+    def matches(self, text: str) -> List[ParamMatch]:
+        """Every phrase in ``text`` (per param, leftmost-longest and non-overlapping), in message order."""
+        tokens = self._tokens(text)
+        found = []
+        free = {}  # param -> first token not inside one of its earlier matches
+        for i in range(len(tokens)):
+            longest = {}  # param -> length of its longest phrase starting here
+            for length in range(min(self._longest, len(tokens) - i), 0, -1):
+                for param, value, weight in self._phrases.get(tokens[i:i + length], ()):
+                    if free.get(param, 0) <= i and longest.setdefault(param, length) == length:
+                        found.append(ParamMatch(param, value, weight, i, i + length))
+            for param, length in longest.items():
+                free[param] = i + length
+        return found
+
+    @staticmethod
+    def scores(matches: Iterable[ParamMatch]) -> Dict[str, Dict[str, float]]:
+        """Total weight per param and value."""
+        totals: Dict[str, Dict[str, float]] = {}
+        for match in matches:
+            values = totals.setdefault(match.param, {})
+            values[match.value] = values.get(match.value, 0.0) + match.weight
+        return totals
+
+    def choose(self, text: str) -> Dict[str, str]:
+        """The best-scoring value of each param that reaches ``min_score``."""
+        chosen = {}
+        for param, values in self.scores(self.matches(text)).items():
+            value, score = max(values.items(), key=lambda item: (item[1], -self._order[(param, item[0])]))
+            if score >= self.min_score - 1e-9:
+                chosen[param] = value
+        return chosen
+
+
+def extract_keyword(text: str, indicators: Sequence[str], skip: FrozenSet[str] = frozenset(),
+                    max_words: int = 3) -> Optional[str]:
+    """Up to ``max_words`` words after the first indicator word ("see", "featuring", ...), as a search keyword.
+
+    Indicators are whole words, so "by" doesn't fire inside "nearby". Returns
+    None if no indicator is followed by a word outside ``skip``.
+    """
+    words = text.lower().split()
+    for indicator in indicators:
+        if indicator in words:
+            rest = words[words.index(indicator) + 1:]
+            if rest and rest[0] not in skip:
+                return " ".join(rest[:max_words])
+    return None
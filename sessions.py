@@ -0,0 +1,269 @@
+"""Server-side conversation sessions, bounded by count, idle time and memory."""
+import secrets
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from backends import Backend, BackendError
+from events import Event, decode_json, encode_json, event_from_list, event_to_list, utc_range
+
+# Rough sizes used for the memory cap; an Event is ~700 bytes (benchmarks/bench_event_memory.py)
+EVENT_BYTES = 700
+SESSION_BYTES = 600
+TURN_MAX_CHARS = 500
+
+# Search params a cached result set can be narrowed by
+REFINABLE_PARAMS = frozenset({"classificationName", "genreName"})
+DEFAULT_RADIUS_KM = 10.0
+
+
+class LastSearch(NamedTuple):
+    """The parameters of a session's most recent event search."""
+    location: str
+    date_range: Tuple[datetime, datetime]
+    params: Dict[str, Any]
+    radius_km: float = DEFAULT_RADIUS_KM
+
+
+def _squash(value: Optional[str]) -> str:
+    """Lower-case and drop punctuation, so "hip-hop-rap" matches "Hip-Hop/Rap"."""
+    return "".join(ch for ch in (value or "").lower() if ch.isalnum())
+
+
+def event_matches(event: Event, params: Dict[str, Any]) -> bool:
+    """Whether an event fits the classification and genre filters in ``params``."""
+    labels = (_squash(event.category), _squash(event.genre))
+    for name in REFINABLE_PARAMS.intersection(params):
+        wanted = _squash(params[name])
+        if not any(wanted in label for label in labels if label):
+            return False
+    return True
+
+
+class Session:
+    """One visitor's conversation: recent turns, location and last search with its results."""
+
+    __slots__ = ("id", "turns", "location", "last_search", "last_events", "last_complete", "last_seen", "nbytes")
+
+    def __init__(self, session_id: str, max_turns: int = 10):
+        self.id = session_id
+        self.turns: Deque[Tuple[str, str]] = deque(maxlen=max_turns)
+        self.location: Optional[str] = None
+        self.last_search: Optional[LastSearch] = None
+        self.last_events: List[Event] = []
+        # False if the results were only the first page of a longer search
+        self.last_complete = False
+        self.last_seen = time.monotonic()
+        self.nbytes = SESSION_BYTES
+
+    def add_turn(self, role: str, text: str) -> None:
+        """Record a turn; ``role`` is "user" or "assistant". Long texts are cut short."""
+        self.turns.append((role, text.strip()[:TURN_MAX_CHARS]))
+
+    def history(self) -> str:
+        """Earlier turns formatted for a prompt."""
+        return "\n".join(f"{'User' if role == 'user' else 'Assistant'}: {text}" for role, text in self.turns)
+
+    def remember_search(self, search: LastSearch, events: List[Event], complete: bool) -> None:
+        self.last_search = search
+        self.last_events = list(events)
+        self.last_complete = complete
+
+    def covers(self, location: str, date_range: Tuple[datetime, datetime], params: Dict[str, Any],
+               radius_km: float = DEFAULT_RADIUS_KM) -> bool:
+        """Whether a search is a narrowing of the last one: same place, and a window, filters and radius within it."""
+        last = self.last_search
+        if last is None or last.location.lower() != location.lower():
+            return False
+        if date_range[0] < last.date_range[0] or date_range[1] > last.date_range[1] or radius_km > last.radius_km:
+            return False
+        if any(params.get(name) != value for name, value in last.params.items()):
+            return False
+        return REFINABLE_PARAMS.issuperset(name for name in params if name not in last.params)
+
+    def knows_all(self, date_range: Tuple[datetime, datetime]) -> bool:
+        """Whether the last results include every event of the last search up to the end of ``date_range``."""
+        if self.last_complete:
+            return True
+        last_start = self.last_events[-1].start_time if self.last_events else None
+        return last_start is not None and utc_range(date_range)[1] < last_start
+
+    def refine(self, location: str, date_range: Tuple[datetime, datetime], params: Dict[str, Any],
+               radius_km: float = DEFAULT_RADIUS_KM) -> Optional[List[Event]]:
+        """Answer a narrower follow-up search from the last results.
+
+        Returns None unless the last search ``covers`` this one with the same
+        radius (a smaller one is answered from the spatial index instead). When
+        the last results were just the first page (sorted by date), only the
+        span up to the last event shown is known to be complete.
+        """
+        if not self.last_events or not self.covers(location, date_range, params, radius_km):
+            return None
+        if radius_km != self.last_search.radius_km or not self.knows_all(date_range):
+            return None
+        start, end = utc_range(date_range)
+        return [event for event in self.last_events
+                if event.start_time is not None and start <= event.start_time < end and event_matches(event, params)]
+
+    def estimate_bytes(self) -> int:
+        return (SESSION_BYTES + sum(len(text) + 100 for _, text in self.turns)
+                + len(self.last_events) * EVENT_BYTES)
+
+
+class SessionStore:
+    """Sessions by id with LRU eviction, an idle timeout and a cap on estimated memory.
+
+    A session expires ``ttl`` seconds after it was last used. Once there are
+    more than ``maxsize`` sessions or they add up to more than ``max_bytes``,
+    the least recently used ones are dropped. Call ``save`` after changing a
+    session so its size is re-estimated.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 1800, max_bytes: int = 64 * 1024 * 1024, max_turns: int = 10):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_turns = max_turns
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.nbytes = 0
+        self.counters = {"created": 0, "hits": 0, "misses": 0, "expirations": 0, "evictions": 0, "evicted_for_memory": 0}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: Optional[str]) -> Optional[Session]:
+        """Return a live session and mark it used, or None if unknown or expired."""
+        session = self._sessions.get(session_id) if session_id else None
+        now = time.monotonic()
+        if session is not None and now - session.last_seen >= self.ttl:
+            self._remove(session)
+            self.counters["expirations"] += 1
+            session = None
+        if session is None:
+            self.counters["misses"] += 1
+            return None
+        session.last_seen = now
+        self._sessions.move_to_end(session.id)
+        self.counters["hits"] += 1
+        return session
+
+    def create(self) -> Session:
+        session = Session(secrets.token_urlsafe(16), self.max_turns)
+        self._sessions[session.id] = session
+        self.nbytes += session.nbytes
+        self.counters["created"] += 1
+        self._evict()
+        return session
+
+    async def get_or_create(self, session_id: Optional[str]) -> Tuple[Session, bool]:
+        """Return (session, created)."""
+        session = self.get(session_id)
+        if session is not None:
+            return session, False
+        return self.create(), True
+
+    async def save(self, session: Session) -> None:
+        """Re-estimate a session's size after a change and enforce the caps."""
+        if self._sessions.get(session.id) is not session:
+            return
+        nbytes = session.estimate_bytes()
+        self.nbytes += nbytes - session.nbytes
+        session.nbytes = nbytes
+        self._evict(keep=session)
+
+    def _remove(self, session: Session) -> None:
+        del self._sessions[session.id]
+        self.nbytes -= session.nbytes
+
+    def _evict(self, keep: Session = None) -> None:
+        now = time.monotonic()
+        # Oldest first; expired sessions are always at the front
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest is keep:
+                break
+            if now - oldest.last_seen >= self.ttl:
+                self.counters["expirations"] += 1
+            elif len(self._sessions) > self.maxsize:
+                self.counters["evictions"] += 1
+            elif self.nbytes > self.max_bytes:
+                self.counters["evicted_for_memory"] += 1
+            else:
+                break
+            self._remove(oldest)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "size": len(self._sessions), "maxsize": self.maxsize,
+                "bytes": self.nbytes, "max_bytes": self.max_bytes}
+
+
+def encode_session(session: Session) -> bytes:
+    last = session.last_search
+    return encode_json({
+        "turns": list(session.turns),
+        "location": session.location,
+        "last_search": [last.location, [t.isoformat() for t in last.date_range], last.params, last.radius_km]
+                       if last else None,
+        "last_events": [event_to_list(event) for event in session.last_events],
+        "last_complete": session.last_complete,
+    })
+
+
+def decode_session(session_id: str, data: bytes, max_turns: int = 10) -> Session:
+    fields = decode_json(data)
+    session = Session(session_id, max_turns)
+    session.turns.extend(tuple(turn) for turn in fields["turns"])
+    session.location = fields["location"]
+    if fields["last_search"]:
+        # Sessions saved before searches had a radius have three fields
+        location, (start, end), params, *radius = fields["last_search"]
+        session.last_search = LastSearch(location, (datetime.fromisoformat(start), datetime.fromisoformat(end)), params,
+                                         *radius)
+    session.last_events = [event_from_list(event) for event in fields["last_events"]]
+    session.last_complete = fields["last_complete"]
+    return session
+
+
+class SharedSessionStore:
+    """Sessions kept in a shared backend, so a visitor's requests can land on any worker.
+
+    Each request loads the session and ``save`` writes it back, renewing its
+    idle timeout. Nothing is kept locally (another worker may have changed the
+    session since), and the backend's TTLs do the expiring. If the backend is
+    unavailable a visitor gets a fresh session rather than an error.
+    """
+
+    def __init__(self, backend: Backend, ttl: float = 1800, max_turns: int = 10):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self.counters = {"created": 0, "hits": 0, "misses": 0, "saves": 0, "errors": 0}
+
+    async def get_or_create(self, session_id: Optional[str]) -> Tuple[Session, bool]:
+        """Return (session, created)."""
+        data = None
+        if session_id:
+            try:
+                data = await self.backend.get(f"session:{session_id}")
+            except BackendError as e:
+                self.counters["errors"] += 1
+                print(f"Could not load session: {e}")
+        if data is not None:
+            self.counters["hits"] += 1
+            return decode_session(session_id, data, self.max_turns), False
+        self.counters["misses"] += 1
+        self.counters["created"] += 1
+        return Session(secrets.token_urlsafe(16), self.max_turns), True
+
+    async def save(self, session: Session) -> None:
+        session.nbytes = session.estimate_bytes()
+        try:
+            await self.backend.set(f"session:{session.id}", encode_session(session), self.ttl)
+            self.counters["saves"] += 1
+        except BackendError as e:
+            self.counters["errors"] += 1
+            print(f"Could not save session: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "backend": self.backend.name}
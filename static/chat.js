@@ -0,0 +1,191 @@
+let userLocation = '';
+
+function sendSuggestion(text) {
+    if (!text) return;
+    const messageInput = document.getElementById('message');
+    messageInput.value = text;
+    sendMessage();
+}
+
+function parseStreamEvent(rawEvent) {
+    let event = 'message';
+    const data = [];
+    rawEvent.split('\n').forEach(line => {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data.push(line.slice(6));
+    });
+    return {event: event, data: data.join('\n')};
+}
+
+// Apply one streamed event to the bot message; returns true when the reply is complete
+function handleStreamEvent(botMessageDiv, message) {
+    switch (message.event) {
+        case 'location':
+            userLocation = message.data;
+            break;
+        case 'status':
+            botMessageDiv.textContent = message.data;
+            break;
+        case 'events':
+            // A new result set replaces the "show more" buttons of older ones
+            document.querySelectorAll('#chat-container .more-button').forEach(button => button.remove());
+            botMessageDiv.innerHTML = message.data;
+            break;
+        case 'card':
+            botMessageDiv.querySelector('.events-grid').insertAdjacentHTML('beforeend', message.data);
+            break;
+        case 'intro':
+            botMessageDiv.querySelector('.events-intro').textContent += message.data;
+            break;
+        case 'text':
+            if (!botMessageDiv.dataset.streaming) {
+                botMessageDiv.textContent = '';
+                botMessageDiv.dataset.streaming = 'true';
+            }
+            botMessageDiv.textContent += message.data;
+            break;
+        case 'error':
+            botMessageDiv.textContent = message.data;
+            break;
+        case 'done':
+            return true;
+    }
+    return false;
+}
+
+// Load the next page of results into the grid above a "Show more events" button
+async function loadMoreEvents(button) {
+    button.disabled = true;
+    try {
+        const response = await fetch(`/events/more?cursor=${encodeURIComponent(button.dataset.cursor)}`);
+        if (response.status === 503) {
+            button.textContent = 'Busy right now - tap to try again';
+            button.disabled = false;
+            return;
+        }
+        if (!response.ok) {
+            button.textContent = 'These results have expired - try searching again';
+            return;
+        }
+        const template = document.createElement('template');
+        template.innerHTML = await response.text();
+        const nextButton = template.content.querySelector('.more-button');
+        if (nextButton) nextButton.remove();
+        button.parentElement.querySelector('.events-grid').append(template.content);
+        if (nextButton) button.replaceWith(nextButton);
+        else button.remove();
+    } catch (error) {
+        button.disabled = false;
+    }
+}
+
+// Replace a shortened card description with the full text
+async function loadFullDescription(button) {
+    button.disabled = true;
+    try {
+        const response = await fetch(`/events/${encodeURIComponent(button.dataset.event)}/description?version=${button.dataset.version}`);
+        if (!response.ok) {
+            button.remove();
+            return;
+        }
+        button.parentElement.textContent = await response.text();
+    } catch (error) {
+        button.disabled = false;
+    }
+}
+
+async function sendMessage() {
+    const messageInput = document.getElementById('message');
+    const chatContainer = document.getElementById('chat-container');
+
+    const message = messageInput.value.trim();
+    if (!message) return;
+
+    // Add user message to chat
+    const userMessageDiv = document.createElement('div');
+    userMessageDiv.className = 'message user-message';
+    userMessageDiv.textContent = message;
+    chatContainer.appendChild(userMessageDiv);
+
+    messageInput.value = '';
+
+    // Let "show me more" continue the most recent result set
+    const moreButtons = chatContainer.querySelectorAll('.more-button');
+    const cursor = moreButtons.length ? moreButtons[moreButtons.length - 1].dataset.cursor : '';
+
+    // Bot reply is filled in as server-sent events arrive
+    const botMessageDiv = document.createElement('div');
+    botMessageDiv.className = 'message bot-message';
+    chatContainer.appendChild(botMessageDiv);
+
+    try {
+        // Send to backend with current location
+        const response = await fetch('/chat/stream', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/x-www-form-urlencoded'},
+            body: `message=${encodeURIComponent(message)}&location=${encodeURIComponent(userLocation)}&cursor=${encodeURIComponent(cursor)}`
+        });
+
+        if (!response.ok || !response.body) {
+            throw new Error('Failed to get response');
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let done = false;
+        while (!done) {
+            const chunk = await reader.read();
+            if (chunk.done) break;
+            buffer += decoder.decode(chunk.value, {stream: true});
+
+            // Events are separated by a blank line
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                done = handleStreamEvent(botMessageDiv, parseStreamEvent(rawEvent)) || done;
+            }
+            chatContainer.scrollTop = chatContainer.scrollHeight;
+        }
+
+    } catch (error) {
+        botMessageDiv.textContent = 'Sorry, I encountered an error. Please try again.';
+    }
+
+    // Scroll to bottom
+    chatContainer.scrollTop = chatContainer.scrollHeight;
+}
+
+// Set up event listeners when the DOM is loaded
+document.addEventListener('DOMContentLoaded', function() {
+    // Add click listeners to suggestion chips
+    const chips = document.querySelectorAll('.suggestion-chip');
+    chips.forEach(chip => {
+        chip.addEventListener('click', function() {
+            const text = this.getAttribute('data-text');
+            if (text) {
+                sendSuggestion(text);
+            }
+        });
+    });
+
+    // "Show more events" and description "more" buttons are added dynamically, so listen on the container
+    document.getElementById('chat-container').addEventListener('click', function(e) {
+        if (e.target.classList.contains('more-button')) {
+            loadMoreEvents(e.target);
+        } else if (e.target.classList.contains('more-text')) {
+            loadFullDescription(e.target);
+        }
+    });
+
+    // Add click listener to send button
+    document.getElementById('send-button').addEventListener('click', sendMessage);
+
+    // Add enter key listener to input field
+    document.getElementById('message').addEventListener('keypress', function(e) {
+        if (e.key === 'Enter') {
+            sendMessage();
+        }
+    });
+});
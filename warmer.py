@@ -0,0 +1,169 @@
+"""Background cache warming for the most requested cities."""
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from ratelimit import RateLimited
+
+
+class WarmTarget(NamedTuple):
+    """One search to keep warm: a city, a time window phrase and an optional classification."""
+    city: str
+    window: str
+    classification: Optional[str]
+
+
+class DecayingCounter:
+    """Request counts that decay exponentially, so rankings follow recent traffic."""
+
+    def __init__(self, half_life: float = 3600, max_keys: int = 1000):
+        self.half_life = half_life
+        self.max_keys = max_keys
+        self._scores: Dict[Any, tuple] = {}
+
+    def _decayed(self, score: float, updated: float, now: float) -> float:
+        return score * math.pow(0.5, (now - updated) / self.half_life)
+
+    def add(self, key: Any, amount: float = 1.0) -> None:
+        now = time.monotonic()
+        score, updated = self._scores.get(key, (0.0, now))
+        self._scores[key] = (self._decayed(score, updated, now) + amount, now)
+        if len(self._scores) > self.max_keys:
+            # Drop the coldest quarter rather than pruning on every insert
+            ranked = self.top(self.max_keys * 3 // 4)
+            self._scores = {key: self._scores[key] for key, _ in ranked}
+
+    def top(self, n: int) -> List[tuple]:
+        """Return the ``n`` highest (key, current score) pairs."""
+        now = time.monotonic()
+        scores = [(key, self._decayed(score, updated, now)) for key, (score, updated) in self._scores.items()]
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores[:n]
+
+
+class HourlyBudget:
+    """Allow at most ``per_hour`` operations in any rolling hour."""
+
+    def __init__(self, per_hour: int):
+        self.per_hour = per_hour
+        self._spent = deque()
+
+    def remaining(self) -> int:
+        cutoff = time.monotonic() - 3600
+        while self._spent and self._spent[0] < cutoff:
+            self._spent.popleft()
+        return max(self.per_hour - len(self._spent), 0)
+
+    def try_spend(self) -> bool:
+        if self.remaining() <= 0:
+            return False
+        self._spent.append(time.monotonic())
+        return True
+
+
+class CacheWarmer:
+    """Periodically refresh the searches hot cities are most likely to ask for.
+
+    Targets are (city x time window x classification), with cities and
+    classifications ranked by observed request counts. Each cycle walks the
+    targets in rank order and refreshes those that are missing from the cache
+    or about to expire, spending at most ``budget_per_hour`` upstream requests
+    so warming never eats the quota live traffic needs. With several workers,
+    ``should_run`` lets one of them take each cycle (it returns False in the
+    others).
+    """
+
+    def __init__(self, refresh: Callable[[WarmTarget], Awaitable[Any]], needs_refresh: Callable[[WarmTarget], bool],
+                 windows: Sequence[str], top_cities: int = 5, top_classifications: int = 2,
+                 budget_per_hour: int = 60, interval: float = 60, seed_cities: Sequence[str] = (),
+                 should_run: Callable[[], Awaitable[bool]] = None):
+        self._refresh = refresh
+        self._needs_refresh = needs_refresh
+        self._should_run = should_run
+        self.windows = list(windows)
+        self.top_cities = top_cities
+        self.top_classifications = top_classifications
+        self.interval = interval
+        self.budget = HourlyBudget(budget_per_hour)
+        self.city_counts = DecayingCounter()
+        self.classification_counts = DecayingCounter()
+        for city in seed_cities:
+            self.city_counts.add(city, 0.5)
+        self._task: Optional[asyncio.Task] = None
+        self.counters = {"cycles": 0, "skipped_cycles": 0, "warmed": 0, "already_fresh": 0, "budget_exhausted": 0, "rate_limited": 0, "errors": 0}
+
+    def record(self, city: str, classification: Optional[str] = None) -> None:
+        """Count a live search; called on the request path, so it stays O(1)."""
+        self.city_counts.add(city)
+        if classification:
+            self.classification_counts.add(classification)
+
+    def targets(self) -> List[WarmTarget]:
+        """Searches to keep warm, most valuable first."""
+        cities = [city for city, _ in self.city_counts.top(self.top_cities)]
+        # Unfiltered searches are always worth warming; add the most asked-for classifications
+        classifications = [None] + [c for c, _ in self.classification_counts.top(self.top_classifications)]
+        return [
+            WarmTarget(city, window, classification)
+            for city in cities
+            for window in self.windows
+            for classification in classifications
+        ]
+
+    async def run_cycle(self) -> int:
+        """Refresh due targets within the budget; returns how many were refreshed."""
+        self.counters["cycles"] += 1
+        warmed = 0
+        for target in self.targets():
+            if not self._needs_refresh(target):
+                self.counters["already_fresh"] += 1
+                continue
+            if not self.budget.try_spend():
+                self.counters["budget_exhausted"] += 1
+                break
+            try:
+                await self._refresh(target)
+                warmed += 1
+                self.counters["warmed"] += 1
+            except RateLimited:
+                # Upstream capacity is needed elsewhere; try again next cycle
+                self.counters["rate_limited"] += 1
+                break
+            except Exception as e:
+                self.counters["errors"] += 1
+                print(f"Cache warming failed for {target}: {e}")
+        return warmed
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                if self._should_run is not None and not await self._should_run():
+                    self.counters["skipped_cycles"] += 1
+                    continue
+                await self.run_cycle()
+            except Exception as e:
+                print(f"Cache warming cycle failed: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "budget_remaining": self.budget.remaining(),
+            "top_cities": [(city, round(score, 2)) for city, score in self.city_counts.top(self.top_cities)],
+            "top_classifications": [(c, round(score, 2)) for c, score in self.classification_counts.top(self.top_classifications)],
+        }